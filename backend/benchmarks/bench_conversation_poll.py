@@ -0,0 +1,70 @@
+"""Cost of one frontend poll vs. session length: full history vs. cursor + ETag.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_conversation_poll --sizes 100 1000 10000
+
+For a session of each size it times (median of ``--polls`` in-process
+requests through the ASGI app, JSON encoding included):
+
+- ``full``: ``GET /debug/conversation/{id}``, the old way to pick up new turns
+- ``2 new``: ``GET /conversation/{id}/messages?after_id=<n-2>``
+- ``304``: the same poll with ``If-None-Match`` when nothing changed
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def timed_get(client, url: str, polls: int, **kwargs):
+    samples, response = [], None
+    for _ in range(polls):
+        started = time.perf_counter()
+        response = client.get(url, **kwargs)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6, len(response.content), response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--polls", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="dramabot-poll-")
+    os.environ.update({"MEMORY_DB_PATH": str(Path(workdir) / "poll.db"), "TRACE_LEVEL": "off"})
+
+    from fastapi.testclient import TestClient
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import main as app_main
+        from memory.session_memory import add_many_to_memory
+
+    print(f"{'messages':>9} | {'full':>18} | {'2 new':>18} | {'304':>18}")
+    with contextlib.redirect_stdout(io.StringIO()), TestClient(app_main.app) as client:
+        rows = []
+        for size in args.sizes:
+            session_id = f"poll-{size}"
+            add_many_to_memory(session_id, [("user" if i % 2 == 0 else "bot",
+                                             f"Turn {i}: omg and then the cow walked on stage 😭")
+                                            for i in range(size)])
+            full = timed_get(client, f"/debug/conversation/{session_id}", args.polls)
+            url = f"/conversation/{session_id}/messages"
+            new = timed_get(client, url, args.polls, params={"after_id": size - 2})
+            # The client now holds next_cursor == size and this ETag
+            unchanged = timed_get(client, url, args.polls, params={"after_id": size},
+                                  headers={"If-None-Match": new[2].headers["etag"]})
+            assert unchanged[2].status_code == 304, unchanged[2].status_code
+            rows.append((size, full, new, unchanged))
+    for size, full, new, unchanged in rows:
+        print(f"{size:>9} | " + " | ".join(f"{us:8.0f} µs {nbytes:>6} B" for us, nbytes, _ in (full, new, unchanged)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Drama Juice scoring throughput: compiled single-pass scorer vs. the original.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_emotion
+
+Checks that ``services.emotion.score_text`` returns exactly what the original
+per-call regex implementation (kept below as ``legacy_score``) returns, then
+times both on short voice replies and on ~20 minute play scripts.
+"""
+import argparse
+import random
+import re
+import time
+
+from services.emotion import clean_text, score_many, score_text
+
+
+def legacy_score(text: str, cleaned_text: str) -> dict:
+    """The scorer as it was inlined in TTSService.generate_emotional_audio."""
+    exclamations = cleaned_text.count("!")
+    all_caps_count = sum(1 for word in cleaned_text.split() if word.isupper() and len(word) > 2)
+    intense_punct_count = len(re.findall(r"\?!|!\?", cleaned_text))
+    intense_keywords = re.findall(
+        r"\b(love|hate|crying|exploding|raging|furious|ecstatic|devastated|insane|nooo+|yaaa+|ugh|omg|shaking|lit|wild)\b",
+        cleaned_text, re.IGNORECASE)
+    moderate_keywords = re.findall(
+        r"\b(happy|sad|hopeful|upset|calm|gentle|sweet|nervous|touched|lonely|tired|meh|confused|awkward|emotional)\b",
+        cleaned_text, re.IGNORECASE)
+    intense_emojis = {"😭", "😡", "🔥", "💔", "🤯", "🤬", "😤", "😱"}
+    moderate_emojis = {"😊", "😅", "🥲", "🙂", "🤗", "❤️", "✨", "😐", "😔", "😳"}
+    emoji_score = sum(2 for e in intense_emojis if e in text) + sum(1 for e in moderate_emojis if e in text)
+    emotional_words = re.findall(
+        r"\b(I|you|we|feel|miss|trust|care|hurt|friend|connect|burning|mad|terrified|anxious|desperate)\b",
+        cleaned_text, re.IGNORECASE)
+    intensity_score = (
+        all_caps_count * 2 + exclamations * 1.5 + intense_punct_count * 3 +
+        len(intense_keywords) * 3 + len(moderate_keywords) * 1.5 + emoji_score * 2 +
+        len(emotional_words) * 1.2
+    )
+    word_count = len(cleaned_text.split())
+    raw_score = intensity_score / max(1.0, word_count / 100.0)
+    return {"score": min(10, max(1, round(raw_score / 5.5)))}
+
+
+VOCAB = (
+    "I you we love HATE omg OMG nooooo yaaaa ugh lit wild happy sad calm meh tired "
+    "feel miss care hurt friend mad anxious the a and so really what wait lol Loves "
+    "can't don't it's I'm BESSIE: MOON: (lights fade) Scene Act A1B 123 ABC1 x_y"
+).split()
+PUNCT = ["", "", "", "!", "!!", "?", "?!", "!?", ".", ",", "...", " 😭", " 🔥", " ❤️", " ✨", " 😊"]
+
+
+def random_text(words: int) -> str:
+    return " ".join(random.choice(VOCAB) + random.choice(PUNCT) for _ in range(words))
+
+
+def time_it(fn, texts, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(texts)
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", type=int, default=5000, help="random texts to compare")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(7)
+    for _ in range(args.check):
+        text = random_text(random.randint(1, 120))
+        cleaned = clean_text(text, 500)
+        assert score_text(text, cleaned)["score"] == legacy_score(text, cleaned)["score"], text
+    print(f"✅ {args.check} random texts scored identically to the original formula")
+
+    suites = {
+        "voice replies (1000 x ~40 words)": [random_text(40) for _ in range(1000)],
+        "20-minute scripts (20 x ~3000 words)": [random_text(3000) for _ in range(20)],
+    }
+    for name, texts in suites.items():
+        cleaned = [clean_text(t) for t in texts]
+        legacy = time_it(lambda ts: [legacy_score(t, c) for t, c in zip(ts, cleaned)], texts, args.repeat)
+        compiled = time_it(lambda ts: [score_text(t, c) for t, c in zip(ts, cleaned)], texts, args.repeat)
+        batch = time_it(score_many, texts, args.repeat)
+        words = sum(len(c.split()) for c in cleaned)
+        print(f"{name}: legacy {legacy * 1000:.1f} ms | compiled {compiled * 1000:.1f} ms "
+              f"({legacy / compiled:.1f}x, {words / compiled / 1e6:.2f}M words/s) | "
+              f"score_many incl. cleaning {batch * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Concurrent chat completions against the local fake LLM server.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_llm_client --requests 64 --latency 0.2 --error-rate 0.1
+
+Compares the shared async client (keep-alive pool, concurrency limit, retries
+with jitter) with issuing the same calls one after another, which is what a
+blocking call inside an ``async def`` handler amounts to.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_backends import FakeLLMServer
+from services.llm_client import LLMClient
+
+MESSAGES = [{"role": "user", "content": "omg hey"}]
+
+
+async def run_concurrent(client: LLMClient, count: int) -> int:
+    results = await asyncio.gather(
+        *(client.chat(MESSAGES, model="fake") for _ in range(count)), return_exceptions=True
+    )
+    return sum(1 for r in results if isinstance(r, Exception))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    with FakeLLMServer(latency=args.latency, error_rate=args.error_rate) as server:
+        client = LLMClient(base_url=server.base_url, max_concurrency=args.concurrency,
+                           max_retries=3, backoff_base=0.05)
+
+        started = time.perf_counter()
+        failures = asyncio.run(run_concurrent(client, args.requests))
+        elapsed = time.perf_counter() - started
+        print(f"async pooled : {args.requests} calls in {elapsed:.2f}s "
+              f"({args.requests / elapsed:.1f} req/s, {failures} failed, "
+              f"{server.requests} upstream requests, {server.errors} injected errors)")
+
+        started = time.perf_counter()
+        failures = 0
+        for _ in range(args.requests):
+            try:
+                client.chat_sync(MESSAGES, model="fake")
+            except Exception:
+                failures += 1
+        elapsed = time.perf_counter() - started
+        print(f"serialized   : {args.requests} calls in {elapsed:.2f}s "
+              f"({args.requests / elapsed:.1f} req/s, {failures} failed)")
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
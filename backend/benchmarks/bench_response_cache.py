@@ -0,0 +1,107 @@
+"""Chat-turn LLM latency with and without the opener response cache.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_response_cache --turns 400 --concurrency 8 --opener-share 0.5
+
+Plays ``--turns`` chat turns through ``get_llm_response`` against
+``FakeLLMServer`` (``--latency`` per call, every reply unique).  A share of
+them are short openers in assorted spellings ("hey", "HEY 😭", "omg!!",
+"what's up?"); the rest are longer, distinct prompts that are never cached.
+Reports latency, upstream calls, hit rate and latency saved with the cache
+off and with pools of 1 and 3 variants, plus a burst of identical
+concurrent openers to show single-flight.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_backends import FakeLLMServer
+
+OPENERS = ("hey", "Hey!!", "HEY 😭", "heyy", "omg", "OMG 😭😭", "omg!!!", "what's up", "whats up?",
+           "What's up 👀", "hiii", "hi", "Hi!", "lol", "LOL 💀", "wait what", "Wait... what?!", "ugh")
+TOPICS = ("my cow", "the school play", "my landlord", "a dream I had", "the group chat", "my sister")
+
+
+def workload(turns: int, opener_share: float, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    prompts = []
+    for i in range(turns):
+        if rng.random() < opener_share:
+            # Zipf-ish: a few openers dominate
+            prompts.append(OPENERS[min(len(OPENERS) - 1, int(rng.paretovariate(1.2)) - 1)])
+        else:
+            prompts.append(f"So {rng.choice(TOPICS)} did something wild today, turn {i}, let me explain")
+    return prompts
+
+
+async def play(llm, prompts: list, concurrency: int) -> list:
+    limit = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def turn(i, prompt):
+        async with limit:
+            started = time.perf_counter()
+            await llm.get_llm_response(prompt, session_id=f"bench-{i % 50}")
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(turn(i, p) for i, p in enumerate(prompts)))
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--opener-share", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake LLM seconds per call")
+    parser.add_argument("--burst", type=int, default=20, help="identical openers sent at once")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(latency=args.latency, vary=True).start()
+    workdir = tempfile.mkdtemp(prefix="dramabot-response-cache-")
+    os.environ.update({"USE_MOCK": "false", "GROQ_API_KEY": "fake-key", "LLM_BASE_URL": server.base_url,
+                       "MEMORY_DB_PATH": str(Path(workdir) / "bench.db")})
+    with contextlib.redirect_stdout(io.StringIO()):
+        from memory.session_memory import init_db
+        from services import llm
+        from services.response_cache import ResponseCache
+        init_db()
+
+    prompts = workload(args.turns, args.opener_share)
+    print(f"{args.turns} turns ({args.opener_share:.0%} openers), {args.concurrency} at a time, "
+          f"{args.latency * 1000:.0f} ms per upstream call")
+    try:
+        for label, cache in (("cache off", ResponseCache(enabled=False)),
+                             ("1 variant", ResponseCache(enabled=True, variants=1)),
+                             ("3 variants", ResponseCache(enabled=True, variants=3))):
+            llm.response_cache = cache
+            before = server.requests
+            with contextlib.redirect_stdout(io.StringIO()):
+                latencies = asyncio.run(play(llm, prompts, args.concurrency))
+            stats = cache.stats()
+            print(f"  {label:<11} p50 {statistics.median(latencies) * 1000:6.1f} ms  "
+                  f"mean {statistics.mean(latencies) * 1000:6.1f} ms  upstream calls {server.requests - before:4d}  "
+                  f"hit rate {stats['hit_rate']:.0%} ({stats['hits']} hits, {stats['shared']} shared)  "
+                  f"saved {stats['saved_ms'] / 1000:5.1f} s")
+
+        for label, enabled in (("burst, off", False), ("burst, on", True)):
+            llm.response_cache = ResponseCache(enabled=enabled, variants=3)
+            before = server.requests
+            with contextlib.redirect_stdout(io.StringIO()):
+                asyncio.run(play(llm, ["omg 😭"] * args.burst, args.burst))
+            print(f"  {label:<11} {args.burst} identical openers at once → {server.requests - before} upstream calls")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
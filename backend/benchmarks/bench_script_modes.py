@@ -0,0 +1,124 @@
+"""Script generation wall-clock: one long completion vs. outline + parallel scenes.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_script_modes --scenes 5 --scene-words 450 --token-delay 0.004
+
+Points the LLM client at ``FakeLLMServer`` answering like a playwright
+model: a JSON outline, a scene of ``--scene-words`` words, or (for the
+single-shot prompt) the whole play at once.  Each word costs
+``--token-delay`` seconds and replies are cut at the request's
+``max_tokens``, so the single-shot play grows linearly with its length and
+loses its last scenes to the 1500-token cap.  For each mode it reports
+time to the complete script, time to the first finished scene (outline
+mode streams scenes as they complete), length, and how many of the
+planned scenes made it into the script.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_backends import FakeLLMServer
+
+CHARACTERS = ("Bessie", "Moon", "Farmer Joe")
+SCENE_REQUEST = re.compile(r"Write ONLY scene (\d+) of (\d+): (.+)")
+
+
+def heading(number: int) -> str:
+    return f"Act {(number + 1) // 2}, Scene {number}: The farm, part {number}"
+
+
+def scene_text(number: int, words: int) -> str:
+    lines, count, i = [heading(number), "", "(Lights rise.)"], 0, 0
+    while count < words:
+        line = " ".join(["moo"] * 12)
+        lines.append(f"{CHARACTERS[i % len(CHARACTERS)]}: {line}.")
+        count += 13
+        i += 1
+    return "\n".join(lines)
+
+
+def playwright(scenes: int, scene_words: int):
+    def respond(request: dict) -> str:
+        prompt = request["messages"][-1]["content"]
+        if "Reply with JSON only" in prompt:
+            return json.dumps({
+                "title": "Cattle Dreams",
+                "characters": [{"name": name, "trait": "somebody with a part to play"} for name in CHARACTERS],
+                "scenes": [{"heading": heading(n), "beats": ["something happens", "something changes"]}
+                           for n in range(1, scenes + 1)],
+            })
+        match = SCENE_REQUEST.search(prompt)
+        if match:
+            return scene_text(int(match.group(1)), scene_words)
+        cast = "\n".join(f"- {name}: somebody with a part to play" for name in CHARACTERS)
+        return f"🎬 Title: Cattle Dreams\n\n**Characters:**\n{cast}\n\n" + "\n\n".join(
+            scene_text(n, scene_words) for n in range(1, scenes + 1))
+    return respond
+
+
+async def generate(stream_script, session_id: str, mode: str) -> dict:
+    started = time.perf_counter()
+    first_scene, result = None, None
+    async for event, data in stream_script(session_id, mode):
+        if event == "scene" and first_scene is None:
+            first_scene = time.perf_counter() - started
+        if event == "done":
+            result = data
+    elapsed = time.perf_counter() - started
+    return {"elapsed": elapsed, "first_scene": first_scene or elapsed, "script": result["script"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenes", type=int, default=5)
+    parser.add_argument("--scene-words", type=int, default=450)
+    parser.add_argument("--token-delay", type=float, default=0.004, help="fake LLM seconds per generated word")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake LLM time to first token (s)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    llm = FakeLLMServer(latency=args.latency, token_delay=args.token_delay,
+                        respond=playwright(args.scenes, args.scene_words)).start()
+    workdir = tempfile.mkdtemp(prefix="dramabot-script-modes-")
+    os.environ.update({"USE_MOCK": "false", "GROQ_API_KEY": "fake-key", "LLM_BASE_URL": llm.base_url,
+                       "MEMORY_DB_PATH": str(Path(workdir) / "bench.db"),
+                       "SCRIPT_MAX_SCENES": str(args.scenes)})
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from memory.session_memory import add_many_to_memory, init_db
+        from services.llm import stream_script_from_conversation
+        from services.table_read import parse_script
+        init_db()
+
+    print(f"{args.scenes} scenes × ~{args.scene_words} words, {args.token_delay * 1000:.1f} ms/word, "
+          f"{args.latency * 1000:.0f} ms first-token latency (median of {args.runs})")
+    try:
+        for mode in ("single", "outline"):
+            runs = []
+            for run in range(args.runs):
+                session_id = f"{mode}-{run}"  # fresh session each run: no script cache hits
+                add_many_to_memory(session_id, [("user", "My cow wants to be a Broadway star 😭"),
+                                                ("assistant", "Omg wait, Bessie on stage?? Tell me everything")])
+                with contextlib.redirect_stdout(io.StringIO()):
+                    runs.append(asyncio.run(generate(stream_script_from_conversation, session_id, mode)))
+            script = runs[-1]["script"]
+            written = len([c for c in parse_script(script).chapters if "Scene" in c])
+            print(f"  {mode:<8} full script {statistics.median(r['elapsed'] for r in runs):6.2f} s   "
+                  f"first scene {statistics.median(r['first_scene'] for r in runs):6.2f} s   "
+                  f"{len(script.split()):5d} words   scenes {written}/{args.scenes}")
+    finally:
+        llm.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Per-turn session memory cost as the memory table grows.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_session_memory --rows 1000000
+
+A "turn" replays the calls one ``/voice/interact`` request makes against the
+store (middleware read, two inserts, two re-reads, the duplicate inserts in
+``voice_interact``, dump and stats).  With ``--legacy`` the same turn is run
+against an unindexed table opening a fresh connection per call, as before.
+"""
+import argparse
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from memory.store import SQLiteStore, SQL_INSERT
+
+ROWS_PER_SESSION = 40
+TURNS_PER_CHECKPOINT = 200
+
+
+def fill(store: SQLiteStore, start: int, stop: int):
+    """Bulk-insert rows [start, stop), ROWS_PER_SESSION messages per session."""
+    batch = []
+    for i in range(start, stop):
+        batch.append((f"s{i // ROWS_PER_SESSION}", "user" if i % 2 else "assistant", "x" * 80, float(i)))
+        if len(batch) == 50_000:
+            store.add_many(batch)
+            batch.clear()
+    if batch:
+        store.add_many(batch)
+
+
+def pooled_turn(store: SQLiteStore, session_id: str):
+    now = time.time()
+    store.fetch_conversation(session_id)
+    store.add_many([(session_id, "user", "hey", now)])
+    store.add_many([(session_id, "assistant", "omg hi", now)])
+    store.fetch_conversation(session_id)
+    store.fetch_conversation(session_id)
+    store.add_many([(session_id, "user", "hey", now), (session_id, "bot", "omg hi", now)])
+    store.fetch_rows(session_id)
+    store.count(session_id)
+
+
+def legacy_turn(path: Path, session_id: str):
+    def call(sql, params, commit=False):
+        with sqlite3.connect(path) as conn:
+            rows = conn.execute(sql, params).fetchall()
+            if commit:
+                conn.commit()
+            return rows
+
+    now = time.time()
+    select = "SELECT role, content FROM memory WHERE session_id = ? ORDER BY timestamp ASC"
+    call(select, (session_id,))
+    call(SQL_INSERT, (session_id, "user", "hey", now), commit=True)
+    call(SQL_INSERT, (session_id, "assistant", "omg hi", now), commit=True)
+    call(select, (session_id,))
+    call(select, (session_id,))
+    call(SQL_INSERT, (session_id, "user", "hey", now), commit=True)
+    call(SQL_INSERT, (session_id, "bot", "omg hi", now), commit=True)
+    call("SELECT * FROM memory WHERE session_id = ?", (session_id,))
+    call("SELECT COUNT(*) FROM memory WHERE session_id = ?", (session_id,))
+
+
+def measure(turn, target, turns: int, sessions: int) -> dict:
+    samples = []
+    for _ in range(turns):
+        session_id = f"s{random.randrange(sessions)}"
+        started = time.perf_counter()
+        turn(target, session_id)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--checkpoints", type=int, default=4)
+    parser.add_argument("--legacy", action="store_true", help="also time the pre-pool code path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        store = SQLiteStore(path)
+        if args.legacy:
+            # Build the v1 schema only; the legacy turn never uses the index
+            with sqlite3.connect(path) as conn:
+                conn.execute("PRAGMA user_version=1")
+                conn.execute("CREATE TABLE memory (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                             "session_id TEXT, role TEXT, content TEXT, timestamp REAL)")
+        filled = 0
+        for checkpoint in range(1, args.checkpoints + 1):
+            target_rows = args.rows * checkpoint // args.checkpoints
+            if args.legacy:
+                with sqlite3.connect(path) as conn:
+                    conn.executemany(SQL_INSERT, (
+                        (f"s{i // ROWS_PER_SESSION}", "user", "x" * 80, float(i)) for i in range(filled, target_rows)
+                    ))
+            else:
+                fill(store, filled, target_rows)
+            filled = target_rows
+
+            if args.legacy:
+                result = measure(legacy_turn, path, TURNS_PER_CHECKPOINT // 10, filled // ROWS_PER_SESSION)
+            else:
+                result = measure(pooled_turn, store, TURNS_PER_CHECKPOINT, filled // ROWS_PER_SESSION)
+            print(f"rows={filled:>9,}  per-turn p50={result['p50_ms']:.3f} ms  p95={result['p95_ms']:.3f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
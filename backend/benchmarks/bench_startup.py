@@ -0,0 +1,111 @@
+"""Cold-start cost of a worker: import time and time to first request.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_startup --runs 7
+
+Each run is a fresh interpreter (what a new uvicorn/gunicorn worker pays):
+it times ``import main``, then drives the ASGI app directly through lifespan
+startup and a first ``GET /`` and ``GET /health`` (no HTTP client or server,
+so only the app's own cost is measured).  Runs with engines loaded lazily
+(the default) and with ``BACKEND_WARMUP=all`` (every engine built in the
+lifespan hook, i.e. what the old import-time setup paid), and lists which
+heavy modules were imported by the time the first request was answered.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("groq", "gtts", "numpy", "httpx", "emoji", "elevenlabs", "pydub")
+
+CHILD = r"""
+import asyncio, json, sys, time
+
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+
+async def drive():
+    inbox, outbox = asyncio.Queue(), asyncio.Queue()
+    await inbox.put({"type": "lifespan.startup"})
+    lifespan = asyncio.create_task(main.app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}},
+                                            inbox.get, outbox.put))
+    assert (await outbox.get())["type"] == "lifespan.startup.complete"
+    ready = time.perf_counter()
+    statuses = []
+    for path in ("/", "/health"):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+                 "root_path": "", "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80)}
+        await main.app(scope, receive, send)
+        statuses.append(sent[0]["status"])
+        if path == "/":
+            first = time.perf_counter()
+    await inbox.put({"type": "lifespan.shutdown"})
+    await lifespan
+    return ready, first, statuses
+
+
+ready, first, statuses = asyncio.run(drive())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "startup_ms": (ready - imported) * 1000,
+    "first_request_ms": (first - started) * 1000,
+    "statuses": statuses,
+    "modules": [m for m in HEAVY if m in sys.modules],
+}))
+"""
+
+
+def run_once(warmup: str, workdir: str) -> dict:
+    env = dict(os.environ, BACKEND_WARMUP=warmup, GROQ_API_KEY=os.getenv("GROQ_API_KEY", "bench-key"),
+               MEMORY_DB_PATH=str(Path(workdir) / "startup.db"),
+               AUDIO_CACHE_DIR=str(Path(workdir) / "audio"))
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + CHILD
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=workdir, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Run against a copy so the child's cwd-relative paths (static/, .env) stay out of the tree
+    workdir = tempfile.mkdtemp(prefix="dramabot-startup-")
+    shutil.copytree(BACKEND_DIR, workdir, dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns("*.db", "static", "results", "__pycache__"))
+    try:
+        run_once("", workdir)  # populate the bytecode cache so every measured run is equal
+        for label, warmup in (("lazy", ""), ("warm-up all", "all")):
+            runs = [run_once(warmup, workdir) for _ in range(args.runs)]
+            median = {key: statistics.median(r[key] for r in runs)
+                      for key in ("import_ms", "startup_ms", "first_request_ms")}
+            print(f"{label:<12} import {median['import_ms']:7.1f} ms  "
+                  f"lifespan {median['startup_ms']:7.1f} ms  "
+                  f"first request {median['first_request_ms']:7.1f} ms  "
+                  f"(median of {args.runs}, statuses {runs[-1]['statuses']})")
+            print(f"{'':<12} heavy modules loaded: {', '.join(runs[-1]['modules']) or 'none'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""Several worker processes sharing one state backend: correctness and cost.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_state_backends --workers 4 --sessions 20 --turns 10
+
+For each backend (a SQLite/WAL file, and the RESP key-value store against
+``FakeKVServer``) it starts ``--workers`` processes that play interleaved
+voice turns on the same sessions through their own ``ConversationCache``:
+read the conversation, then append a user + bot pair.  It then checks that
+no turn was lost and that every worker's cached view matches the store.
+It also checks that concurrent TTS renders of one clip and duplicate script
+job submissions still do the work only once across workers.  The same
+workload with ``shared=False`` (each process trusts its own cache, as a
+single worker may) shows what goes wrong without coherence: cached views
+that miss other workers' turns, clips rendered once per worker and the
+same script job started by every worker.
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_backends import FakeKVServer, fake_mp3
+
+RENDER_DELAY = 0.05
+
+
+def make_store(backend: str, target: str):
+    if backend == "sqlite":
+        from memory.store import SQLiteStore
+        return SQLiteStore(Path(target))
+    from memory.kv_store import KVStore
+    return KVStore(target)
+
+
+def worker(*args):
+    with contextlib.redirect_stdout(io.StringIO()):  # keep the app's own logging out of the report
+        play(*args)
+
+
+def play(backend: str, target: str, shared: bool, worker_id: int, sessions: int, turns: int,
+         audio_dir: str, clips: int, barrier, results):
+    from memory.cache import ConversationCache
+    from services.audio_cache import AudioCache
+    from services.jobs import JobQueue
+
+    store = make_store(backend, target)
+    cache = ConversationCache(store, durability="sync", shared=shared)
+    barrier.wait()
+
+    # Interleaved turns: every worker touches every session each round
+    latencies = []
+    began_all = time.perf_counter()
+    for turn in range(turns):
+        for s in range(sessions):
+            session_id = f"session-{s}"
+            began = time.perf_counter()
+            cache.get(session_id)
+            cache.extend(session_id, [("user", f"w{worker_id} t{turn}"), ("bot", "omg")])
+            latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - began_all
+    barrier.wait()  # everyone is done writing: every cached view should now match the store
+    stale_views = sum(cache.get(f"session-{s}") != store.fetch_conversation(f"session-{s}")
+                      for s in range(sessions))
+
+    # Same clips rendered concurrently by every worker
+    renders = []
+
+    def render(path):
+        renders.append(path)
+        time.sleep(RENDER_DELAY)
+        Path(path).write_bytes(fake_mp3("clip"))
+
+    audio = AudioCache(directory=Path(audio_dir), leases=store if shared else None)
+    barrier.wait()
+    for clip in range(clips):
+        audio.get_or_create(f"clip{clip:060d}", render)
+
+    # Same script job submitted by every worker
+    jobs = JobQueue(workers=1, store=store if shared else None)
+    barrier.wait()
+    job, deduplicated = jobs.submit("script", time.sleep, 0.2, dedup_key="session-0:same-state")
+    if not deduplicated:
+        job.finished_event.wait(5)
+    jobs.shutdown()
+
+    results.put({"latencies": latencies, "elapsed": elapsed, "stale_views": stale_views,
+                 "renders": len(renders), "job_id": job.id})
+    store.close()
+
+
+def run(backend: str, target: str, shared: bool, args) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    barrier, results = ctx.Barrier(args.workers), ctx.Queue()
+    audio_dir = tempfile.mkdtemp(prefix="dramabot-state-audio-")
+    procs = [ctx.Process(target=worker, args=(backend, target, shared, i, args.sessions, args.turns,
+                                              audio_dir, args.clips, barrier, results))
+             for i in range(args.workers)]
+    for proc in procs:
+        proc.start()
+    outcomes = [results.get(timeout=300) for _ in procs]
+    wall = max(o["elapsed"] for o in outcomes)
+    for proc in procs:
+        proc.join()
+
+    store = make_store(backend, target)
+    expected = args.workers * args.turns * 2
+    lost = sum(expected - store.count(f"session-{s}") for s in range(args.sessions))
+    store.close()
+    latencies = sorted(t for o in outcomes for t in o["latencies"])
+    return {
+        "turns_per_s": len(latencies) / wall,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "lost_messages": lost,
+        "stale_views": sum(o["stale_views"] for o in outcomes),
+        "renders": sum(o["renders"] for o in outcomes),
+        "jobs_started": len({o["job_id"] for o in outcomes}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10, help="turns per session per worker")
+    parser.add_argument("--clips", type=int, default=3, help="distinct TTS clips rendered by every worker")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="dramabot-state-")
+    os.environ["MEMORY_DB_PATH"] = str(Path(workdir) / "unused.db")
+    print(f"{args.workers} workers × {args.sessions} sessions × {args.turns} turns, {args.clips} shared clips")
+    with FakeKVServer() as kv:
+        for backend in ("sqlite", "kv"):
+            for shared in (True, False):
+                if backend == "sqlite":
+                    target = str(Path(workdir) / f"state-{shared}.db")
+                else:
+                    target = kv.base_url
+                    kv._execute_many([["FLUSHDB"]])
+                r = run(backend, target, shared, args)
+                print(f"  {backend:<6} shared={str(shared):<5} {r['turns_per_s']:7.0f} turns/s  "
+                      f"p50 {r['p50_ms']:5.2f} ms  p95 {r['p95_ms']:5.2f} ms  lost={r['lost_messages']}  "
+                      f"stale views={r['stale_views']:<4} renders={r['renders']}/{args.clips}  "
+                      f"jobs run={r['jobs_started']}/1")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
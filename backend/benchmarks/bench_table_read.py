@@ -0,0 +1,110 @@
+"""Whole-play table read: lines rendered one after another vs. on the worker pool.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_table_read --scenes 5 --lines 40 --latency 0.2
+
+Builds a synthetic play (a 15–20 minute script is roughly 200 lines) and
+renders it through ``render_table_read`` with the in-process ``FakeGTTS``
+engine, whose per-line latency is ``--latency`` plus up to ``--jitter``:
+
+- ``sequential``: one worker, i.e. the sum of every line
+- ``parallel``: the ``TABLE_READ_MAX_CONCURRENCY`` pool (``--workers``)
+- ``cached``: the same play again (track served from the audio cache)
+- ``one line added``: only the new line is rendered
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_backends import FakeGTTS, FakeTTSEngine
+
+CHARACTERS = ("Bessie", "Moon", "Farmer Joe", "The Rooster")
+WORDS = ("the", "stage", "lights", "cow", "dream", "moon", "barn", "applause", "tonight", "really",
+         "never", "always", "wonder", "spark", "crowd", "fair", "gasps", "chewing", "grass", "heart")
+
+
+def synthetic_play(scenes: int, lines: int, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    out = ["🎭 *The Cow Who Wanted Applause*", "", "**Characters:**"]
+    out += [f"- {name}: somebody with a part to play" for name in CHARACTERS]
+    for scene in range(1, scenes + 1):
+        out += ["", f"**Act {scene}**", f"Scene: Somewhere on the farm, part {scene}", ""]
+        for i in range(lines):
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize()
+            if i % 6 == 5:
+                out.append(f"*({sentence}.)*")
+            else:
+                out.append(f"**{CHARACTERS[i % len(CHARACTERS)]}:** {sentence}!")
+    return "\n".join(out)
+
+
+class JitteredGTTS(FakeGTTS):
+    jitter = 0.0
+
+    def save(self, path: str):
+        time.sleep(random.random() * self.jitter)
+        super().save(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenes", type=int, default=5)
+    parser.add_argument("--lines", type=int, default=40, help="lines per scene")
+    parser.add_argument("--latency", type=float, default=0.2, help="fake TTS seconds per line")
+    parser.add_argument("--jitter", type=float, default=0.2, help="extra random seconds per line")
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="dramabot-table-read-")
+    os.environ.update({"MEMORY_DB_PATH": str(Path(workdir) / "bench.db"), "TTS_ENGINE": "fake",
+                       "TABLE_READ_MAX_CONCURRENCY": str(args.workers)})
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import services.table_read as table_read
+        from services.audio_cache import AudioCache
+        from services.bulkhead import Bulkhead
+        from services.registry import backends
+
+    class JitteredEngine(FakeTTSEngine):
+        def render(self, text: str, path: str, lang: str = "en", voice: str = None):
+            JitteredGTTS(text, lang=lang, tld=voice).save(path)
+
+    backends.register("tts", "fake", JitteredEngine)
+    JitteredGTTS.configure(latency=args.latency)
+    JitteredGTTS.jitter = args.jitter
+    play = synthetic_play(args.scenes, args.lines)
+
+    def run(label: str, script: str, workers: int, cache_dir: str):
+        table_read.table_read_bulkhead = Bulkhead("table_read", workers, 4096)
+        table_read.audio_cache = AudioCache(directory=Path(workdir) / cache_dir)
+        before = JitteredGTTS.requests
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = asyncio.run(table_read.render_table_read(script))
+        elapsed = time.perf_counter() - started
+        table_read.table_read_bulkhead.shutdown()
+        print(f"  {label:<16} {elapsed:7.2f} s  {JitteredGTTS.requests - before:4d} lines rendered  "
+              f"{result['cached_segments']:4d} cached  track {result['duration_ms'] / 1000:6.1f} s, "
+              f"{len(result['chapters'])} chapters")
+        return result
+
+    print(f"{args.scenes} scenes × {args.lines} lines, {args.latency * 1000:.0f}–"
+          f"{(args.latency + args.jitter) * 1000:.0f} ms per line, {args.workers} workers")
+    run("sequential", play, 1, "sequential")
+    result = run("parallel", play, args.workers, "parallel")
+    run("cached", play, args.workers, "parallel")
+    edited = play.replace("part 3\n\n**", "part 3\n\n**Moon:** One brand new line!\n**", 1)
+    run("one line added", edited, args.workers, "parallel")
+    print(f"  cast: {result['voices']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
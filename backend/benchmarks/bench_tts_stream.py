@@ -0,0 +1,129 @@
+"""Time to first audio byte: streamed ElevenLabs TTS vs. render-then-download.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_tts_stream --clips 20 --concurrency 5
+
+Serves the app with uvicorn against ``FakeElevenLabsServer`` (which sends
+the clip in chunks, ``--chunk-delay`` apart, like a real synthesis stream)
+and, for distinct texts, compares:
+
+- ``render``: ``POST /voice/tts`` then ``GET`` the returned URL (the
+  whole clip is synthesized and saved before the client sees a byte)
+- ``stream``: ``POST /voice/tts/stream``, chunked ``audio/mpeg``
+- ``stream (cached)``: the same texts again, served from the audio cache
+
+and checks that every streamed clip equals its cached copy.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.fake_backends import FakeElevenLabsServer
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+TEXT = "Clip {i}: the cow walks on stage, the crowd gasps, and nobody can believe it! " * 3
+
+
+async def render(client: httpx.AsyncClient, i: int) -> dict:
+    started = time.perf_counter()
+    response = await client.post("/voice/tts", json={"text": TEXT.format(i=i), "session_id": "bench"})
+    audio = await client.get(response.json()["audio_url"])
+    done = time.perf_counter() - started
+    return {"ttfb": done, "total": done, "bytes": len(audio.content), "url": response.json()["audio_url"]}
+
+
+async def stream(client: httpx.AsyncClient, i: int) -> dict:
+    started = time.perf_counter()
+    ttfb, body = None, bytearray()
+    async with client.stream("POST", "/voice/tts/stream",
+                             json={"text": TEXT.format(i=i), "session_id": "bench"}) as response:
+        async for chunk in response.aiter_raw():
+            if ttfb is None:
+                ttfb = time.perf_counter() - started
+            body.extend(chunk)
+    return {"ttfb": ttfb, "total": time.perf_counter() - started, "bytes": len(body), "body": bytes(body),
+            "url": response.headers["x-audio-url"], "cache": response.headers["x-audio-cache"]}
+
+
+async def run(base_url: str, fn, offset: int, args) -> list:
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def one(i):
+        async with limit:
+            return await fn(client, offset + i)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        return await asyncio.gather(*(one(i) for i in range(args.clips)))
+
+
+def report(label: str, results: list):
+    ttfb = statistics.median(r["ttfb"] for r in results) * 1000
+    total = statistics.median(r["total"] for r in results) * 1000
+    print(f"  {label:<16} first byte p50 {ttfb:7.1f} ms   full clip p50 {total:7.1f} ms   "
+          f"{statistics.mean(r['bytes'] for r in results):8.0f} B/clip")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.15, help="fake ElevenLabs time to first chunk (s)")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="fake ElevenLabs gap between chunks (s)")
+    parser.add_argument("--chunk-bytes", type=int, default=2048)
+    args = parser.parse_args()
+
+    # static/ (where cached clips are served from) is relative to the cwd: keep it out of the tree
+    workdir = tempfile.mkdtemp(prefix="dramabot-tts-stream-")
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.chdir(workdir)
+    elevenlabs = FakeElevenLabsServer(latency=args.latency, chunk_delay=args.chunk_delay,
+                                      chunk_bytes=args.chunk_bytes).start()
+    os.environ.update({
+        "GROQ_API_KEY": "bench-key",
+        "ELEVENLABS_BASE_URL": elevenlabs.base_url,
+        "ELEVENLABS_API_KEY": "fake-key",
+        "TTS_ENGINE": "elevenlabs",
+        "MEMORY_DB_PATH": str(Path(workdir) / "bench.db"),
+    })
+
+    from benchmarks.loadtest import free_port, start_app
+
+    port = free_port()
+    with contextlib.redirect_stdout(io.StringIO()):
+        server, thread = start_app(port)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        print(f"{args.clips} clips, {args.concurrency} at a time; fake ElevenLabs: {args.latency * 1000:.0f} ms "
+              f"to first chunk, {args.chunk_bytes} B chunks every {args.chunk_delay * 1000:.0f} ms")
+        with contextlib.redirect_stdout(io.StringIO()):
+            rendered = asyncio.run(run(base_url, render, 0, args))
+            streamed = asyncio.run(run(base_url, stream, args.clips, args))
+            cached = asyncio.run(run(base_url, stream, args.clips, args))
+        report("render", rendered)
+        report("stream", streamed)
+        report("stream (cached)", cached)
+
+        # Every streamed clip was teed into the cache, byte for byte, at its own path
+        with httpx.Client(base_url=base_url) as client:
+            mismatched = sum(client.get(r["url"]).content != r["body"] for r in streamed)
+        print(f"  cache: {sum(r['cache'] == 'hit' for r in cached)}/{args.clips} hits on replay, "
+              f"{len({r['url'] for r in streamed})} distinct paths, {mismatched} mismatched clips, "
+              f"{elevenlabs.requests} upstream requests")
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        elevenlabs.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""State-store round trips per voice turn, per durability mode.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_turn_round_trips --sessions 4 --turns 12
+
+Plays voice turns through the app (``TestClient``, fake Whisper and LLM
+servers, fake TTS) and counts every call that reaches the state store:
+writes (transactions) and reads per turn, and rows stored per turn, for
+``/voice/interact`` and ``/voice/interact/stream`` in each mode:
+
+- ``sync``: one process, every turn written before the response
+- ``shared``: state shared with other workers (sync writes + revalidation)
+- ``write-behind``: rows flushed in background batches (not per turn)
+
+Turns past ``CONTEXT_MAX_RECENT_MESSAGES`` also update the rolling summary.
+Exits non-zero if a sync or shared turn takes anything but exactly one
+write round trip.
+"""
+import argparse
+import contextlib
+import functools
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.fake_backends import FakeLLMServer, FakeTTSEngine, FakeWhisperServer
+from benchmarks.loadtest import speech_like_wav
+
+WRITES = ("add_many", "append", "write_turn", "save_summary", "delete_script", "save_script", "delete")
+READS = ("generation", "fetch_versioned", "fetch_conversation", "fetch_rows", "count", "fetch_summary",
+         "fetch_script")
+
+
+class Counter:
+    def __init__(self, store):
+        self.calls = {"write": 0, "read": 0}
+        for kind, names in (("write", WRITES), ("read", READS)):
+            for name in names:
+                if hasattr(store, name):
+                    setattr(store, name, self._counted(kind, getattr(store, name)))
+
+    def _counted(self, kind: str, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            self.calls[kind] += 1
+            return fn(*args, **kwargs)
+        return wrapper
+
+    def snapshot(self) -> dict:
+        return dict(self.calls)
+
+
+def play_turn(client, endpoint: str, session_id: str, clip: bytes):
+    files = {"file": ("turn.wav", clip, "audio/wav")}
+    response = client.post(endpoint, files=files, data={"session_id": session_id})
+    assert response.status_code == 200 and "error" not in response.text[:200], response.text[:200]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=12, help="voice turns per session")
+    args = parser.parse_args()
+
+    whisper = FakeWhisperServer().start()
+    llm = FakeLLMServer(vary=True).start()
+    workdir = tempfile.mkdtemp(prefix="dramabot-round-trips-")
+    os.chdir(workdir)
+    os.environ.update({
+        "USE_MOCK": "false",
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_BASE_URL": whisper.base_url,
+        "LLM_BASE_URL": llm.base_url,
+        "TTS_ENGINE": "fake",
+        "MEMORY_DB_PATH": str(Path(workdir) / "bench.db"),
+        "MEMORY_FLUSH_INTERVAL_MS": "3600000",  # write-behind: flush only when asked
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        from fastapi.testclient import TestClient
+
+        import main as app_module
+        from memory import session_memory
+        from memory.cache import ConversationCache
+        from services.registry import backends
+        backends.register("tts", "fake", FakeTTSEngine)
+
+    counter = Counter(session_memory.store)
+    clip = speech_like_wav()
+    failures = 0
+    print(f"{args.sessions} sessions × {args.turns} turns per endpoint and mode")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), TestClient(app_module.app) as client:
+            rows = []
+            for mode, durability, shared in (("sync", "sync", False), ("shared", "sync", True),
+                                              ("write-behind", "write-behind", False)):
+                session_memory.cache = ConversationCache(session_memory.store, durability=durability, shared=shared)
+                for endpoint in ("/voice/interact", "/voice/interact/stream"):
+                    per_turn = []
+                    sessions = [f"{mode}-{endpoint.rsplit('/', 1)[-1]}-{i}" for i in range(args.sessions)]
+                    for _ in range(args.turns):
+                        for session_id in sessions:
+                            before = counter.snapshot()
+                            play_turn(client, endpoint, session_id, clip)
+                            after = counter.snapshot()
+                            per_turn.append({kind: after[kind] - before[kind] for kind in after})
+                    session_memory.cache.flush()
+                    stored = sum(session_memory.store.count(s) for s in sessions)
+                    writes = sorted({turn["write"] for turn in per_turn})
+                    if mode != "write-behind" and writes != [1]:
+                        failures += 1
+                    rows.append((mode, endpoint, per_turn, writes, stored / len(per_turn)))
+
+        for mode, endpoint, per_turn, writes, rows_per_turn in rows:
+            n = len(per_turn)
+            print(f"  {mode:<12} {endpoint:<23} writes/turn {sum(t['write'] for t in per_turn) / n:4.2f} "
+                  f"(min {writes[0]}, max {writes[-1]})  reads/turn {sum(t['read'] for t in per_turn) / n:4.2f}  "
+                  f"rows/turn {rows_per_turn:4.2f}")
+    finally:
+        whisper.stop()
+        llm.stop()
+    if failures:
+        print(f"❌ {failures} sync/shared runs took other than one write round trip per turn")
+        return 1
+    print("✅ every sync/shared turn took exactly one write round trip")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
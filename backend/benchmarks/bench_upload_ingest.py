@@ -0,0 +1,102 @@
+"""Per-request upload ingestion cost: temp-file copy vs. in-memory read.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_upload_ingest
+
+The old ``/voice/interact`` path copied the ``UploadFile`` into a
+``NamedTemporaryFile``, the transcriber reopened and read it, and the file was
+unlinked afterwards.  ``services.uploads.read_upload`` reads the spooled
+upload once into memory.  Each timed request includes Starlette's own spool
+of the body into a ``SpooledTemporaryFile`` (1 MB in-memory threshold, so
+larger clips do hit disk on both paths), then hands the bytes to a
+transcriber; file I/O is read from ``/proc/self/io`` (bytes moved through
+read/write syscalls).
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+
+from fastapi import UploadFile
+
+from services.uploads import read_upload
+
+SPOOL_MAX_SIZE = 1024 * 1024  # Starlette's multipart spool threshold
+
+
+def io_counters() -> dict:
+    try:
+        with open("/proc/self/io") as f:
+            return {k: int(v) for k, v in (line.split(": ") for line in f)}
+    except OSError:
+        return {}
+
+
+def make_upload(payload: bytes) -> UploadFile:
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    spool.write(payload)
+    spool.seek(0)
+    return UploadFile(spool, size=len(payload), filename="clip.mp3")
+
+
+async def legacy_ingest(file: UploadFile) -> int:
+    """The removed path: copy to disk, reopen for the transcriber, unlink."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_audio:
+        shutil.copyfileobj(file.file, temp_audio)
+        temp_path = temp_audio.name
+    try:
+        with open(temp_path, "rb") as audio:
+            return len(audio.read())
+    finally:
+        os.unlink(temp_path)
+
+
+async def memory_ingest(file: UploadFile) -> int:
+    upload = await read_upload(file)
+    return len(upload.data)
+
+
+async def run(ingest, payload: bytes, requests: int) -> dict:
+    before = io_counters()
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        file = make_upload(payload)  # what Starlette does before the handler runs
+        assert await ingest(file) == len(payload)
+        latencies.append(time.perf_counter() - started)
+        file.file.close()
+    after = io_counters()
+    latencies.sort()
+    per = {k: (after[k] - before[k]) / requests for k in ("rchar", "wchar", "syscr", "syscw") if k in after}
+    return {"p50_ms": latencies[len(latencies) // 2] * 1000,
+            "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000, **per}
+
+
+def fmt(result: dict) -> str:
+    io = ""
+    if "wchar" in result:
+        io = (f" | read {result['rchar'] / 1024:.0f} KiB in {result['syscr']:.0f} calls, "
+              f"wrote {result['wchar'] / 1024:.0f} KiB in {result['syscw']:.0f} calls")
+    return f"p50 {result['p50_ms']:.2f} ms p95 {result['p95_ms']:.2f} ms{io}"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--sizes-kb", default="64,512,2048,8192")
+    args = parser.parse_args()
+
+    for size_kb in (int(s) for s in args.sizes_kb.split(",")):
+        payload = os.urandom(size_kb * 1024)
+        legacy = await run(legacy_ingest, payload, args.requests)
+        memory = await run(memory_ingest, payload, args.requests)
+        print(f"{size_kb:>5} KiB upload")
+        print(f"  temp file : {fmt(legacy)}")
+        print(f"  in memory : {fmt(memory)}  ({legacy['p50_ms'] / memory['p50_ms']:.1f}x faster at p50)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
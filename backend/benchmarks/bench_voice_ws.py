@@ -0,0 +1,204 @@
+"""Voice turns over one WebSocket per session vs. a multipart POST + audio GET per turn.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_voice_ws --sessions 20 --turns 5 --idle 500
+
+Serves the app with uvicorn against ``FakeWhisperServer``/``FakeLLMServer``
+and the in-process fake TTS engine, then plays the same voice turns three ways:
+
+- ``http``: ``POST /voice/interact`` (multipart) then ``GET`` the reply audio
+- ``sse``: ``POST /voice/interact/stream`` (multipart), ``GET`` each sentence's
+  audio as its event arrives
+- ``socket``: ``/voice/ws``, clip streamed in as binary frames, transcript,
+  tokens and per-sentence MP3 bytes pushed back on the same connection
+
+and reports per-turn latency and time to first audio byte.  Finally it
+opens ``--idle`` idle sockets and measures what they cost the worker (open
+count, process memory, ping round trip on a busy socket next to them).
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from websockets.asyncio.client import connect
+
+from benchmarks.fake_backends import FakeGTTS, FakeLLMServer, FakeWhisperServer
+from benchmarks.loadtest import free_port, speech_like_wav, start_app
+
+FRAME_BYTES = 16 * 1024
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def http_session(base_url: str, session_id: str, turns: int, clip: bytes) -> list:
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        for _ in range(turns):
+            started = time.perf_counter()
+            response = await client.post("/voice/interact", files={"file": ("turn.wav", clip, "audio/wav")},
+                                         data={"session_id": session_id})
+            audio = await client.get(response.json()["audio_url"])
+            elapsed = time.perf_counter() - started
+            results.append({"turn": elapsed, "first_audio": elapsed, "bytes": len(audio.content)})
+    return results
+
+
+async def sse_session(base_url: str, session_id: str, turns: int, clip: bytes) -> list:
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        for _ in range(turns):
+            started = time.perf_counter()
+            first_audio, received, event = None, 0, None
+            async with client.stream("POST", "/voice/interact/stream", data={"session_id": session_id},
+                                     files={"file": ("turn.wav", clip, "audio/wav")}) as response:
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: ") and event == "audio":
+                        audio = await client.get(json.loads(line[len("data: "):])["audio_url"])
+                        first_audio = first_audio or time.perf_counter() - started
+                        received += len(audio.content)
+            assert event == "done", event
+            results.append({"turn": time.perf_counter() - started, "first_audio": first_audio, "bytes": received})
+    return results
+
+
+async def socket_session(ws_url: str, session_id: str, turns: int, clip: bytes) -> list:
+    results = []
+    async with connect(f"{ws_url}/voice/ws?session_id={session_id}", max_size=None) as ws:
+        assert json.loads(await ws.recv())["event"] == "ready"
+        await ws.send(json.dumps({"type": "start", "filename": "turn.wav"}))
+        for _ in range(turns):
+            started = time.perf_counter()
+            for offset in range(0, len(clip), FRAME_BYTES):
+                await ws.send(clip[offset:offset + FRAME_BYTES])
+            await ws.send(json.dumps({"type": "end"}))
+            first_audio, received = None, 0
+            while True:
+                message = await ws.recv()
+                if isinstance(message, bytes):
+                    first_audio = first_audio or time.perf_counter() - started
+                    received += len(message)
+                    continue
+                event = json.loads(message)["event"]
+                if event in ("done", "error"):
+                    break
+            assert event == "done", message
+            results.append({"turn": time.perf_counter() - started, "first_audio": first_audio, "bytes": received})
+    return results
+
+
+async def play(session, url: str, args, clip: bytes, prefix: str) -> list:
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def one(i):
+        async with limit:
+            return await session(url, f"{prefix}-{i}", args.turns, clip)
+
+    return [turn for turns in await asyncio.gather(*(one(i) for i in range(args.sessions))) for turn in turns]
+
+
+def report(label: str, results: list):
+    print(f"  {label:<7} turn p50 {statistics.median(r['turn'] for r in results) * 1000:7.1f} ms  "
+          f"first audio p50 {statistics.median(r['first_audio'] for r in results) * 1000:7.1f} ms  "
+          f"{statistics.mean(r['bytes'] for r in results):7.0f} B audio/turn")
+
+
+async def idle_sockets(base_url: str, ws_url: str, count: int, pings: int) -> str:
+    before = rss_mb()
+    sockets = []
+    for i in range(count):
+        ws = await connect(f"{ws_url}/voice/ws?session_id=idle-{i}")
+        await ws.recv()  # ready
+        sockets.append(ws)
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        stats = (await client.get("/debug/voice-sockets")).json()
+    grown = rss_mb() - before
+
+    async with connect(f"{ws_url}/voice/ws?session_id=pinger") as ws:
+        await ws.recv()
+        rtts = []
+        for _ in range(pings):
+            started = time.perf_counter()
+            await ws.send(json.dumps({"type": "ping"}))
+            await ws.recv()
+            rtts.append(time.perf_counter() - started)
+    for ws in sockets:
+        await ws.close()
+    return (f"  idle    {stats['open']} sockets open on the worker, +{grown:.1f} MB process RSS "
+          f"(server + client, {grown * 1024 / max(count, 1):.0f} KB/socket), "
+          f"ping p50 {statistics.median(rtts) * 1000:.2f} ms alongside them")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5, help="voice turns per session")
+    parser.add_argument("--concurrency", type=int, default=10, help="sessions in flight at once")
+    parser.add_argument("--whisper-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake LLM time to first token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="fake LLM seconds per token")
+    parser.add_argument("--tts-latency", type=float, default=0.2)
+    parser.add_argument("--idle", type=int, default=500, help="idle sockets to hold open at the end")
+    parser.add_argument("--pings", type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="dramabot-voice-ws-")
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.chdir(workdir)
+    whisper = FakeWhisperServer(latency=args.whisper_latency).start()
+    llm = FakeLLMServer(latency=args.llm_latency, token_delay=args.token_delay, vary=True).start()
+    FakeGTTS.configure(latency=args.tts_latency)
+    os.environ.update({
+        "USE_MOCK": "false",
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_BASE_URL": whisper.base_url,
+        "LLM_BASE_URL": llm.base_url,
+        "TTS_ENGINE": "fake",
+        "MEMORY_DB_PATH": str(Path(workdir) / "bench.db"),
+    })
+
+    port = free_port()
+    with contextlib.redirect_stdout(io.StringIO()):
+        server, thread = start_app(port)
+    base_url, ws_url = f"http://127.0.0.1:{port}", f"ws://127.0.0.1:{port}"
+    clip = speech_like_wav()
+    try:
+        print(f"{args.sessions} sessions × {args.turns} turns, {args.concurrency} at a time, "
+              f"{len(clip) // 1024} KB clip; fake whisper {args.whisper_latency * 1000:.0f} ms, "
+              f"llm {args.llm_latency * 1000:.0f} ms + {args.token_delay * 1000:.0f} ms/token, tts {args.tts_latency * 1000:.0f} ms")
+        with contextlib.redirect_stdout(io.StringIO()):
+            http = asyncio.run(play(http_session, base_url, args, clip, "http"))
+            sse = asyncio.run(play(sse_session, base_url, args, clip, "sse"))
+            socket = asyncio.run(play(socket_session, ws_url, args, clip, "ws"))
+        report("http", http)
+        report("sse", sse)
+        report("socket", socket)
+        with contextlib.redirect_stdout(io.StringIO()):
+            idle = asyncio.run(idle_sockets(base_url, ws_url, args.idle, args.pings))
+        print(idle)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        whisper.stop()
+        llm.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,465 @@
+"""Local stand-ins for DramaBot's external services.
+
+Each fake runs on 127.0.0.1 in a background thread with configurable injected
+latency and error rate, so the backend can be exercised without network access::
+
+    with FakeLLMServer(latency=0.2, error_rate=0.1) as llm:
+        os.environ["LLM_BASE_URL"] = llm.base_url
+
+``FakeWhisperServer`` answers the Groq SDK (``GROQ_BASE_URL``) and
+``FakeElevenLabsServer`` the ElevenLabs text-to-speech API.  gTTS talks to a
+hard-coded Google HTTPS endpoint, so ``FakeGTTS`` stands in for the
+``gTTS`` class itself instead of a server.  ``FakeKVServer`` is an in-memory
+key-value server speaking RESP for ``STATE_BACKEND=kv`` (``STATE_KV_URL``).
+"""
+import json
+import random
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+FAKE_REPLY = "Omg wait 😭 that is SO dramatic. Tell me everything, what happened next?!"
+FAKE_TRANSCRIPT = "So my cow ran away to join the circus and I am honestly devastated."
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz); repeated to fake a clip
+SILENT_MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+
+
+def fake_mp3(text: str) -> bytes:
+    """Roughly one frame (~26 ms) of silence per two characters of text."""
+    return SILENT_MP3_FRAME * max(1, len(text) // 2)
+
+
+class _FakeServer:
+    """Base class: a ThreadingHTTPServer with latency/error injection."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, port: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                fake._dispatch(self)
+
+            def do_GET(self):
+                fake._dispatch(self)
+
+        return Handler
+
+    def _dispatch(self, handler: BaseHTTPRequestHandler):
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        with self._lock:
+            self.requests += 1
+            failing = random.random() < self.error_rate
+            if failing:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failing:
+            self.send_json(handler, 503, {"error": {"message": "injected failure"}})
+            return
+        self.handle(handler, body)
+
+    def handle(self, handler: BaseHTTPRequestHandler, body: bytes):
+        raise NotImplementedError
+
+    @staticmethod
+    def send_json(handler: BaseHTTPRequestHandler, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FakeLLMServer(_FakeServer):
+    """Mimics ``POST /chat/completions`` of an OpenAI-compatible API.
+
+    ``token_delay`` is paid per word of the reply (streamed or not), so long
+    completions take proportionally longer, and replies are cut at the
+    request's ``max_tokens`` (one word ≈ one token) like a real model's.
+    ``respond(request) -> str`` overrides the canned reply.
+    """
+
+    def __init__(self, reply: str = FAKE_REPLY, token_delay: float = 0.0, vary: bool = False,
+                 respond: Optional[Callable[[dict], str]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.reply = reply
+        self.token_delay = token_delay
+        self.vary = vary  # make every reply unique so downstream caches can't serve it
+        self.respond = respond
+
+    def next_reply(self) -> str:
+        if not self.vary:
+            return self.reply
+        with self._lock:
+            return f"{self.reply} Take {self.requests}."
+
+    def handle(self, handler: BaseHTTPRequestHandler, body: bytes):
+        if not handler.path.endswith("/chat/completions"):
+            self.send_json(handler, 404, {"error": {"message": "not found"}})
+            return
+        request = json.loads(body or b"{}")
+        reply = self.respond(request) if self.respond else self.next_reply()
+        words = reply.split(" ")
+        finish_reason = "stop"
+        if request.get("max_tokens") and len(words) > request["max_tokens"]:
+            reply, finish_reason = " ".join(words[:request["max_tokens"]]), "length"
+        if request.get("stream"):
+            self.stream_reply(handler, reply)
+            return
+        if self.token_delay:
+            time.sleep(self.token_delay * len(reply.split(" ")))
+        self.send_json(handler, 200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply},
+                "finish_reason": finish_reason,
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(reply.split())},
+        })
+
+    def stream_reply(self, handler: BaseHTTPRequestHandler, reply: str):
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+
+        def write_chunk(data: bytes):
+            handler.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        for i, word in enumerate(reply.split(" ")):
+            token = word if i == 0 else " " + word
+            chunk = {"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            if self.token_delay:
+                time.sleep(self.token_delay)
+        write_chunk(b"data: [DONE]\n\n")
+        handler.wfile.write(b"0\r\n\r\n")
+
+
+class FakeWhisperServer(_FakeServer):
+    """Mimics Groq's ``POST /openai/v1/audio/transcriptions`` (point ``GROQ_BASE_URL`` here)."""
+
+    def __init__(self, transcript: str = FAKE_TRANSCRIPT, **kwargs):
+        super().__init__(**kwargs)
+        self.transcript = transcript
+
+    def handle(self, handler: BaseHTTPRequestHandler, body: bytes):
+        if not handler.path.endswith("/audio/transcriptions"):
+            self.send_json(handler, 404, {"error": {"message": "not found"}})
+            return
+        data = self.transcript.encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/plain; charset=utf-8")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+class FakeElevenLabsServer(_FakeServer):
+    """Mimics ElevenLabs ``POST /v1/text-to-speech/{voice_id}[/stream]``.
+
+    Streams the fake MP3 in ``chunk_bytes`` pieces, ``chunk_delay`` apart,
+    so time-to-first-byte can be told apart from total render time.
+    """
+
+    def __init__(self, chunk_bytes: int = 4096, chunk_delay: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.chunk_bytes = chunk_bytes
+        self.chunk_delay = chunk_delay
+
+    def handle(self, handler: BaseHTTPRequestHandler, body: bytes):
+        if "/v1/text-to-speech/" not in handler.path:
+            self.send_json(handler, 404, {"detail": {"message": "not found"}})
+            return
+        audio = fake_mp3(json.loads(body or b"{}").get("text", ""))
+        handler.send_response(200)
+        handler.send_header("Content-Type", "audio/mpeg")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        for start in range(0, len(audio), self.chunk_bytes):
+            chunk = audio[start:start + self.chunk_bytes]
+            handler.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            handler.wfile.flush()
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+        handler.wfile.write(b"0\r\n\r\n")
+
+
+class FakeGTTS:
+    """Drop-in for ``gtts.gTTS`` with injected latency and errors.
+
+    Configure with ``FakeGTTS.configure(latency=..., error_rate=...)`` and
+    register ``FakeTTSEngine`` as the app's TTS engine; counters are class-level.
+    """
+
+    latency = 0.0
+    error_rate = 0.0
+    requests = 0
+    errors = 0
+    _lock = threading.Lock()
+
+    def __init__(self, text: str, lang: str = "en", slow: bool = False, **kwargs):
+        self.text = text
+
+    @classmethod
+    def configure(cls, latency: float = 0.0, error_rate: float = 0.0):
+        cls.latency, cls.error_rate = latency, error_rate
+        cls.requests = cls.errors = 0
+        return cls
+
+    def save(self, path: str):
+        cls = type(self)
+        with cls._lock:
+            cls.requests += 1
+            failing = random.random() < cls.error_rate
+            if failing:
+                cls.errors += 1
+        if cls.latency:
+            time.sleep(cls.latency)
+        if failing:
+            raise RuntimeError("injected gTTS failure")
+        with open(path, "wb") as f:
+            f.write(fake_mp3(self.text))
+
+
+class FakeTTSEngine:
+    """TTS engine for the backend registry, rendering through ``FakeGTTS``."""
+
+    voices = ("com", "co.uk", "com.au", "co.in")
+
+    def render(self, text: str, path: str, lang: str = "en", voice: str = None):
+        FakeGTTS(text, lang=lang, tld=voice).save(path)
+
+
+class FakeKVServer:
+    """In-memory RESP (Redis protocol) server with the commands ``KVStore`` uses.
+
+    Supports PING, SELECT, AUTH, GET, SET (NX, PX/EX), DEL, INCR, INCRBY,
+    RPUSH, LRANGE, LLEN, FLUSHDB and MULTI/EXEC.  Every command (or whole
+    MULTI block) runs under one lock, so it is atomic like a real server.
+    """
+
+    def __init__(self, latency: float = 0.0, port: int = 0, **kwargs):
+        self.latency = latency
+        self.requests = 0
+        self.errors = 0
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", port), self._handler(), bind_and_activate=False)
+        self._server.allow_reuse_address = True
+        self._server.daemon_threads = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            disable_nagle_algorithm = True
+
+            def handle(self):
+                queued = None
+                while True:
+                    command = fake._read_command(self.rfile)
+                    if command is None:
+                        return
+                    name = command[0].upper()
+                    if name == "MULTI":
+                        queued, reply = [], "+OK"
+                    elif name == "EXEC":
+                        reply = fake._execute_many(queued or [])
+                        queued = None
+                    elif queued is not None:
+                        queued.append(command)
+                        reply = "+QUEUED"
+                    else:
+                        reply = fake._execute_many([command])[0]
+                    self.wfile.write(fake._encode(reply))
+
+        return Handler
+
+    @staticmethod
+    def _read_command(rfile):
+        line = rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(rfile.readline()[1:])
+            args.append(rfile.read(length + 2)[:-2].decode("utf-8"))
+        return args
+
+    @classmethod
+    def _encode(cls, reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, list):
+            return b"*%d\r\n" % len(reply) + b"".join(cls._encode(item) for item in reply)
+        if reply.startswith(("+", "-")):
+            return reply.encode() + b"\r\n"
+        data = reply.encode("utf-8")
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def _execute_many(self, commands: list) -> list:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            replies = []
+            for command in commands:
+                try:
+                    replies.append(self._execute(command[0].upper(), command[1:]))
+                except (ValueError, TypeError) as e:
+                    self.errors += 1
+                    replies.append(f"-ERR {e}")
+            return replies
+
+    def _live(self, key: str):
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    def _execute(self, name: str, args: list):
+        if name in ("PING", "SELECT", "AUTH"):
+            return "+PONG" if name == "PING" else "+OK"
+        if name == "FLUSHDB":
+            self._data.clear()
+            self._expires.clear()
+            return "+OK"
+        if name == "GET":
+            value = self._live(args[0])
+            if isinstance(value, list):
+                raise TypeError("WRONGTYPE not a string")
+            return value
+        if name == "SET":
+            key, value, options = args[0], args[1], [a.upper() for a in args[2:]]
+            if "NX" in options and self._live(key) is not None:
+                return None
+            self._data[key] = value
+            self._expires.pop(key, None)
+            for unit, scale in (("PX", 1000), ("EX", 1)):
+                if unit in options:
+                    self._expires[key] = time.time() + int(args[2 + options.index(unit) + 1]) / scale
+            return "+OK"
+        if name == "DEL":
+            deleted = 0
+            for key in args:
+                deleted += self._live(key) is not None
+                self._data.pop(key, None)
+                self._expires.pop(key, None)
+            return deleted
+        if name in ("INCR", "INCRBY"):
+            value = int(self._live(args[0]) or 0) + (int(args[1]) if name == "INCRBY" else 1)
+            self._data[args[0]] = str(value)
+            return value
+        if name == "RPUSH":
+            values = self._live(args[0])
+            if values is None:
+                values = self._data[args[0]] = []
+            values.extend(args[1:])
+            return len(values)
+        if name == "LRANGE":
+            values = self._live(args[0]) or []
+            start, stop = int(args[1]), int(args[2])
+            return values[start:None if stop == -1 else stop + 1]
+        if name == "LLEN":
+            return len(self._live(args[0]) or [])
+        raise ValueError(f"unknown command '{name}'")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake LLM, Whisper, ElevenLabs or key-value server")
+    parser.add_argument("--service", choices=("llm", "whisper", "elevenlabs", "kv"), default="llm")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="llm: delay between streamed tokens")
+    args = parser.parse_args()
+    common = {"latency": args.latency, "error_rate": args.error_rate, "port": args.port}
+    if args.service == "whisper":
+        server, env = FakeWhisperServer(**common), "GROQ_BASE_URL"
+    elif args.service == "elevenlabs":
+        server, env = FakeElevenLabsServer(**common), "ELEVENLABS_BASE_URL"
+    elif args.service == "kv":
+        server, env = FakeKVServer(**common), "STATE_KV_URL"
+    else:
+        server, env = FakeLLMServer(token_delay=args.token_delay, **common), "LLM_BASE_URL"
+    print(f"🧪 Fake {args.service} listening on {server.base_url} (set {env} to this)")
+    server._server.serve_forever()
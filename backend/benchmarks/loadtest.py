@@ -0,0 +1,246 @@
+"""End-to-end load test against local stand-ins for every external service.
+
+Run from ``backend/``::
+
+    python -m benchmarks.loadtest --sessions 40 --concurrency 10 --turns 3
+    python -m benchmarks.loadtest --whisper-latency 0.4 --llm-error-rate 0.05 \\
+        --compare benchmarks/results/loadtest-<earlier>.json
+
+Starts fake Whisper, LLM and ElevenLabs servers plus a fake ``gTTS`` (each
+with injected latency/error rate), boots the real app under uvicorn on a
+local port with a throwaway database and audio cache, and drives it with
+concurrent simulated sessions.  Each session sends ``--turns`` voice turns to
+``/voice/interact``, then one ``/voice/tts`` and one ``/script/generate``.
+
+Reports p50/p95/p99 latency and throughput per endpoint, per-stage queue
+wait/run times from the bulkheads, and backend call/error counts, and writes
+everything as JSON (``--out``) so runs can be compared with ``--compare``.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import wave
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_backends import (FakeElevenLabsServer, FakeGTTS, FakeLLMServer, FakeTTSEngine,
+                                     FakeWhisperServer)
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+PERCENTILES = (50, 95, 99)
+
+
+def speech_like_wav(seconds: float = 3.0, rate: int = 16000) -> bytes:
+    """A mono clip with silent padding around a modulated tone (exercises the VAD trim)."""
+    t = np.arange(int(seconds * rate)) / rate
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    pad = np.zeros(rate // 2)
+    pcm = (np.concatenate([pad, signal, pad]) * 32767).astype("<i2")
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples: list, wall: float) -> dict:
+    latencies = sorted(s["ms"] for s in samples)
+    errors = [s for s in samples if not s["ok"]]
+    summary = {"requests": len(samples), "errors": len(errors),
+               "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0}
+    if latencies:
+        summary.update({f"p{p}_ms": round(percentile(latencies, p), 1) for p in PERCENTILES})
+        summary["mean_ms"] = round(sum(latencies) / len(latencies), 1)
+        summary["max_ms"] = round(latencies[-1], 1)
+    statuses = {}
+    for s in errors:
+        statuses[str(s["status"])] = statuses.get(str(s["status"]), 0) + 1
+    if statuses:
+        summary["error_statuses"] = statuses
+    return summary
+
+
+# === App under test ===
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(port: int):
+    """Import the app (after the env points at the fakes) and serve it on a thread."""
+    import uvicorn
+
+    import main
+    from services.registry import backends
+
+    backends.register("tts", "fake", FakeTTSEngine)
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port,
+                                           log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+# === Load ===
+async def timed(client: httpx.AsyncClient, samples: dict, name: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+        status = response.status_code
+        ok = status < 400 and "error" not in response.json()
+    except (httpx.HTTPError, ValueError):
+        status, ok = "exception", False
+    samples[name].append({"ms": (time.perf_counter() - started) * 1000, "status": status, "ok": ok})
+
+
+async def run_session(client: httpx.AsyncClient, samples: dict, session_id: str, turns: int, clip: bytes):
+    for _ in range(turns):
+        await timed(client, samples, "/voice/interact", "POST", "/voice/interact",
+                    files={"file": ("turn.wav", clip, "audio/wav")}, data={"session_id": session_id})
+    await timed(client, samples, "/voice/tts", "POST", "/voice/tts",
+                json={"text": "Curtain up! Bessie takes the stage.", "session_id": session_id})
+    await timed(client, samples, "/script/generate", "POST", "/script/generate",
+                json={"session_id": session_id})
+
+
+async def drive(base_url: str, args) -> dict:
+    clip = speech_like_wav()
+    samples = {"/voice/interact": [], "/voice/tts": [], "/script/generate": []}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        gate = asyncio.Semaphore(args.concurrency)
+
+        async def one(i: int):
+            async with gate:
+                await run_session(client, samples, f"load-{i}", args.turns, clip)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.sessions)))
+        wall = time.perf_counter() - started
+        stages = (await client.get("/debug/bulkheads")).json()
+
+    everything = [s for endpoint in samples.values() for s in endpoint]
+    return {
+        "wall_s": round(wall, 3),
+        "overall": summarize(everything, wall),
+        "endpoints": {name: summarize(endpoint, wall) for name, endpoint in samples.items()},
+        "stages": stages,
+    }
+
+
+def compare(current: dict, previous_path: str):
+    previous = json.loads(Path(previous_path).read_text())
+    print(f"\nΔ vs {previous_path}")
+    for name, now in {"overall": current["overall"], **current["endpoints"]}.items():
+        before = previous["overall"] if name == "overall" else previous.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        cells = []
+        for key in [f"p{p}_ms" for p in PERCENTILES] + ["throughput_rps"]:
+            if key in now and before.get(key):
+                cells.append(f"{key} {before[key]:.1f}→{now[key]:.1f} ({(now[key] / before[key] - 1) * 100:+.0f}%)")
+        print(f"  {name:<18} " + " | ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=10, help="sessions in flight at once")
+    parser.add_argument("--turns", type=int, default=3, help="voice turns per session")
+    for service, latency in (("whisper", 0.3), ("llm", 0.5), ("gtts", 0.2), ("elevenlabs", 0.2)):
+        parser.add_argument(f"--{service}-latency", type=float, default=latency)
+        parser.add_argument(f"--{service}-error-rate", type=float, default=0.0)
+    parser.add_argument("--tts-engine", choices=("fake", "elevenlabs"), default="fake",
+                        help="fake: in-process gTTS stand-in; elevenlabs: streaming engine against the fake server")
+    parser.add_argument("--out", help="JSON results path (default benchmarks/results/loadtest-<time>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own logging")
+    args = parser.parse_args()
+
+    whisper = FakeWhisperServer(latency=args.whisper_latency, error_rate=args.whisper_error_rate).start()
+    llm = FakeLLMServer(latency=args.llm_latency, error_rate=args.llm_error_rate, vary=True).start()
+    elevenlabs = FakeElevenLabsServer(latency=args.elevenlabs_latency,
+                                      error_rate=args.elevenlabs_error_rate).start()
+    FakeGTTS.configure(latency=args.gtts_latency, error_rate=args.gtts_error_rate)
+
+    workdir = tempfile.mkdtemp(prefix="dramabot-load-")
+    os.environ.update({
+        "USE_MOCK": "false",
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_BASE_URL": whisper.base_url,
+        "LLM_BASE_URL": llm.base_url,
+        "ELEVENLABS_BASE_URL": elevenlabs.base_url,
+        "ELEVENLABS_API_KEY": "fake-key",
+        "TTS_ENGINE": args.tts_engine,
+        "MEMORY_DB_PATH": str(Path(workdir) / "load.db"),
+        "AUDIO_CACHE_DIR": str(Path(workdir) / "audio"),
+    })
+
+    port = free_port()
+    logs = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with logs:
+        server, thread = start_app(port)
+        try:
+            results = asyncio.run(drive(f"http://127.0.0.1:{port}", args))
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        **results,
+        "backends": {
+            "whisper": {"requests": whisper.requests, "errors": whisper.errors},
+            "llm": {"requests": llm.requests, "errors": llm.errors},
+            "gtts": {"requests": FakeGTTS.requests, "errors": FakeGTTS.errors},
+            "elevenlabs": {"requests": elevenlabs.requests, "errors": elevenlabs.errors},
+        },
+    }
+    for fake in (whisper, llm, elevenlabs):
+        fake.stop()
+
+    print(f"{args.sessions} sessions × ({args.turns} voice turns + tts + script), "
+          f"{args.concurrency} concurrent, {results['wall_s']}s")
+    for name, summary in {"overall": results["overall"], **results["endpoints"]}.items():
+        print(f"  {name:<18} n={summary['requests']:<5} err={summary['errors']:<4} "
+              f"p50 {summary.get('p50_ms', 0):>8.1f} ms  p95 {summary.get('p95_ms', 0):>8.1f} ms  "
+              f"p99 {summary.get('p99_ms', 0):>8.1f} ms  {summary['throughput_rps']:>7.2f} req/s")
+    for name, stage in results["stages"].items():
+        print(f"  stage {name:<12} done={stage['completed']:<5} rejected={stage['rejected']:<4} "
+              f"wait p95 {stage['wait_ms'].get('p95', 0)} ms  run p50 {stage['run_ms'].get('p50', 0)} ms")
+    print("  backends: " + ", ".join(f"{k} {v['requests']} calls/{v['errors']} err"
+                                     for k, v in results["backends"].items()))
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"📄 Results written to {out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,12 @@
 # main.py
-import shutil
-import tempfile
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
+from typing import Literal, Optional
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -16,32 +18,73 @@ load_dotenv()
 # === Internal Modules (Memory) ===
 from memory.session_memory import (
     get_conversation,
-    add_to_memory,
-    get_memory_stats,
+    get_conversation_page,
+    count_messages,
+    conversation_version,
     delete_memory,
-    dump_memory,
 )
 
 # === Services ===
-from services.voice_io import process_voice_interaction, process_text_to_speech
-from services.llm import generate_script_from_conversation
+from services.voice_io import (
+    process_voice_interaction,
+    process_text_to_speech,
+    stream_text_to_speech,
+    stream_voice_interaction,
+)
+from services.sse import sse_stream, SSE_HEADERS
+from services.uploads import UploadLimitMiddleware, read_upload
+from services.audio_cache import CachedStaticFiles, audio_cache
+from services.response_cache import response_cache
+from services.jobs import QueueFull, script_jobs
+from services.bulkhead import Overloaded, bulkhead_stats, shutdown_bulkheads, tts_bulkhead, whisper_bulkhead
+from services.llm import SCRIPT_MODE, generate_script_from_conversation, stream_script_from_conversation
+from services.table_read import render_table_read
+from services.voice_ws import serve_voice_socket, voice_socket_stats
+from services.registry import backends
+from services import metrics
+from services.trace import tracer
+
+STATIC_DIR = Path("static")
+
+# === Startup / Shutdown ===
+# Engines (Whisper, LLM, TTS) are imported on first use; BACKEND_WARMUP builds them here instead
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    STATIC_DIR.mkdir(exist_ok=True)
+    session_memory.init_db()
+    await asyncio.to_thread(backends.warm_up)
+    yield
+    # Flush write-behind memory, then close engine clients, job workers and stage executors
+    session_memory.flush_memory()
+    backends.close()
+    script_jobs.shutdown()
+    shutdown_bulkheads()
 
 # === App Initialization ===
-app = FastAPI(title="🎭 Theatrical Drama Bot", version="1.0.0")
+app = FastAPI(title="🎭 Theatrical Drama Bot", version="1.0.0", lifespan=lifespan)
+
+# === Upload Size Limit (before the multipart body is parsed or spooled) ===
+app.add_middleware(UploadLimitMiddleware)
 
 # === CORS Setup ===
+ALLOWED_ORIGINS = ["https://drama-queen.vercel.app"]  # Frontend origin
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["https://drama-queen.vercel.app"],  # Frontend origin
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # ETag lets the frontend send If-None-Match when polling messages; X-Audio-* describe streamed clips
+    expose_headers=["ETag", "X-Audio-URL", "X-Audio-Cache"],
 )
 
-# === Serve Static Audio Files ===
-STATIC_DIR = Path("static")
-STATIC_DIR.mkdir(exist_ok=True)
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+# === Serve Static Audio Files (directory is created at startup) ===
+app.mount("/static", CachedStaticFiles(directory=STATIC_DIR, check_dir=False), name="static")
+
+JOB_EVENT_POLL_SECONDS = 0.25
+CONVERSATION_PAGE_SIZE = int(os.getenv("CONVERSATION_PAGE_SIZE", "100"))
+CONVERSATION_MAX_PAGE = int(os.getenv("CONVERSATION_MAX_PAGE", "500"))
 
 # === Request Models ===
 class TTSRequest(BaseModel):
@@ -50,62 +93,107 @@ class TTSRequest(BaseModel):
 
 class GenerateScriptRequest(BaseModel):
     session_id: str
+    mode: Optional[Literal["single", "outline"]] = None  # defaults to SCRIPT_MODE
+
+class TableReadRequest(GenerateScriptRequest):
+    script: Optional[str] = None  # defaults to the session's generated script (written in ``mode``)
 
-# === Middleware: Attach Memory to Request ===
+# === Middleware: Attach Session + Memory Unit of Work to Request ===
+# History is not loaded here; handlers read what they need on demand, through one unit of work:
+# reads are memoized for the request and its writes are committed together once the body is done
+# (discarded on a 5xx, a failed turn or a client gone mid-stream)
 @app.middleware("http")
-async def attach_session_memory(request: Request, call_next):
-    session_id = request.query_params.get("session_id") or request.headers.get("X-Session-ID")
-    if session_id:
-        
-        memory = session_memory.get_conversation(session_id)
-        
-        request.state.session_id = session_id
-        request.state.session_memory = memory
-    else:
-        
-        request.state.session_memory = None
+async def attach_session_id(request: Request, call_next):
+    if request.url.path.startswith("/static"):
         request.state.session_id = None
+        return await call_next(request)
+    request.state.session_id = request.query_params.get("session_id") or request.headers.get("X-Session-ID")
+
+    with session_memory.unit_of_work() as unit:
+        try:
+            response = await call_next(request)
+        except Exception:
+            unit.discard()
+            raise
+    response.body_iterator = session_memory.commit_before_last_chunk(
+        response.body_iterator, unit, commit=response.status_code < 500)
+    return response
 
-    response = await call_next(request)
+# === Middleware: Request Metrics + Server-Timing ===
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    timings = metrics.start_request()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.REQUEST_SECONDS.observe(elapsed, request.method, route)
+        metrics.REQUESTS.inc(request.method, route, str(status))
+    # Streamed bodies are still running here, so only stages before the first byte show up
+    response.headers["Server-Timing"] = metrics.server_timing(timings, elapsed)
     return response
 
+# === Saturated backend stage: fail fast instead of queueing without bound ===
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    print(f"🚧 Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"error": str(exc), "stage": exc.stage},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 # === Voice Input Endpoint ===
 @app.post("/voice/interact")
-async def voice_interact(file: UploadFile = File(...), session_id: str = Form(...)):
-    
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_audio:
-            shutil.copyfileobj(file.file, temp_audio)
-            temp_path = temp_audio.name
-            
+async def voice_interact(file: UploadFile = File(...), session_id: str = Form(...),
+                         preprocess: Optional[bool] = Form(None)):
+    # Size/duration limits are enforced here, before any transcription work
+    upload = await read_upload(file)
 
-        # Process the audio and get results
-        result = await process_voice_interaction(temp_path, session_id)
+    try:
+        # Process the audio and get results (the turn is stored by process_voice_interaction)
+        result = await process_voice_interaction(upload, session_id, preprocess)
+        return JSONResponse(content=result)
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"❌ Voice interaction failed: {e}")
+        raise HTTPException(status_code=500, detail="Voice interaction failed.")
 
-        user_text = result.get("transcript", "").strip()
-        bot_response = result.get("ai_response", "").strip()
 
-        if user_text:
-            
-            add_to_memory(session_id, "user", user_text)
-        if bot_response:
-            
-            add_to_memory(session_id, "bot", bot_response)
 
-        
-        dump_memory(session_id)
+# === Streaming Voice Endpoint (Server-Sent Events) ===
+@app.post("/voice/interact/stream")
+async def voice_interact_stream(file: UploadFile = File(...), session_id: str = Form(...),
+                                preprocess: Optional[bool] = Form(None)):
+    # Read before the response starts: the upload is closed once the handler returns
+    upload = await read_upload(file)
+    # Reject while we can still send a 503 status
+    whisper_bulkhead.check()
 
-        
-        stats = get_memory_stats(session_id)
-        print(f"Memory Stats: {stats}")
+    # transcript → token... → done (audio_url + emotional_score)
+    return StreamingResponse(
+        sse_stream(stream_voice_interaction(upload, session_id, preprocess)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
 
-        return JSONResponse(content=result)
-    except Exception as e:
-        print(f"❌ Voice interaction failed: {e}")
-        raise HTTPException(status_code=500, detail="Voice interaction failed.")
 
+# === Voice Session Socket (full duplex, one per conversation) ===
+# Audio frames in; transcript, tokens, score and MP3 bytes out; no per-turn HTTP, multipart or GET
+@app.websocket("/voice/ws")
+async def voice_socket(websocket: WebSocket, session_id: str = Query(...), preprocess: Optional[bool] = Query(None)):
+    # CORS doesn't apply to WebSockets: browsers send Origin, other clients usually don't
+    origin = websocket.headers.get("origin")
+    if origin is not None and origin not in ALLOWED_ORIGINS:
+        await websocket.close(code=1008)
+        return
+    await serve_voice_socket(websocket, session_id, preprocess)
 
 
 # === Text-to-Speech Endpoint ===
@@ -113,17 +201,16 @@ async def voice_interact(file: UploadFile = File(...), session_id: str = Form(..
 async def tts_endpoint(payload: TTSRequest):
     
     try:
+        started = time.perf_counter()
         result = await process_text_to_speech(payload.text, payload.session_id)
+        response_time = time.perf_counter() - started
 
         # Extract and log the emotional score
         emotional = result.get("emotional_score", {})
         score = emotional.get("score")
-        intensity = emotional.get("intensity")
-        connection = emotional.get("connection")
-        response_time = emotional.get("response_time")
 
         if score is not None:
-            print(f"📈 Emotional Score: {score} | Intensity: {intensity} | Connection: {connection} | Response Time: {response_time:.2f}")
+            print(f"📈 Emotional Score: {score} ({emotional.get('level')}) | Response Time: {response_time:.2f}s")
         else:
             print(f"⚠️ No emotional score returned for session: {payload.session_id}")
 
@@ -132,10 +219,26 @@ async def tts_endpoint(payload: TTSRequest):
             "emotional_score": emotional
         })
 
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"❌ TTS failed: {e}")
         raise HTTPException(status_code=500, detail="Text-to-speech failed.")
 
+# === Streaming Text-to-Speech (chunked audio/mpeg) ===
+# Playback starts with the first chunk; the clip is cached at X-Audio-URL once complete
+@app.post("/voice/tts/stream")
+def tts_stream_endpoint(payload: TTSRequest):
+    tts_bulkhead.check()
+    try:
+        headers, chunks = stream_text_to_speech(payload.text)
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"❌ Streaming TTS failed: {e}")
+        raise HTTPException(status_code=502, detail="Text-to-speech engine failed.")
+    return StreamingResponse(chunks, media_type="audio/mpeg", headers=headers)
+
 # === Script Generation Endpoint ===
 
 @app.post("/script/generate")
@@ -143,18 +246,109 @@ def generate_script_api(payload: GenerateScriptRequest):
     session_id = payload.session_id
     print(f"\n📝 /script/generate called | Session: {session_id}")
     
-    memory = get_conversation(session_id)
-    if not memory:
+    if not count_messages(session_id):
         print("⚠️ No memory found for script generation.")
         return JSONResponse(status_code=404, content={"error": f"No memory for session {session_id}"})
 
     try:
-        result = generate_script_from_conversation(session_id)
+        result = generate_script_from_conversation(session_id, payload.mode)
         return JSONResponse(content=result)
     except Exception as e:
         print(f"❌ Script generation error: {e}")
         raise HTTPException(status_code=500, detail="Script generation failed.")
 
+# outline → scene... (each as soon as it is written) → done; single mode sends only done
+@app.post("/script/generate/stream")
+def generate_script_stream(payload: GenerateScriptRequest):
+    session_id = payload.session_id
+    if not count_messages(session_id):
+        return JSONResponse(status_code=404, content={"error": f"No memory for session {session_id}"})
+
+    async def events():
+        try:
+            async for event, data in stream_script_from_conversation(session_id, payload.mode):
+                yield event, data
+        except Overloaded as e:
+            yield "error", {"error": str(e), "stage": e.stage, "retry_after": e.retry_after}
+        except Exception as e:
+            print(f"❌ Script generation error: {e}")
+            yield "error", {"error": "Script generation failed."}
+
+    return StreamingResponse(sse_stream(events()), media_type="text/event-stream", headers=SSE_HEADERS)
+
+# === Table Read: the whole script, one voice per character, as one chaptered track ===
+@app.post("/script/table-read")
+async def table_read_api(payload: TableReadRequest):
+    session_id = payload.session_id
+    script = payload.script
+    if script is None:
+        if not await asyncio.to_thread(count_messages, session_id):
+            return JSONResponse(status_code=404, content={"error": f"No memory for session {session_id}"})
+        script = (await asyncio.to_thread(generate_script_from_conversation, session_id, payload.mode))["script"]
+
+    try:
+        started = time.perf_counter()
+        result = await render_table_read(script)
+        print(f"🎙️ Table read | Session: {session_id} | {result['segments']} lines "
+              f"({result['cached_segments']} cached) in {time.perf_counter() - started:.2f}s")
+        return {"session_id": session_id, **result}
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"❌ Table read failed: {e}")
+        raise HTTPException(status_code=500, detail="Table read failed.")
+
+# === Background Script Jobs ===
+@app.post("/script/jobs", status_code=202)
+def submit_script_job(payload: GenerateScriptRequest):
+    session_id = payload.session_id
+    if not count_messages(session_id):
+        return JSONResponse(status_code=404, content={"error": f"No memory for session {session_id}"})
+
+    # Same session + same conversation state + same mode → same job (double-clicks collapse)
+    mode = payload.mode or SCRIPT_MODE
+    dedup_key = f"{session_id}:{conversation_version(session_id)}:{mode}"
+    try:
+        job, deduplicated = script_jobs.submit(
+            "script", generate_script_from_conversation, session_id, mode, dedup_key=dedup_key
+        )
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    print(f"📝 Script job {job.id} | Session: {session_id} | deduplicated={deduplicated}")
+    return {**job.to_dict(include_result=False), "deduplicated": deduplicated}
+
+@app.get("/script/jobs")
+def script_job_stats():
+    return script_jobs.stats()
+
+@app.get("/script/jobs/{job_id}")
+def get_script_job(job_id: str):
+    job = script_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"Job {job_id} not found."})
+    return job.to_dict()
+
+@app.get("/script/jobs/{job_id}/events")
+async def script_job_events(job_id: str):
+    job = script_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"Job {job_id} not found."})
+
+    async def progress():
+        nonlocal job
+        last_status = None
+        while True:
+            # Jobs running on another worker are re-read from the shared store
+            job = await asyncio.to_thread(script_jobs.get, job_id) or job
+            if job.status != last_status:
+                last_status = job.status
+                yield job.status, job.to_dict()
+            if job.finished_event.is_set():
+                return
+            await asyncio.sleep(JOB_EVENT_POLL_SECONDS)
+
+    return StreamingResponse(sse_stream(progress()), media_type="text/event-stream", headers=SSE_HEADERS)
+
 
 # === End Session ===
 @app.post("/session/end")
@@ -162,6 +356,8 @@ def end_session(session_id: str):
     try:
         print(f"🧹 Calling delete_memory for session: {session_id}")
         deleted = delete_memory(session_id)
+        # Its debug trace goes too, so a reused session id starts clean
+        tracer.clear(session_id)
         if deleted:
             print(f"✅ Memory deleted for session: {session_id}")
             return {"message": f"Session {session_id} ended and memory cleared."}
@@ -173,19 +369,120 @@ def end_session(session_id: str):
         raise HTTPException(status_code=500, detail="Failed to end session.")
 
 # === Debug Endpoints ===
+# === Incremental Conversation Polling ===
+# Clients keep ``next_cursor`` and the ETag: a poll costs O(new messages), and 304 when nothing changed
+@app.get("/conversation/{session_id}/messages")
+def get_conversation_messages(
+    session_id: str,
+    request: Request,
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(CONVERSATION_PAGE_SIZE, ge=1, le=CONVERSATION_MAX_PAGE),
+    tail: Optional[int] = Query(None, ge=1, le=CONVERSATION_MAX_PAGE),
+):
+    page = get_conversation_page(session_id, after_id, limit, tail)
+    # The tag covers the conversation state and where this response leaves the client
+    etag = f'W/"{page["version"]}:{page["next_cursor"]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in (tag.strip() for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(headers=headers, content={
+        "session_id": session_id,
+        "messages": page["messages"],
+        "next_cursor": page["next_cursor"],
+        "has_more": page["has_more"],
+        "total": page["total"],
+        "reset": page["reset"],
+    })
+
 @app.get("/debug/conversation/{session_id}")
-def get_conversation_debug(session_id: str):
+def get_conversation_debug(session_id: str, after_id: Optional[int] = None, limit: Optional[int] = None,
+                           tail: Optional[int] = None):
     print(f"🐛 Debug: get_conversation for {session_id}")
-    memory = get_conversation(session_id)
+    memory = get_conversation(session_id, after_id, limit, tail)
     return {
         "session_id": session_id,
         "conversation_length": len(memory),
         "conversation": memory,
     }
 
+@app.get("/debug/memory")
+def get_memory_debug():
+    return {
+        "conversation_cache": session_memory.cache.stats(),
+        "script_cache": session_memory.script_cache.stats(),
+        "audio_cache": audio_cache.stats(),
+        "response_cache": response_cache.stats(),
+    }
 
+@app.get("/debug/trace")
+def get_trace_overview():
+    return {**tracer.stats(), "traced_sessions": tracer.sessions()}
 
+@app.get("/debug/trace/{session_id}")
+def get_session_trace(session_id: str, limit: Optional[int] = None, level: str = "debug"):
+    events = tracer.get(session_id, limit=limit, level=level)
+    return {"session_id": session_id, "count": len(events), "events": events}
 
+# === Health + Metrics ===
+@app.get("/health")
+def health():
+    checks = {}
+    try:
+        session_memory.store.count("__health__")
+        checks["database"] = "ok"
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+    saturated = [name for name, stage in bulkhead_stats().items() if stage["saturation"] >= 1]
+    checks["saturated_stages"] = saturated
+    checks["engines_loaded"] = backends.loaded()
+    checks["state"] = {"backend": type(session_memory.store).__name__, "shared": session_memory.SHARED_STATE}
+    status = "ok" if checks["database"] == "ok" and not saturated else "degraded"
+    return JSONResponse(status_code=200 if checks["database"] == "ok" else 503,
+                        content={"status": status, "checks": checks})
+
+CACHE_HITS = metrics.register(metrics.ScrapedCounter("dramabot_cache_hits_total", "Cache hits.", ("cache",)))
+CACHE_MISSES = metrics.register(metrics.ScrapedCounter("dramabot_cache_misses_total", "Cache misses.", ("cache",)))
+STAGE_ACTIVE = metrics.register(metrics.Gauge("dramabot_stage_active", "Calls running per stage.", ("stage",)))
+STAGE_QUEUED = metrics.register(metrics.Gauge("dramabot_stage_queued", "Calls waiting per stage.", ("stage",)))
+STAGE_REJECTED = metrics.register(metrics.ScrapedCounter("dramabot_stage_rejected_total", "Calls shed per stage.", ("stage",)))
+JOBS_QUEUED = metrics.register(metrics.Gauge("dramabot_script_jobs_queued", "Script jobs waiting."))
+VOICE_SOCKETS = metrics.register(metrics.Gauge("dramabot_voice_sockets", "Open voice sockets.", ("state",)))
+VOICE_SOCKET_TURNS = metrics.register(metrics.ScrapedCounter(
+    "dramabot_voice_socket_turns_total", "Turns answered over voice sockets."))
+LLM_CACHE_SAVED = metrics.register(metrics.ScrapedCounter(
+    "dramabot_llm_cache_saved_seconds_total", "Upstream LLM latency avoided by the response cache."))
+
+def collect_component_stats():
+    for name, stats in (("conversation", session_memory.cache.stats()),
+                        ("script", session_memory.script_cache.stats()),
+                        ("audio", audio_cache.stats()),
+                        ("response", response_cache.stats())):
+        CACHE_HITS.set(name, value=stats["hits"])
+        CACHE_MISSES.set(name, value=stats["misses"])
+    for name, stats in bulkhead_stats().items():
+        STAGE_ACTIVE.set(name, value=stats["active"])
+        STAGE_QUEUED.set(name, value=stats["queued"])
+        STAGE_REJECTED.set(name, value=stats["rejected"])
+    JOBS_QUEUED.set(value=script_jobs.stats()["queue_depth"])
+    sockets = voice_socket_stats()
+    VOICE_SOCKETS.set("busy", value=sockets["busy"])
+    VOICE_SOCKETS.set("idle", value=sockets["open"] - sockets["busy"])
+    VOICE_SOCKET_TURNS.set(value=sockets["turns"])
+    LLM_CACHE_SAVED.set(value=response_cache.stats()["saved_ms"] / 1000)
+
+metrics.add_collector(collect_component_stats)
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/bulkheads")
+def get_bulkhead_debug():
+    return bulkhead_stats()
+
+@app.get("/debug/voice-sockets")
+def get_voice_socket_debug():
+    return voice_socket_stats()
 
 
 # === Root Info ===
@@ -196,11 +493,22 @@ def root():
         "version": "1.0.0",
         "endpoints": {
             "voice_interact": "/voice/interact",
+            "voice_interact_stream": "/voice/interact/stream",
+            "voice_socket": "/voice/ws?session_id=",
             "text_to_speech": "/voice/tts",
+            "text_to_speech_stream": "/voice/tts/stream",
             "generate_script": "/script/generate",
+            "generate_script_stream": "/script/generate/stream",
+            "script_jobs": "/script/jobs",
+            "table_read": "/script/table-read",
             "end_session": "/session/end",
+            "conversation_messages": "/conversation/{session_id}/messages?after_id=&limit=&tail=",
             "debug_conversation": "/debug/conversation/{session_id}",
             "debug_memory": "/debug/memory",
+            "debug_bulkheads": "/debug/bulkheads",
+            "debug_voice_sockets": "/debug/voice-sockets",
+            "metrics": "/metrics",
+            "debug_trace": "/debug/trace/{session_id}",
             "health": "/health",
         },
     }
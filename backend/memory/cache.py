@@ -0,0 +1,289 @@
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from memory.state import StateStore
+
+# === Cache Settings ===
+DURABILITY_SYNC = "sync"
+DURABILITY_WRITE_BEHIND = "write-behind"
+
+MEMORY_DURABILITY = os.getenv("MEMORY_DURABILITY", DURABILITY_WRITE_BEHIND).lower()
+MEMORY_CACHE_MAX_SESSIONS = int(os.getenv("MEMORY_CACHE_MAX_SESSIONS", "1000"))
+MEMORY_CACHE_MAX_BYTES = int(os.getenv("MEMORY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+MEMORY_FLUSH_INTERVAL = float(os.getenv("MEMORY_FLUSH_INTERVAL_MS", "250")) / 1000
+MEMORY_FLUSH_BATCH = int(os.getenv("MEMORY_FLUSH_BATCH", "256"))
+
+
+def _message_size(message: dict) -> int:
+    return len(message["role"]) + len(message["content"])
+
+
+def slice_messages(messages: List[dict], after_id: int = 0, limit: Optional[int] = None,
+                   tail: Optional[int] = None) -> List[dict]:
+    """Copy of the messages after ``after_id`` (at most ``limit``), or the last ``tail``, with their ids."""
+    total = len(messages)
+    if tail is not None:
+        start, stop = max(0, total - tail), total
+    else:
+        start = min(max(0, after_id), total)
+        stop = total if limit is None else min(total, start + limit)
+    return [{"id": i + 1, **messages[i]} for i in range(start, stop)]
+
+
+class ConversationCache:
+    """LRU-bounded per-session conversation cache in front of a StateStore.
+
+    In ``sync`` mode every append is written through to the store before it
+    returns.  In ``write-behind`` mode appends land in memory and a background
+    thread flushes them in batches every ``flush_interval`` seconds (or as soon
+    as ``flush_batch`` rows are pending, and always at shutdown).  Reads and
+    counts for cached sessions never touch the database.
+
+    When the store is ``shared`` with other workers, writes are always sync
+    and a cached session is revalidated against the store's generation (one
+    indexed lookup) before use, so turns written elsewhere are never missed.
+    """
+
+    def __init__(
+        self,
+        store: StateStore,
+        durability: str = MEMORY_DURABILITY,
+        max_sessions: int = MEMORY_CACHE_MAX_SESSIONS,
+        max_bytes: int = MEMORY_CACHE_MAX_BYTES,
+        flush_interval: float = MEMORY_FLUSH_INTERVAL,
+        flush_batch: int = MEMORY_FLUSH_BATCH,
+        shared: bool = False,
+    ):
+        if durability not in (DURABILITY_SYNC, DURABILITY_WRITE_BEHIND):
+            raise ValueError(f"Unknown MEMORY_DURABILITY: {durability}")
+        if shared and durability == DURABILITY_WRITE_BEHIND:
+            # Pending turns would be invisible to the other workers
+            print("🗃️ Memory state is shared between workers: using sync writes")
+            durability = DURABILITY_SYNC
+        self.store = store
+        self.shared = shared
+        self.durability = durability
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+
+        self._sessions: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._sizes = {}
+        self._generations = {}  # session_id -> store generation of the cached copy
+        self._summaries = {}  # session_id -> (summary, summarized_count), for cached sessions
+        self._bytes = 0
+        self._pending = []  # (session_id, role, content, timestamp) rows not yet in SQLite
+        self._pending_sessions = {}  # session_id -> number of pending rows
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_reloads = 0
+
+    # --- Internal helpers (call with self._lock held) ---
+    def _load(self, session_id: str) -> List[dict]:
+        messages = self._sessions.get(session_id)
+        if (messages is not None and self.shared
+                and self.store.generation(session_id) != self._generations[session_id]):
+            # Another worker wrote (or deleted) this session since we cached it
+            self._drop(session_id)
+            self.stale_reloads += 1
+            messages = None
+        if messages is not None:
+            self._sessions.move_to_end(session_id)
+            self.hits += 1
+            return messages
+        self.misses += 1
+        self._generations[session_id], messages = self.store.fetch_versioned(session_id)
+        self._sessions[session_id] = messages
+        size = sum(_message_size(m) for m in messages)
+        self._sizes[session_id] = size
+        self._bytes += size
+        self._evict(keep=session_id)
+        return messages
+
+    def _drop(self, session_id: str):
+        self._summaries.pop(session_id, None)
+        self._generations.pop(session_id, None)
+        if self._sessions.pop(session_id, None) is not None:
+            self._bytes -= self._sizes.pop(session_id)
+
+    def _evict(self, keep: str):
+        candidates = list(self._sessions)
+        for victim in candidates:
+            if len(self._sessions) <= self.max_sessions and self._bytes <= self.max_bytes:
+                return
+            if victim == keep:
+                continue
+            if victim in self._pending_sessions:
+                # Never drop unflushed turns; let the flusher persist them first
+                self._wake.set()
+                continue
+            self._drop(victim)
+            self.evictions += 1
+
+    # --- Public API ---
+    def append(self, session_id: str, role: str, content: str):
+        self.extend(session_id, [(role, content)])
+
+    def extend(self, session_id: str, messages: list):
+        self.commit(session_id, messages)
+
+    def commit(self, session_id: str, messages: list, summary: Optional[Tuple[str, int]] = None):
+        """Append ``messages`` and apply a summary update with at most one store write.
+
+        Sync and shared modes write everything in one ``write_turn``, which
+        also drops the session's stale script.  Write-behind queues the
+        messages (the flush only inserts rows) and drops the script now, so
+        a script saved for this turn before the flush is kept.
+        """
+        timestamp = time.time()
+        rows = [(session_id, role, content, timestamp) for role, content in messages]
+        if not rows and summary is None:
+            return
+        with self._lock:
+            if self.shared:
+                # The write reports the generation it replaced, so no revalidation read first
+                before, after = self.store.write_turn(session_id, rows, summary)
+                cached = self._sessions.get(session_id)
+                if cached is None:
+                    return
+                if before != self._generations[session_id]:
+                    # Someone else wrote in between: reload on next read instead of patching
+                    self._drop(session_id)
+                    return
+                self._generations[session_id] = after
+                self._sessions.move_to_end(session_id)
+            else:
+                cached = self._load(session_id)
+                if self.durability == DURABILITY_SYNC:
+                    self.store.write_turn(session_id, rows, summary)
+                else:
+                    if summary is not None:
+                        self.store.write_turn(session_id, [], summary)
+                    if rows:
+                        self.store.delete_script(session_id)
+                if summary is not None:
+                    self._summaries[session_id] = summary
+            for role, content in messages:
+                message = {"role": role, "content": content}
+                cached.append(message)
+                self._sizes[session_id] += _message_size(message)
+                self._bytes += _message_size(message)
+            if self.durability == DURABILITY_WRITE_BEHIND and rows:
+                self._pending.extend(rows)
+                self._pending_sessions[session_id] = self._pending_sessions.get(session_id, 0) + len(rows)
+                self._ensure_flusher()
+                if len(self._pending) >= self.flush_batch:
+                    self._wake.set()
+            self._evict(keep=session_id)
+
+    def get(self, session_id: str) -> List[dict]:
+        with self._lock:
+            return list(self._load(session_id))
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._load(session_id))
+
+    def page(self, session_id: str, after_id: int = 0, limit: Optional[int] = None,
+             tail: Optional[int] = None) -> Tuple[int, Optional[dict], List[dict]]:
+        """(message count, newest message, slice) copying only the slice.
+
+        Message ids are 1-based positions in the session; the slice holds the
+        messages after ``after_id`` (at most ``limit``), or the last ``tail``.
+        """
+        with self._lock:
+            messages = self._load(session_id)
+            return len(messages), (messages[-1] if messages else None), slice_messages(messages, after_id, limit, tail)
+
+    def last_message(self, session_id: str) -> Tuple[int, Optional[dict]]:
+        """(message count, newest message or None) without copying the conversation."""
+        with self._lock:
+            messages = self._load(session_id)
+            return len(messages), (messages[-1] if messages else None)
+
+    def delete(self, session_id: str) -> bool:
+        with self._flush_lock, self._lock:
+            pending = self._pending_sessions.pop(session_id, 0)
+            if pending:
+                self._pending = [row for row in self._pending if row[0] != session_id]
+            self._drop(session_id)
+            return self.store.delete(session_id) > 0 or pending > 0
+
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        """Rolling summary of older turns and how many messages it covers."""
+        with self._lock:
+            cached = self._summaries.get(session_id)
+            if cached is not None:
+                return cached
+            summary = self.store.fetch_summary(session_id)
+            if session_id in self._sessions and not self.shared:
+                self._summaries[session_id] = summary
+            return summary
+
+    def set_summary(self, session_id: str, summary: str, summarized_count: int):
+        with self._lock:
+            self.store.save_summary(session_id, summary, summarized_count)
+            if session_id in self._sessions and not self.shared:
+                self._summaries[session_id] = (summary, summarized_count)
+
+    def flush(self):
+        """Write every pending turn to the store in one batch."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self.store.add_many(batch)
+            except Exception:
+                # Put the batch back so the next flush retries it
+                with self._lock:
+                    self._pending = batch + self._pending
+                raise
+            with self._lock:
+                for row in batch:
+                    remaining = self._pending_sessions.get(row[0], 0) - 1
+                    if remaining > 0:
+                        self._pending_sessions[row[0]] = remaining
+                    else:
+                        self._pending_sessions.pop(row[0], None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "durability": self.durability,
+                "shared": self.shared,
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "pending_rows": len(self._pending),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale_reloads": self.stale_reloads,
+            }
+
+    # --- Background flusher ---
+    def _ensure_flusher(self):
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._run_flusher, name="memory-flusher", daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush)
+
+    def _run_flusher(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Memory flush failed: {e}")
@@ -0,0 +1,300 @@
+import json
+import os
+import queue
+import socket
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from memory.state import StateStore
+from services.metrics import timed
+
+# === KV Settings ===
+STATE_KV_POOL_SIZE = int(os.getenv("STATE_KV_POOL_SIZE", "16"))
+STATE_KV_TIMEOUT = float(os.getenv("STATE_KV_TIMEOUT", "5"))
+STATE_KV_PREFIX = os.getenv("STATE_KV_PREFIX", "dramabot:")
+
+
+class KVError(Exception):
+    """Error reply from the key-value server."""
+
+
+class RESPConnection:
+    """One socket speaking RESP (the Redis protocol)."""
+
+    def __init__(self, host: str, port: int, timeout: float, password: Optional[str] = None, db: int = 0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+        if password:
+            self.execute("AUTH", password)
+        if db:
+            self.execute("SELECT", db)
+
+    @staticmethod
+    def _encode(args: tuple) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("key-value server closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return KVError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)[:-2]
+            return data.decode("utf-8")
+        if kind == b"*":
+            length = int(rest)
+            return None if length < 0 else [self._read() for _ in range(length)]
+        raise ConnectionError(f"unexpected reply {line!r}")
+
+    def pipeline(self, commands: List[tuple]) -> list:
+        """Send every command in one write, then read the replies in order."""
+        self.sock.sendall(b"".join(self._encode(command) for command in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, KVError):
+                raise reply
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class KVStore(StateStore):
+    """State on a networked key-value server speaking RESP (Redis or compatible).
+
+    Every worker on every node sees the same state.  A session is a list of
+    JSON rows plus a generation counter bumped in the same MULTI/EXEC as the
+    write, so readers get messages and generation from one snapshot.
+    Connections are pooled like SQLiteStore's and a broken one is replaced
+    (and the call retried once).
+    """
+
+    def __init__(self, url: str, pool_size: int = STATE_KV_POOL_SIZE, timeout: float = STATE_KV_TIMEOUT,
+                 prefix: str = STATE_KV_PREFIX):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.strip("/") or 0)
+        self.timeout = timeout
+        self.prefix = prefix
+        self.pool_size = pool_size
+        self._pool: "queue.LifoQueue[RESPConnection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    # --- Connection management ---
+    def _acquire(self) -> RESPConnection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.pool_size:
+                self._opened += 1
+                try:
+                    return RESPConnection(self.host, self.port, self.timeout, self.password, self.db)
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._pool.get()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        broken = False
+        try:
+            yield conn
+        except (OSError, ConnectionError):
+            broken = True
+            raise
+        finally:
+            if broken:
+                conn.close()
+                with self._lock:
+                    self._opened -= 1
+            else:
+                self._pool.put(conn)
+
+    def _run(self, commands: List[tuple]) -> list:
+        try:
+            with self.connection() as conn:
+                return conn.pipeline(commands)
+        except ConnectionError:
+            # Stale pooled socket (server restart, idle disconnect): one retry on a fresh one.
+            # Timeouts are not retried, since the write may already have been applied
+            with self.connection() as conn:
+                return conn.pipeline(commands)
+
+    def _transaction(self, commands: List[tuple]) -> list:
+        """Run commands atomically; returns their replies."""
+        return self._run([("MULTI",), *commands, ("EXEC",)])[-1]
+
+    def init(self):
+        self._run([("PING",)])
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    self._pool.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._opened = 0
+
+    # --- Keys ---
+    def _messages(self, session_id: str) -> str:
+        return f"{self.prefix}memory:{session_id}"
+
+    def _generation(self, session_id: str) -> str:
+        return f"{self.prefix}generation:{session_id}"
+
+    def _summary(self, session_id: str) -> str:
+        return f"{self.prefix}summary:{session_id}"
+
+    def _script(self, session_id: str) -> str:
+        return f"{self.prefix}script:{session_id}"
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}kv:{key}"
+
+    # --- Conversation memory ---
+    @timed("db_write")
+    def add_many(self, rows: Iterable[Tuple[str, str, str, float]]):
+        by_session = {}
+        for session_id, role, content, timestamp in rows:
+            by_session.setdefault(session_id, []).append(json.dumps([role, content, timestamp]))
+        commands = []
+        for session_id, encoded in by_session.items():
+            commands.append(("RPUSH", self._messages(session_id), *encoded))
+            commands.append(("INCRBY", self._generation(session_id), len(encoded)))
+        if commands:
+            self._transaction(commands)
+
+    @timed("db_write")
+    def append(self, session_id: str, rows: List[Tuple[str, str, str, float]]) -> Tuple[int, int]:
+        encoded = [json.dumps([role, content, timestamp]) for _, role, content, timestamp in rows]
+        _, after, _ = self._transaction([
+            ("RPUSH", self._messages(session_id), *encoded),
+            ("INCRBY", self._generation(session_id), len(encoded)),
+            ("DEL", self._script(session_id)),
+        ])
+        return after - len(encoded), after
+
+    @timed("db_write")
+    def write_turn(self, session_id: str, rows: List[Tuple[str, str, str, float]],
+                   summary: Optional[Tuple[str, int]] = None) -> Tuple[int, int]:
+        encoded = [json.dumps([role, content, timestamp]) for _, role, content, timestamp in rows]
+        commands = [("INCRBY", self._generation(session_id), len(encoded))]
+        if encoded:
+            commands.insert(0, ("RPUSH", self._messages(session_id), *encoded))
+            commands.append(("DEL", self._script(session_id)))
+        if summary is not None:
+            commands.append(("SET", self._summary(session_id), json.dumps(list(summary))))
+        replies = self._transaction(commands)
+        after = replies[1 if encoded else 0]
+        return after - len(encoded), after
+
+    @timed("db_read")
+    def generation(self, session_id: str) -> int:
+        return int(self._run([("GET", self._generation(session_id))])[0] or 0)
+
+    @timed("db_read")
+    def fetch_versioned(self, session_id: str) -> Tuple[int, List[dict]]:
+        generation, rows = self._transaction([
+            ("GET", self._generation(session_id)),
+            ("LRANGE", self._messages(session_id), 0, -1),
+        ])
+        messages = []
+        for row in rows:
+            role, content, _ = json.loads(row)
+            messages.append({"role": role, "content": content})
+        return int(generation or 0), messages
+
+    @timed("db_read")
+    def fetch_rows(self, session_id: str) -> list:
+        rows = self._run([("LRANGE", self._messages(session_id), 0, -1)])[0]
+        return [(i, session_id, *json.loads(row)) for i, row in enumerate(rows, start=1)]
+
+    @timed("db_read")
+    def count(self, session_id: str) -> int:
+        return self._run([("LLEN", self._messages(session_id))])[0]
+
+    @timed("db_write")
+    def delete(self, session_id: str) -> int:
+        deleted, *_ = self._transaction([
+            ("LLEN", self._messages(session_id)),
+            ("DEL", self._messages(session_id), self._summary(session_id), self._script(session_id)),
+            ("INCR", self._generation(session_id)),
+        ])
+        return deleted
+
+    @timed("db_read")
+    def fetch_summary(self, session_id: str) -> Tuple[str, int]:
+        value = self._run([("GET", self._summary(session_id))])[0]
+        return tuple(json.loads(value)) if value else ("", 0)
+
+    @timed("db_write")
+    def save_summary(self, session_id: str, summary: str, summarized_count: int):
+        self._run([("SET", self._summary(session_id), json.dumps([summary, summarized_count]))])
+
+    @timed("db_read")
+    def fetch_script(self, session_id: str) -> Optional[Tuple[str, str, str]]:
+        value = self._run([("GET", self._script(session_id))])[0]
+        return tuple(json.loads(value)) if value else None
+
+    @timed("db_write")
+    def save_script(self, session_id: str, state_key: str, template_version: str, result: str):
+        self._run([("SET", self._script(session_id), json.dumps([state_key, template_version, result]))])
+
+    @timed("db_write")
+    def delete_script(self, session_id: str):
+        self._run([("DEL", self._script(session_id))])
+
+    # --- Leases and records ---
+    @timed("db_write")
+    def claim(self, key: str, owner: str, ttl: float) -> str:
+        _, holder = self._run([
+            ("SET", self._key(key), owner, "NX", "PX", max(1, int(ttl * 1000))),
+            ("GET", self._key(key)),
+        ])
+        # Expired between the two commands: nobody holds it now, so try once more
+        return holder if holder is not None else self.claim(key, owner, ttl)
+
+    @timed("db_write")
+    def release(self, key: str, owner: str):
+        # GET-then-DEL can race only with a holder whose lease already expired
+        if self._run([("GET", self._key(key))])[0] == owner:
+            self._run([("DEL", self._key(key))])
+
+    @timed("db_write")
+    def put(self, key: str, value: str, ttl: Optional[float] = None):
+        expiry = ("PX", max(1, int(ttl * 1000))) if ttl else ()
+        self._run([("SET", self._key(key), value, *expiry)])
+
+    @timed("db_read")
+    def get_value(self, key: str) -> Optional[str]:
+        return self._run([("GET", self._key(key))])[0]
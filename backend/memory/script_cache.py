@@ -0,0 +1,45 @@
+import json
+import threading
+from typing import Optional
+
+from memory.state import StateStore
+from services.metrics import stage
+
+
+class ScriptCache:
+    """Last generated script per session, persisted in the memory DB.
+
+    An entry only matches while the conversation state and prompt template
+    version are unchanged.  It is deleted in the store when a turn is
+    committed to the session (and with the session), so a stale script is
+    gone for every worker and after restarts, not just in this process.
+    """
+
+    def __init__(self, store: StateStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str, state_key: str, template_version: str) -> Optional[dict]:
+        with stage("script_cache_lookup"):
+            row = self.store.fetch_script(session_id)
+        hit = row is not None and row[0] == state_key and row[1] == template_version
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json.loads(row[2]) if hit else None
+
+    def put(self, session_id: str, state_key: str, template_version: str, result: dict):
+        self.store.save_script(session_id, state_key, template_version, json.dumps(result))
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
@@ -1,65 +1,159 @@
-import sqlite3
-import time
-from pathlib import Path
+import hashlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
 
-DB_PATH = Path(__file__).resolve().parent.parent / "session_memory.db"
+from memory.cache import ConversationCache
+from memory.script_cache import ScriptCache
+from memory.state import create_state_store, is_shared
+from memory.unit_of_work import SessionUnit
 
-# === Initialize the memory DB ===
+# Pooled state store (SQLite/WAL file or networked KV, see STATE_BACKEND)
+store = create_state_store()
+
+# True when other worker processes read and write the same store
+SHARED_STATE = is_shared()
+
+# Per-session conversation cache (sync or write-behind, see MEMORY_DURABILITY)
+cache = ConversationCache(store, shared=SHARED_STATE)
+
+# Generated scripts keyed by conversation state (invalidated on every append)
+script_cache = ScriptCache(store)
+
+# The request's (or socket turn's) unit of work, if one is open in this context
+_unit: ContextVar[Optional[SessionUnit]] = ContextVar("memory_unit", default=None)
+
+def _active() -> Optional[SessionUnit]:
+    unit = _unit.get()
+    return unit if unit is not None and unit.open else None
+
+def _reader():
+    # SessionUnit and ConversationCache answer the same read calls
+    return _active() or cache
+
+# === Scope memory calls to one unit of work (the caller decides commit/discard) ===
+@contextmanager
+def unit_of_work():
+    """Route this context's memory reads/writes through a fresh SessionUnit.
+
+    Copies of the context (threadpool handlers, ``asyncio.to_thread``,
+    tasks) share the unit; the caller must ``commit()`` or ``discard()``
+    it, and anything after that goes straight to the cache.
+    """
+    unit = SessionUnit(cache)
+    token = _unit.set(unit)
+    try:
+        yield unit
+    finally:
+        _unit.reset(token)
+
+# === Finish a request's unit once its handler has produced the whole body ===
+async def commit_before_last_chunk(body: AsyncIterator[bytes], unit: SessionUnit,
+                                   commit: bool = True) -> AsyncIterator[bytes]:
+    """Relay ``body`` one chunk behind, committing (or discarding) ``unit`` before the last chunk.
+
+    Streamed handlers keep writing after the response starts; holding the
+    final chunk back means a client that sees the end of the response can
+    already read everything the request wrote.  Only a body that ran to
+    the end is committed: an error or a client gone mid-stream
+    (GeneratorExit/cancel) leaves a partial turn, which is discarded.
+    """
+    previous = None
+    completed = False
+    try:
+        async for chunk in body:
+            if previous is not None:
+                yield previous
+            previous = chunk
+        completed = True
+    finally:
+        if commit and completed:
+            unit.commit()
+        else:
+            unit.discard()
+    if previous is not None:
+        yield previous
+
+# === Drop what a failed turn staged (no-op outside a unit of work, where writes are already in) ===
+def discard_pending():
+    unit = _active()
+    if unit is not None:
+        unit.discard()
+
+# === Initialize the memory DB (called from the app's lifespan; the store also migrates on first use) ===
 def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute('''
-            CREATE TABLE IF NOT EXISTS memory (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT,
-                role TEXT,
-                content TEXT,
-                timestamp REAL
-            )
-        ''')
-        conn.commit()
+    store.init()
 
 # === Add a message to memory ===
 def add_to_memory(session_id: str, role: str, message: str):
-    timestamp = time.time()
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.execute(
-            "INSERT INTO memory (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
-            (session_id, role, message, timestamp)
-        )
-        conn.commit()
-
-# === Get all messages for a session ===
-def get_conversation(session_id: str):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.execute('''
-            SELECT role, content FROM memory
-            WHERE session_id = ?
-            ORDER BY timestamp ASC
-        ''', (session_id,))
-        return [{"role": row[0], "content": row[1]} for row in cursor.fetchall()]
-
-# === Get memory stats ===
-def get_memory_stats(session_id: str) -> dict:
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.execute("SELECT COUNT(*) FROM memory WHERE session_id = ?", (session_id,))
-        message_count = cursor.fetchone()[0]
-        return {
-            "session_id": session_id,
-            "message_count": message_count
-        }
-
-# === Dump memory (for debugging/logging elsewhere) ===
-def dump_memory(session_id: str):
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.execute("SELECT * FROM memory WHERE session_id = ?", (session_id,))
-        return cursor.fetchall()
+    add_many_to_memory(session_id, [(role, message)])
+
+# === Add several (role, message) pairs in one batch ===
+def add_many_to_memory(session_id: str, messages: list):
+    unit = _active()
+    if unit is not None and unit.add(session_id, messages):
+        return
+    cache.extend(session_id, messages)
+
+# === Get messages for a session (all, after a cursor, or the last N) ===
+def get_conversation(session_id: str, after_id: Optional[int] = None, limit: Optional[int] = None,
+                     tail: Optional[int] = None):
+    """Whole history, or with ``after_id``/``limit``/``tail`` just that slice (messages then carry their ``id``)."""
+    if after_id is None and limit is None and tail is None:
+        return _reader().get(session_id)
+    return _reader().page(session_id, after_id or 0, limit, tail)[2]
+
+# === One page of messages plus the cursor/version a poller needs ===
+def get_conversation_page(session_id: str, after_id: int = 0, limit: Optional[int] = None,
+                          tail: Optional[int] = None) -> dict:
+    reader = _reader()
+    total, last, messages = reader.page(session_id, after_id, limit, tail)
+    reset = tail is None and after_id > total
+    if reset:
+        # The session was cleared since the client's cursor: start over from the beginning
+        total, last, messages = reader.page(session_id, 0, limit)
+    if messages:
+        next_cursor = messages[-1]["id"]
+    else:
+        next_cursor = total if tail is not None or reset else after_id
+    return {
+        "messages": messages,
+        "total": total,
+        "next_cursor": next_cursor,
+        "has_more": next_cursor < total,
+        "reset": reset,
+        "version": _version(total, last),
+    }
+
+# === Count messages without copying the conversation ===
+def count_messages(session_id: str) -> int:
+    return _reader().last_message(session_id)[0]
+
+# === Cheap fingerprint of the conversation state (changes on every append) ===
+def conversation_version(session_id: str) -> str:
+    return _version(*_reader().last_message(session_id))
+
+def _version(count: int, last: Optional[dict]) -> str:
+    digest = hashlib.sha1(last["content"].encode("utf-8")).hexdigest()[:12] if last else "0"
+    return f"{count}:{digest}"
+
+# === Rolling summary of turns outside the prompt window ===
+def get_summary(session_id: str):
+    return _reader().get_summary(session_id)
+
+def save_summary(session_id: str, summary: str, summarized_count: int):
+    unit = _active()
+    if unit is None or not unit.set_summary(session_id, summary, summarized_count):
+        cache.set_summary(session_id, summary, summarized_count)
 
 # === Delete memory for a session ===
 def delete_memory(session_id: str) -> bool:
-    with sqlite3.connect(DB_PATH) as conn:
-        cursor = conn.execute('DELETE FROM memory WHERE session_id = ?', (session_id,))
-        conn.commit()
-        return cursor.rowcount > 0
+    unit = _active()
+    if unit is not None:
+        unit.forget(session_id)
+    return cache.delete(session_id)
+
+# === Persist pending write-behind turns (call at shutdown) ===
+def flush_memory():
+    cache.flush()
 
-# Initialize DB on import
-init_db()
@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+# === State Backend Settings ===
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite").lower()           # sqlite | kv
+STATE_KV_URL = os.getenv("STATE_KV_URL", "redis://127.0.0.1:6379/0")   # any RESP (Redis-protocol) server
+DB_PATH = Path(os.getenv("MEMORY_DB_PATH", Path(__file__).resolve().parent.parent / "session_memory.db"))
+
+# "auto" treats the state as shared when it lives on the network or this is one
+# of several workers (uvicorn --workers / WEB_CONCURRENCY); set true/false to force
+STATE_SHARED = os.getenv("STATE_SHARED", "auto").lower()
+
+
+class StateStore(ABC):
+    """Storage behind conversation memory, the TTS render leases and job state.
+
+    Rows are ``(session_id, role, content, timestamp)``.  Every write to a
+    session advances its *generation*, so a per-process cache can tell
+    cheaply whether another worker changed the session.  A turn's write
+    (``append``/``write_turn``) also deletes the session's stored script (it
+    no longer matches the conversation); ``add_many`` only inserts rows, for
+    write-behind flushes of turns whose script was dropped when they were
+    committed.  So no process has to remember which scripts are stale.  The
+    small key/value part (``claim``/``release``/``put``/``get_value``)
+    carries leases and job records with expiry.
+
+    Backends implement every abstract method; one that misses any fails
+    when it is constructed, not on the first call.
+    """
+
+    # --- Lifecycle ---
+    def init(self):
+        """Create/migrate the schema or check the connection up front."""
+
+    def close(self):
+        pass
+
+    # --- Conversation memory ---
+    @abstractmethod
+    def add_many(self, rows: Iterable[Tuple[str, str, str, float]]):
+        """Insert rows (any mix of sessions) in one batch; rows only, scripts are left alone."""
+
+    @abstractmethod
+    def append(self, session_id: str, rows: List[Tuple[str, str, str, float]]) -> Tuple[int, int]:
+        """Atomically add one session's rows (and drop its script); returns its generation (before, after)."""
+
+    def write_turn(self, session_id: str, rows: List[Tuple[str, str, str, float]],
+                   summary: Optional[Tuple[str, int]] = None) -> Tuple[int, int]:
+        """Everything one turn changes in a session (rows, stale script, summary) as one write.
+
+        Returns the generation (before, after) like ``append``.  Stores
+        should override this with a single transaction; the default is
+        correct but makes one round trip per part.
+        """
+        before, after = self.append(session_id, rows) if rows else (self.generation(session_id),) * 2
+        if summary is not None:
+            self.save_summary(session_id, *summary)
+        return before, after
+
+    @abstractmethod
+    def generation(self, session_id: str) -> int:
+        """Advances on every write to the session (0 for a new one)."""
+
+    @abstractmethod
+    def fetch_versioned(self, session_id: str) -> Tuple[int, List[dict]]:
+        """(generation, messages) read as one consistent snapshot."""
+
+    def fetch_conversation(self, session_id: str) -> List[dict]:
+        return self.fetch_versioned(session_id)[1]
+
+    @abstractmethod
+    def fetch_rows(self, session_id: str) -> list:
+        """``(id, session_id, role, content, timestamp)`` tuples, oldest first."""
+
+    @abstractmethod
+    def count(self, session_id: str) -> int:
+        """Number of messages stored for the session."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> int:
+        """Delete a session's messages, summary and script; returns messages deleted."""
+
+    @abstractmethod
+    def fetch_summary(self, session_id: str) -> Tuple[str, int]:
+        """(rolling summary, messages it covers); ``("", 0)`` if there is none."""
+
+    @abstractmethod
+    def save_summary(self, session_id: str, summary: str, summarized_count: int):
+        """Store the summary of the session's first ``summarized_count`` messages."""
+
+    @abstractmethod
+    def fetch_script(self, session_id: str) -> Optional[Tuple[str, str, str]]:
+        """(state_key, template_version, result JSON) of the stored script, or None."""
+
+    @abstractmethod
+    def save_script(self, session_id: str, state_key: str, template_version: str, result: str):
+        """Store the script generated for conversation state ``state_key``."""
+
+    @abstractmethod
+    def delete_script(self, session_id: str):
+        """Drop the session's stored script, if any."""
+
+    # --- Leases and records ---
+    @abstractmethod
+    def claim(self, key: str, owner: str, ttl: float) -> str:
+        """Take ``key`` for ``ttl`` seconds unless someone holds it; returns the holder."""
+
+    @abstractmethod
+    def release(self, key: str, owner: str):
+        """Drop ``key`` if ``owner`` still holds it."""
+
+    @abstractmethod
+    def put(self, key: str, value: str, ttl: Optional[float] = None):
+        """Set ``key``, expiring after ``ttl`` seconds if given."""
+
+    @abstractmethod
+    def get_value(self, key: str) -> Optional[str]:
+        """The value of ``key`` unless it is missing or expired."""
+
+
+def is_shared(backend: str = STATE_BACKEND, setting: str = STATE_SHARED) -> bool:
+    if setting in ("true", "false"):
+        return setting == "true"
+    if backend != "sqlite":
+        return True
+    # uvicorn's --workers children are multiprocessing processes
+    return multiprocessing.parent_process() is not None or int(os.getenv("WEB_CONCURRENCY", "1")) > 1
+
+
+def create_state_store(backend: str = STATE_BACKEND) -> StateStore:
+    if backend == "sqlite":
+        from memory.store import SQLiteStore
+        return SQLiteStore(DB_PATH)
+    if backend == "kv":
+        from memory.kv_store import KVStore
+        return KVStore(STATE_KV_URL)
+    raise ValueError(f"Unknown STATE_BACKEND: {backend}")
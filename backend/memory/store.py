@@ -0,0 +1,295 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from memory.state import StateStore
+from services.metrics import timed
+
+# === Pool Settings ===
+POOL_SIZE = int(os.getenv("MEMORY_DB_POOL_SIZE", "8"))
+BUSY_TIMEOUT_MS = int(os.getenv("MEMORY_DB_BUSY_TIMEOUT_MS", "5000"))
+
+# === Schema Migrations (applied in order, tracked by PRAGMA user_version) ===
+MIGRATIONS = [
+    # v1: original memory table
+    '''
+    CREATE TABLE IF NOT EXISTS memory (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT,
+        role TEXT,
+        content TEXT,
+        timestamp REAL
+    )
+    ''',
+    # v2: per-session lookups walk the index in insertion order (no scan, no sort)
+    "CREATE INDEX IF NOT EXISTS idx_memory_session_id ON memory (session_id, id)",
+    # v3: rolling per-session summary of turns that fell out of the prompt window
+    '''
+    CREATE TABLE IF NOT EXISTS session_summary (
+        session_id TEXT PRIMARY KEY,
+        summary TEXT,
+        summarized_count INTEGER,
+        updated REAL
+    )
+    ''',
+    # v4: last generated script per session, keyed by conversation state + template version
+    '''
+    CREATE TABLE IF NOT EXISTS script_cache (
+        session_id TEXT PRIMARY KEY,
+        state_key TEXT,
+        template_version TEXT,
+        result TEXT,
+        created REAL
+    )
+    ''',
+    # v5: leases and job records shared by every worker (expires NULL = never)
+    '''
+    CREATE TABLE IF NOT EXISTS state_kv (
+        key TEXT PRIMARY KEY,
+        value TEXT,
+        expires REAL
+    )
+    ''',
+]
+
+# === Statements (kept constant so sqlite3's per-connection statement cache reuses them) ===
+SQL_INSERT = "INSERT INTO memory (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)"
+SQL_SELECT_SESSION = "SELECT role, content FROM memory WHERE session_id = ? ORDER BY id ASC"
+SQL_SELECT_SESSION_ROWS = "SELECT * FROM memory WHERE session_id = ? ORDER BY id ASC"
+SQL_COUNT_SESSION = "SELECT COUNT(*) FROM memory WHERE session_id = ?"
+SQL_DELETE_SESSION = "DELETE FROM memory WHERE session_id = ?"
+SQL_SELECT_SUMMARY = "SELECT summary, summarized_count FROM session_summary WHERE session_id = ?"
+SQL_UPSERT_SUMMARY = (
+    "INSERT INTO session_summary (session_id, summary, summarized_count, updated) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(session_id) DO UPDATE SET summary = excluded.summary, "
+    "summarized_count = excluded.summarized_count, updated = excluded.updated"
+)
+SQL_DELETE_SUMMARY = "DELETE FROM session_summary WHERE session_id = ?"
+SQL_SELECT_SCRIPT = "SELECT state_key, template_version, result FROM script_cache WHERE session_id = ?"
+SQL_UPSERT_SCRIPT = (
+    "INSERT OR REPLACE INTO script_cache (session_id, state_key, template_version, result, created) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+SQL_DELETE_SCRIPT = "DELETE FROM script_cache WHERE session_id = ?"
+SQL_SELECT_SESSION_VERSIONED = "SELECT id, role, content FROM memory WHERE session_id = ? ORDER BY id ASC"
+SQL_GENERATION = "SELECT COALESCE(MAX(id), 0) FROM memory WHERE session_id = ?"
+SQL_EXPIRE_KEY = "DELETE FROM state_kv WHERE key = ? AND expires < ?"
+SQL_EXPIRE_ALL = "DELETE FROM state_kv WHERE expires < ?"
+SQL_CLAIM = "INSERT OR IGNORE INTO state_kv (key, value, expires) VALUES (?, ?, ?)"
+SQL_RELEASE = "DELETE FROM state_kv WHERE key = ? AND value = ?"
+SQL_PUT = "INSERT OR REPLACE INTO state_kv (key, value, expires) VALUES (?, ?, ?)"
+SQL_GET = "SELECT value FROM state_kv WHERE key = ? AND (expires IS NULL OR expires >= ?)"
+
+PRUNE_EVERY = 256  # put() calls between sweeps of expired keys
+
+
+class SQLiteStore(StateStore):
+    """Thread-safe pool of SQLite connections in WAL mode.
+
+    Connections are opened lazily (up to ``pool_size``) and handed out one per
+    caller, so it is safe to use from uvicorn's threadpool.  Several worker
+    processes on one host can share the file: writes take SQLite's write lock
+    (``BEGIN IMMEDIATE`` where a read decides the write) and wait up to the
+    busy timeout for it.  A session's generation is its newest row id.
+    """
+
+    def __init__(self, path: Path, pool_size: int = POOL_SIZE):
+        self.path = Path(path)
+        self.pool_size = pool_size
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._migrated = False
+        self._puts = 0
+
+    # --- Connection management ---
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=64,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection):
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= len(MIGRATIONS):
+            return
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Re-read under the write lock in case another process migrated first
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for step, statement in enumerate(MIGRATIONS[version:], start=version + 1):
+                conn.execute(statement)
+                conn.execute(f"PRAGMA user_version={step}")
+                print(f"🗃️ Migrated memory DB to schema v{step}")
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.pool_size:
+                conn = self._connect()
+                if not self._migrated:
+                    self._migrate(conn)
+                    self._migrated = True
+                self._opened += 1
+                return conn
+        return self._pool.get()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    def init(self):
+        """Open one connection so the schema is created/migrated up front."""
+        with self.connection():
+            pass
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    self._pool.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._opened = 0
+
+    # --- Queries ---
+    @timed("db_write")
+    def add_many(self, rows: Iterable[Tuple[str, str, str, float]]):
+        """Insert (session_id, role, content, timestamp) rows in one transaction."""
+        with self.connection() as conn, conn:
+            conn.executemany(SQL_INSERT, rows)
+
+    @timed("db_write")
+    def append(self, session_id: str, rows: List[Tuple[str, str, str, float]]) -> Tuple[int, int]:
+        with self.connection() as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.execute(SQL_GENERATION, (session_id,)).fetchone()[0]
+            conn.executemany(SQL_INSERT, rows)
+            conn.execute(SQL_DELETE_SCRIPT, (session_id,))
+            return before, conn.execute(SQL_GENERATION, (session_id,)).fetchone()[0]
+
+    @timed("db_write")
+    def write_turn(self, session_id: str, rows: List[Tuple[str, str, str, float]],
+                   summary: Optional[Tuple[str, int]] = None) -> Tuple[int, int]:
+        with self.connection() as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            before = conn.execute(SQL_GENERATION, (session_id,)).fetchone()[0]
+            if rows:
+                conn.executemany(SQL_INSERT, rows)
+                conn.execute(SQL_DELETE_SCRIPT, (session_id,))
+            if summary is not None:
+                conn.execute(SQL_UPSERT_SUMMARY, (session_id, summary[0], summary[1], time.time()))
+            after = conn.execute(SQL_GENERATION, (session_id,)).fetchone()[0] if rows else before
+            return before, after
+
+    @timed("db_read")
+    def generation(self, session_id: str) -> int:
+        with self.connection() as conn:
+            return conn.execute(SQL_GENERATION, (session_id,)).fetchone()[0]
+
+    @timed("db_read")
+    def fetch_versioned(self, session_id: str) -> Tuple[int, List[dict]]:
+        with self.connection() as conn:
+            rows = conn.execute(SQL_SELECT_SESSION_VERSIONED, (session_id,)).fetchall()
+        return (rows[-1][0] if rows else 0), [{"role": role, "content": content} for _, role, content in rows]
+
+    @timed("db_read")
+    def fetch_conversation(self, session_id: str) -> List[dict]:
+        with self.connection() as conn:
+            rows = conn.execute(SQL_SELECT_SESSION, (session_id,)).fetchall()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    @timed("db_read")
+    def fetch_rows(self, session_id: str) -> list:
+        with self.connection() as conn:
+            return conn.execute(SQL_SELECT_SESSION_ROWS, (session_id,)).fetchall()
+
+    @timed("db_read")
+    def count(self, session_id: str) -> int:
+        with self.connection() as conn:
+            return conn.execute(SQL_COUNT_SESSION, (session_id,)).fetchone()[0]
+
+    @timed("db_write")
+    def delete(self, session_id: str) -> int:
+        with self.connection() as conn, conn:
+            conn.execute(SQL_DELETE_SUMMARY, (session_id,))
+            conn.execute(SQL_DELETE_SCRIPT, (session_id,))
+            return conn.execute(SQL_DELETE_SESSION, (session_id,)).rowcount
+
+    @timed("db_read")
+    def fetch_summary(self, session_id: str) -> Tuple[str, int]:
+        """Return (summary, number of messages folded into it)."""
+        with self.connection() as conn:
+            row = conn.execute(SQL_SELECT_SUMMARY, (session_id,)).fetchone()
+        return (row[0], row[1]) if row else ("", 0)
+
+    @timed("db_write")
+    def save_summary(self, session_id: str, summary: str, summarized_count: int):
+        with self.connection() as conn, conn:
+            conn.execute(SQL_UPSERT_SUMMARY, (session_id, summary, summarized_count, time.time()))
+
+    @timed("db_read")
+    def fetch_script(self, session_id: str) -> Optional[Tuple[str, str, str]]:
+        """Return (state_key, template_version, result JSON) or None."""
+        with self.connection() as conn:
+            return conn.execute(SQL_SELECT_SCRIPT, (session_id,)).fetchone()
+
+    @timed("db_write")
+    def save_script(self, session_id: str, state_key: str, template_version: str, result: str):
+        with self.connection() as conn, conn:
+            conn.execute(SQL_UPSERT_SCRIPT, (session_id, state_key, template_version, result, time.time()))
+
+    @timed("db_write")
+    def delete_script(self, session_id: str):
+        with self.connection() as conn, conn:
+            conn.execute(SQL_DELETE_SCRIPT, (session_id,))
+
+    # --- Leases and records ---
+    @timed("db_write")
+    def claim(self, key: str, owner: str, ttl: float) -> str:
+        now = time.time()
+        with self.connection() as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(SQL_EXPIRE_KEY, (key, now))
+            conn.execute(SQL_CLAIM, (key, owner, now + ttl))
+            return conn.execute(SQL_GET, (key, now)).fetchone()[0]
+
+    @timed("db_write")
+    def release(self, key: str, owner: str):
+        with self.connection() as conn, conn:
+            conn.execute(SQL_RELEASE, (key, owner))
+
+    @timed("db_write")
+    def put(self, key: str, value: str, ttl: Optional[float] = None):
+        now = time.time()
+        self._puts += 1
+        with self.connection() as conn, conn:
+            conn.execute(SQL_PUT, (key, value, now + ttl if ttl else None))
+            if self._puts % PRUNE_EVERY == 0:
+                conn.execute(SQL_EXPIRE_ALL, (now,))
+
+    @timed("db_read")
+    def get_value(self, key: str) -> Optional[str]:
+        with self.connection() as conn:
+            row = conn.execute(SQL_GET, (key, time.time())).fetchone()
+        return row[0] if row else None
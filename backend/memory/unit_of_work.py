@@ -0,0 +1,117 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from memory.cache import ConversationCache, slice_messages
+
+
+class _SessionView:
+    __slots__ = ("messages", "added", "summary", "summary_changed")
+
+    def __init__(self):
+        self.messages: Optional[List[dict]] = None  # loaded once, staged messages appended
+        self.added: List[Tuple[str, str]] = []
+        self.summary: Optional[Tuple[str, int]] = None
+        self.summary_changed = False
+
+
+class SessionUnit:
+    """Conversation memory as one request (or one socket turn) sees it.
+
+    Nothing is read until a handler asks: the first read of a session
+    loads it once and later reads, counts and versions come from that
+    copy.  Messages and summary updates are staged, so the request's own
+    reads see them, and ``commit()`` writes each touched session with one
+    store write (rows, stale script and summary together).  After
+    ``commit()`` or ``discard()`` the unit is closed and callers go back
+    to the cache directly.
+    """
+
+    def __init__(self, cache: ConversationCache):
+        self.cache = cache
+        self.open = True
+        self._sessions: Dict[str, _SessionView] = {}
+        self._lock = threading.RLock()  # sync handlers run on threadpool threads
+
+    def _view(self, session_id: str) -> _SessionView:
+        view = self._sessions.get(session_id)
+        if view is None:
+            view = self._sessions[session_id] = _SessionView()
+        return view
+
+    def _messages(self, session_id: str) -> List[dict]:
+        view = self._view(session_id)
+        if view.messages is None:
+            view.messages = self.cache.get(session_id)
+            view.messages.extend({"role": role, "content": content} for role, content in view.added)
+        return view.messages
+
+    # --- Reads ---
+    def get(self, session_id: str) -> List[dict]:
+        with self._lock:
+            return list(self._messages(session_id))
+
+    def page(self, session_id: str, after_id: int = 0, limit: Optional[int] = None,
+             tail: Optional[int] = None) -> Tuple[int, Optional[dict], List[dict]]:
+        with self._lock:
+            view = self._sessions.get(session_id)
+            if view is None or (view.messages is None and not view.added):
+                # Untouched: let the cache copy just the slice
+                return self.cache.page(session_id, after_id, limit, tail)
+            messages = self._messages(session_id)
+            return len(messages), (messages[-1] if messages else None), slice_messages(messages, after_id, limit, tail)
+
+    def last_message(self, session_id: str) -> Tuple[int, Optional[dict]]:
+        with self._lock:
+            view = self._sessions.get(session_id)
+            if view is None or (view.messages is None and not view.added):
+                return self.cache.last_message(session_id)
+            messages = self._messages(session_id)
+            return len(messages), (messages[-1] if messages else None)
+
+    def get_summary(self, session_id: str) -> Tuple[str, int]:
+        with self._lock:
+            view = self._view(session_id)
+            if view.summary is None:
+                view.summary = self.cache.get_summary(session_id)
+            return view.summary
+
+    # --- Staged writes (False once the unit is closed: write directly instead) ---
+    def add(self, session_id: str, messages: list) -> bool:
+        with self._lock:
+            if not self.open:
+                return False
+            view = self._view(session_id)
+            view.added.extend(messages)
+            if view.messages is not None:
+                view.messages.extend({"role": role, "content": content} for role, content in messages)
+            return True
+
+    def set_summary(self, session_id: str, summary: str, summarized_count: int) -> bool:
+        with self._lock:
+            if not self.open:
+                return False
+            view = self._view(session_id)
+            view.summary, view.summary_changed = (summary, summarized_count), True
+            return True
+
+    def forget(self, session_id: str):
+        """Drop what this unit holds for a session that was just deleted."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    # --- Finish ---
+    def commit(self):
+        """Write every touched session (one store write each) and close the unit."""
+        with self._lock:
+            if not self.open:
+                return
+            self.open = False
+            sessions, self._sessions = self._sessions, {}
+        for session_id, view in sessions.items():
+            self.cache.commit(session_id, view.added, view.summary if view.summary_changed else None)
+
+    def discard(self):
+        """Close the unit without writing anything it staged."""
+        with self._lock:
+            self.open = False
+            self._sessions = {}
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Request
 from pydantic import BaseModel
+from memory.session_memory import count_messages
 from services.llm import generate_script_from_conversation
 import json
 
@@ -9,15 +10,12 @@ class GenerateScriptRequest(BaseModel):
     session_id: str
 
 @router.post("/")
-async def generate_script(payload: GenerateScriptRequest, request: Request):
+def generate_script(payload: GenerateScriptRequest, request: Request):
     session_id = payload.session_id
     print(f"\n🎬 [SCRIPT GEN] Script requested for session: {session_id}")
 
-    # Get conversation memory from app state
-    session_memory = request.app.state.session_memory
-    conversation = session_memory.get(session_id, [])
-
-    if not conversation:
+    # Conversation memory lives in the shared state store (every worker sees the same sessions)
+    if not count_messages(session_id):
         
         return {"error": "No conversation found for this session ID."}
 
@@ -0,0 +1,328 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from fastapi.staticfiles import StaticFiles
+
+from memory.session_memory import SHARED_STATE, store
+from memory.state import StateStore
+from services.metrics import timed
+
+# === Cache Settings ===
+AUDIO_CACHE_DIR = Path(os.getenv("AUDIO_CACHE_DIR", "static/audio/cache"))
+AUDIO_CACHE_URL = os.getenv("AUDIO_CACHE_URL", "/static/audio/cache")
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+AUDIO_CACHE_TTL = float(os.getenv("AUDIO_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # 0 = never expire
+AUDIO_RENDER_LEASE = float(os.getenv("AUDIO_RENDER_LEASE_SECONDS", "60"))  # cross-worker render lock
+AUDIO_LEASE_POLL = 0.05
+AUDIO_STREAM_CHUNK = 16 * 1024
+
+
+def cache_key(text: str, voice: str, lang: str, engine: str) -> str:
+    """Content address for a rendered clip."""
+    return hashlib.sha256("\0".join((engine, voice, lang, text)).encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Content-addressed on-disk audio cache with LRU/TTL eviction under a byte budget.
+
+    Each entry is ``<key>.mp3`` plus ``<key>.json`` metadata (e.g. the emotional
+    score).  File mtime doubles as the LRU clock and the TTL counts idle time
+    since the last hit.  Everything lives on disk, so the cache survives
+    restarts and is shared by every worker pointing at the same directory.
+    Concurrent requests for the same key render it only once (single-flight);
+    with ``leases`` (a shared StateStore) that holds across workers too.
+    ``stream()`` does the same for engines that produce audio incrementally,
+    relaying chunks to the caller while they are written into the cache.
+    """
+
+    def __init__(
+        self,
+        directory: Path = AUDIO_CACHE_DIR,
+        url_prefix: str = AUDIO_CACHE_URL,
+        max_bytes: int = AUDIO_CACHE_MAX_BYTES,
+        ttl: float = AUDIO_CACHE_TTL,
+        leases: Optional[StateStore] = None,
+    ):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.leases = leases
+        self._owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._bytes = None  # computed on first write
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lease_waits = 0
+
+    # --- Paths ---
+    def audio_path(self, key: str) -> Path:
+        return self.directory / f"{key}.mp3"
+
+    def meta_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def url(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}.mp3"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        """The key behind a URL from ``url()``, or None if it isn't one of ours."""
+        prefix = f"{self.url_prefix}/"
+        if not url.startswith(prefix) or not url.endswith(".mp3"):
+            return None
+        return url[len(prefix):-len(".mp3")]
+
+    # --- Lookup ---
+    @timed("audio_cache_lookup")
+    def get(self, key: str) -> Optional[dict]:
+        """Return ``{"url", "meta"}`` for a live entry, refreshing its LRU time."""
+        path = self.audio_path(key)
+        try:
+            stat = path.stat()
+            meta = json.loads(self.meta_path(key).read_text())
+        except (OSError, ValueError):
+            return None
+        if self.ttl and time.time() - stat.st_mtime > self.ttl:
+            self._remove(key)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return {"url": self.url(key), "meta": meta}
+
+    def get_or_create(self, key: str, render: Callable[[str], None], meta: Optional[dict] = None) -> dict:
+        """Return the cached entry for ``key``, calling ``render(path)`` once on a miss."""
+        while True:
+            entry = self.get(key)
+            if entry is not None:
+                with self._lock:
+                    self.hits += 1
+                return entry
+            with self._lock:
+                event = self._inflight.get(key)
+                leader = event is None
+                if leader:
+                    event = self._inflight[key] = threading.Event()
+            if not leader:
+                # Someone else is rendering this key; wait and re-check
+                event.wait()
+                continue
+            try:
+                with self._lock:
+                    self.misses += 1
+                if self.leases is None:
+                    return self._create(key, render, meta or {})
+                return self._create_leased(key, render, meta or {})
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    def read(self, key: str, rerender: Callable[[], object]) -> bytes:
+        """The clip's bytes; if it was evicted since it was rendered, ``rerender()`` puts it back first.
+
+        For assembling a file out of cached parts: nothing pins a finished
+        part against ``evict()`` until the assembly reads it.
+        """
+        for attempt in range(3):
+            try:
+                with open(self.audio_path(key), "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+                rerender()
+
+    def stream(self, key: str, chunks: Callable[[], Iterable[bytes]], meta: Optional[dict] = None) -> Iterator[bytes]:
+        """Yield the clip for ``key``: from disk on a hit, else relay ``chunks()`` while caching it.
+
+        Callers that arrive while the clip is being streamed wait for it to
+        land in the cache.  If the consumer stops early (client went away)
+        the partial clip is discarded rather than cached.
+        """
+        while True:
+            if self.get(key) is not None:
+                try:
+                    f = open(self.audio_path(key), "rb")
+                except OSError:
+                    continue  # evicted between the lookup and the open
+                with self._lock:
+                    self.hits += 1
+                with f:
+                    while chunk := f.read(AUDIO_STREAM_CHUNK):
+                        yield chunk
+                return
+            with self._lock:
+                event = self._inflight.get(key)
+                leader = event is None
+                if leader:
+                    event = self._inflight[key] = threading.Event()
+            if not leader:
+                event.wait()
+                continue
+            try:
+                with self._lock:
+                    self.misses += 1
+                if self.leases is None:
+                    yield from self._relay(key, chunks, meta or {})
+                    return
+                lease, owner = self._lease(key)
+                if self._wait_for_lease(key, lease, owner) is not None:
+                    continue  # another worker finished it; serve the file
+                try:
+                    if self.get(key) is None:
+                        yield from self._relay(key, chunks, meta or {})
+                        return
+                finally:
+                    self.leases.release(lease, owner)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                event.set()
+
+    # --- Writes ---
+    def _lease(self, key: str):
+        return f"audio:{key}", f"{self._owner}:{threading.get_ident()}"
+
+    def _wait_for_lease(self, key: str, lease: str, owner: str) -> Optional[dict]:
+        """Claim the render lease; returns the entry instead if its holder finished it meanwhile."""
+        while self.leases.claim(lease, owner, AUDIO_RENDER_LEASE) != owner:
+            with self._lock:
+                self.lease_waits += 1
+            time.sleep(AUDIO_LEASE_POLL)
+            entry = self.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def _create_leased(self, key: str, render: Callable[[str], None], meta: dict) -> dict:
+        """Render under a cross-worker lease; if another worker holds it, wait for its file."""
+        lease, owner = self._lease(key)
+        entry = self._wait_for_lease(key, lease, owner)
+        if entry is not None:
+            return entry
+        try:
+            # The previous holder may have finished between our miss and the claim
+            return self.get(key) or self._create(key, render, meta)
+        finally:
+            self.leases.release(lease, owner)
+
+    def _tmp_path(self, key: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self.audio_path(key).with_name(f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    def _create(self, key: str, render: Callable[[str], None], meta: dict) -> dict:
+        tmp = self._tmp_path(key)
+        try:
+            render(str(tmp))
+            return self._commit(key, tmp, meta)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def _relay(self, key: str, chunks: Callable[[], Iterable[bytes]], meta: dict) -> Iterator[bytes]:
+        tmp = self._tmp_path(key)
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in chunks():
+                    f.write(chunk)
+                    yield chunk
+            self._commit(key, tmp, meta)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    def _commit(self, key: str, tmp: Path, meta: dict) -> dict:
+        """Move a finished render into place (metadata first, so readers never see audio without it)."""
+        size = tmp.stat().st_size
+        meta = {**meta, "created": time.time(), "bytes": size}
+        tmp_meta = tmp.with_suffix(".json.tmp")
+        tmp_meta.write_text(json.dumps(meta))
+        os.replace(tmp_meta, self.meta_path(key))
+        os.replace(tmp, self.audio_path(key))
+        self._account(size)
+        return {"url": self.url(key), "meta": meta}
+
+    def _remove(self, key: str) -> int:
+        freed = 0
+        for path in (self.audio_path(key), self.meta_path(key)):
+            try:
+                freed += path.stat().st_size if path.suffix == ".mp3" else 0
+                path.unlink()
+            except OSError:
+                pass
+        return freed
+
+    def _account(self, size: int):
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(p.stat().st_size for p in self.directory.glob("*.mp3"))
+            else:
+                self._bytes += size
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least-recently-used ones down to 90% of the budget."""
+        entries = []
+        for path in self.directory.glob("*.mp3"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path.stem))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        now = time.time()
+        for mtime, size, key in entries:
+            expired = self.ttl and now - mtime > self.ttl
+            if not expired and total <= target:
+                continue
+            with self._lock:
+                if key in self._inflight:
+                    continue
+            self._remove(key)
+            total -= size
+            self.evictions += 1
+        with self._lock:
+            self._bytes = total
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "lease_waits": self.lease_waits,
+            }
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that marks content-addressed cache files as immutable."""
+
+    def __init__(self, *args, immutable_dir: Path = AUDIO_CACHE_DIR, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_dir = Path(immutable_dir).resolve()
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if Path(full_path).resolve().parent == self.immutable_dir:
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+# Shared cache instance (render leases only matter when several workers share it)
+audio_cache = AudioCache(leases=store if SHARED_STATE else None)
@@ -0,0 +1,173 @@
+# services/audio_prep.py
+# Clip preprocessing before transcription; imported on first use so numpy stays off the startup path
+import io
+import os
+import shutil
+import time
+import wave
+from typing import Optional, Tuple
+
+import numpy as np
+
+from services.uploads import sniff_format
+
+# === Preprocessing Settings ===
+TARGET_RATE = 16000                 # what Whisper resamples to internally
+VAD_FRAME_MS = 30
+VAD_PAD_MS = int(os.getenv("VAD_PAD_MS", "200"))               # speech kept around the voiced span
+VAD_MIN_DBFS = float(os.getenv("VAD_MIN_DBFS", "-45"))         # frames quieter than this are silence
+VAD_NOISE_RATIO = float(os.getenv("VAD_NOISE_RATIO", "3.0"))   # ... or than this × the noise floor
+VAD_FLOOR_PERCENTILE = float(os.getenv("VAD_FLOOR_PERCENTILE", "10"))  # frame RMS percentile taken as the noise floor
+
+
+class PreparedAudio:
+    """Result of preprocessing: the clip to send plus what it saved."""
+
+    def __init__(self, data: bytes, filename: str, applied: bool = False, silent: bool = False,
+                 original_bytes: int = 0, original_seconds: Optional[float] = None,
+                 seconds: Optional[float] = None, elapsed_ms: float = 0.0, reason: str = ""):
+        self.data = data
+        self.filename = filename
+        self.applied = applied
+        self.silent = silent
+        self.original_bytes = original_bytes or len(data)
+        self.original_seconds = original_seconds
+        self.seconds = seconds
+        self.elapsed_ms = elapsed_ms
+        self.reason = reason
+
+    def report(self) -> dict:
+        report = {"applied": self.applied, "silent": self.silent, "elapsed_ms": round(self.elapsed_ms, 2)}
+        if self.applied:
+            report.update({
+                "bytes_in": self.original_bytes,
+                "bytes_out": len(self.data),
+                "bytes_saved": self.original_bytes - len(self.data),
+                "seconds_in": round(self.original_seconds, 3),
+                "seconds_out": round(self.seconds, 3),
+                "seconds_saved": round(self.original_seconds - self.seconds, 3),
+            })
+        if self.reason:
+            report["reason"] = self.reason
+        return report
+
+
+# === Decode / Encode ===
+def _decode(data: bytes) -> Tuple[np.ndarray, int]:
+    """Return (float32 samples shaped [frames, channels] in -1..1, sample rate).
+
+    The container comes from the clip's magic bytes, never the filename: the
+    browser client uploads MediaRecorder webm/ogg as ``input.mp3``.
+    """
+    container = sniff_format(data)
+    if container == "wav":
+        with wave.open(io.BytesIO(data)) as wav:
+            channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+            raw = wav.readframes(wav.getnframes())
+    elif shutil.which("ffmpeg"):
+        from pydub import AudioSegment
+        # Unknown containers go to ffmpeg's own probe
+        segment = AudioSegment.from_file(io.BytesIO(data), format=container)
+        channels, width, rate = segment.channels, segment.sample_width, segment.frame_rate
+        raw = segment.raw_data
+    else:
+        raise ValueError(f"ffmpeg not installed, can't decode {container or 'unknown format'} (only WAV)")
+
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"unsupported sample width {width}")
+    return samples[: len(samples) - len(samples) % channels].reshape(-1, channels), rate
+
+
+def _encode_wav(samples: np.ndarray, rate: int) -> bytes:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return out.getvalue()
+
+
+# === DSP (vectorized over the whole clip) ===
+def _resample(mono: np.ndarray, rate: int, target: int = TARGET_RATE) -> np.ndarray:
+    if rate == target or len(mono) < 2:
+        return mono
+    if rate > target:
+        # Box low-pass at roughly the new Nyquist before decimating (plenty for speech)
+        width = int(round(rate / target))
+        if width > 1:
+            mono = np.convolve(mono, np.full(width, 1.0 / width, dtype=np.float32), mode="same")
+    positions = np.arange(int(len(mono) * target / rate), dtype=np.float64) * (rate / target)
+    return np.interp(positions, np.arange(len(mono)), mono).astype(np.float32)
+
+
+def _frame_rms(mono: np.ndarray, rate: int) -> Tuple[np.ndarray, int]:
+    """Per-frame RMS over VAD_FRAME_MS frames, plus the frame length in samples."""
+    frame = max(1, rate * VAD_FRAME_MS // 1000)
+    count = len(mono) // frame
+    frames = mono[: count * frame].reshape(count, frame)
+    return np.sqrt(np.mean(frames * frames, axis=1) + 1e-12), frame
+
+
+def _voiced_span(rms: np.ndarray, frame: int, length: int, rate: int) -> Optional[Tuple[int, int]]:
+    """Sample range from the first to the last voiced frame (plus padding), None if nothing stands out.
+
+    The noise floor is a low percentile of every frame, clamped to the
+    absolute VAD_MIN_DBFS threshold: a clip that is speech from its first
+    frame can't raise the bar above its own speech.
+    """
+    if rms.size == 0:
+        return None
+    min_level = 10 ** (VAD_MIN_DBFS / 20)
+    noise_floor = min(float(np.percentile(rms, VAD_FLOOR_PERCENTILE)), min_level)
+    voiced = np.flatnonzero(rms > max(min_level, noise_floor * VAD_NOISE_RATIO))
+    if voiced.size == 0:
+        return None
+    pad = rate * VAD_PAD_MS // 1000
+    return max(0, voiced[0] * frame - pad), min(length, (voiced[-1] + 1) * frame + pad)
+
+
+def preprocess_audio(data: bytes, filename: str = "audio.mp3") -> PreparedAudio:
+    """Downmix to mono, resample to 16 kHz, trim leading/trailing silence, re-encode as 16-bit WAV.
+
+    A clip whose every frame is below VAD_MIN_DBFS comes back ``silent`` (no
+    data, nothing to transcribe). When no voiced span stands out otherwise the
+    whole clip is kept, and the original is sent when it can't be decoded or
+    the result would be larger without trimming anything.
+    """
+    started = time.perf_counter()
+    try:
+        samples, rate = _decode(data)
+    except Exception as e:
+        return PreparedAudio(data, filename, reason=f"not decoded: {e}",
+                             elapsed_ms=(time.perf_counter() - started) * 1000)
+
+    original_seconds = len(samples) / rate
+    mono = _resample(samples.mean(axis=1), rate)
+    rms, frame = _frame_rms(mono, TARGET_RATE)
+    if rms.size and bool(np.all(rms <= 10 ** (VAD_MIN_DBFS / 20))):
+        return PreparedAudio(b"", filename, applied=True, silent=True, original_bytes=len(data),
+                             original_seconds=original_seconds, seconds=0.0,
+                             elapsed_ms=(time.perf_counter() - started) * 1000)
+
+    span = _voiced_span(rms, frame, len(mono), TARGET_RATE)
+    reason = ""
+    if span is None:
+        span, reason = (0, len(mono)), "no voiced span found: not trimmed"
+
+    trimmed = mono[span[0]:span[1]]
+    encoded = _encode_wav(trimmed, TARGET_RATE)
+    seconds = len(trimmed) / TARGET_RATE
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if len(encoded) >= len(data) and original_seconds - seconds < VAD_FRAME_MS / 1000:
+        return PreparedAudio(data, filename, reason=reason or "no savings", elapsed_ms=elapsed_ms)
+    name = os.path.splitext(os.path.basename(filename))[0] or "audio"
+    return PreparedAudio(encoded, f"{name}.wav", applied=True, original_bytes=len(data),
+                         original_seconds=original_seconds, seconds=seconds, elapsed_ms=elapsed_ms, reason=reason)
@@ -0,0 +1,182 @@
+import asyncio
+import contextvars
+import functools
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+from services.metrics import observe_stage, summary_ms
+
+
+class Overloaded(Exception):
+    """Raised when a stage is at capacity; carries a Retry-After hint in seconds."""
+
+    def __init__(self, stage: str, retry_after: int):
+        super().__init__(f"{stage} is overloaded, retry in {retry_after}s")
+        self.stage = stage
+        self.retry_after = retry_after
+
+
+class Bulkhead:
+    """Bounded concurrency + bounded queue for one external stage.
+
+    ``run()`` executes blocking calls on the stage's own thread pool, so a
+    slow backend only ties up its own workers and never the event loop.
+    ``admit()`` applies the same admission limit to work that is already
+    async elsewhere (e.g. the LLM client's loop).  Once ``max_concurrent +
+    max_queue`` calls are in flight, new calls fail fast with ``Overloaded``.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self._executor = None  # created on first run()
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=200)
+        self._runs = deque(maxlen=200)
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    # --- Admission ---
+    def _retry_after(self) -> int:
+        """Seconds until roughly one queue's worth of work has drained."""
+        recent = list(self._runs)
+        if not recent:
+            return 1
+        per_call = sum(recent) / len(recent)
+        return max(1, math.ceil(per_call * (self.queued + 1) / max(1, self.max_concurrent)))
+
+    def _reject_if_full(self):
+        # Caller holds self._lock
+        if self.active + self.queued >= self.max_concurrent + self.max_queue:
+            self.rejected += 1
+            raise Overloaded(self.name, self._retry_after())
+
+    def _enter(self):
+        with self._lock:
+            self._reject_if_full()
+            self.queued += 1
+
+    def _start(self, submitted: float) -> float:
+        started = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self._waits.append(started - submitted)
+        observe_stage(f"{self.name}_queue", started - submitted)
+        return started
+
+    def _drop_if_cancelled(self, future):
+        # Cancelled while still queued (caller went away, or shutdown): _start never ran
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def _finish(self, started: float, ok: bool):
+        with self._lock:
+            self.active -= 1
+            self._runs.append(time.monotonic() - started)
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def check(self):
+        """Raise ``Overloaded`` now if a new call would be rejected."""
+        with self._lock:
+            self._reject_if_full()
+
+    # --- Execution ---
+    def _call(self, submitted: float, fn: Callable[..., Any]) -> Any:
+        started = self._start(submitted)
+        ok = False
+        try:
+            result = fn()
+            ok = True
+            return result
+        finally:
+            self._finish(started, ok)
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking ``fn`` on this stage's executor."""
+        self._enter()
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_concurrent, thread_name_prefix=self.name)
+        # Carry the caller's context so per-request stage timings include the work
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, self._call, time.monotonic(),
+                                       functools.partial(fn, *args, **kwargs))
+        future.add_done_callback(self._drop_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    @contextmanager
+    def admit(self):
+        """Count a call executed elsewhere against this stage's limits."""
+        self._enter()
+        started = self._start(time.monotonic())
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self._finish(started, ok)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "saturation": round((self.active + self.queued) / max(1, self.max_concurrent + self.max_queue), 3),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_ms": summary_ms(sorted(self._waits)),
+                "run_ms": summary_ms(sorted(self._runs)),
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _bulkhead(name: str, concurrency: str, queue: str) -> Bulkhead:
+    prefix = name.upper()
+    return Bulkhead(
+        name,
+        max_concurrent=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", concurrency)),
+        max_queue=int(os.getenv(f"{prefix}_MAX_QUEUE", queue)),
+    )
+
+
+# === Stages (WHISPER_/LLM_/TTS_/TABLE_READ_ MAX_CONCURRENCY and MAX_QUEUE) ===
+whisper_bulkhead = _bulkhead("whisper", "4", "16")
+llm_bulkhead = _bulkhead("llm", "16", "48")  # same LLM_MAX_CONCURRENCY the client's semaphore uses
+tts_bulkhead = _bulkhead("tts", "8", "64")  # counted in sentence chunks, not replies
+# Whole-play renders queue every line at once; their own pool keeps live turns from waiting behind them
+table_read_bulkhead = _bulkhead("table_read", "16", "1024")
+
+BULKHEADS: Dict[str, Bulkhead] = {
+    b.name: b for b in (whisper_bulkhead, llm_bulkhead, tts_bulkhead, table_read_bulkhead)
+}
+
+
+def bulkhead_stats() -> dict:
+    return {name: bulkhead.stats() for name, bulkhead in BULKHEADS.items()}
+
+
+def shutdown_bulkheads():
+    for bulkhead in BULKHEADS.values():
+        bulkhead.shutdown()
@@ -0,0 +1,133 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+from memory.session_memory import get_conversation, get_summary, save_summary
+
+# === Budget Settings (in estimated tokens) ===
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "400"))
+CONTEXT_MAX_RECENT_MESSAGES = int(os.getenv("CONTEXT_MAX_RECENT_MESSAGES", "20"))
+SCRIPT_CONTEXT_TOKEN_BUDGET = int(os.getenv("SCRIPT_CONTEXT_TOKEN_BUDGET", "6000"))
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role/separator tokens per chat message
+SUMMARY_LINE_CHARS = 160
+
+TOKEN_PIECE = re.compile(r"\w+|[^\w\s]")
+FIRST_SENTENCE = re.compile(r"^(.+?[.?!])(\s|$)", re.S)
+
+
+def estimate_tokens(text: str) -> int:
+    """Deterministic, offline BPE-ish estimate: one token per punctuation mark
+    and roughly one per four characters of each word."""
+    return sum(1 + (len(piece) - 1) // 4 for piece in TOKEN_PIECE.findall(text))
+
+
+def _speaker(role: str) -> str:
+    return "User" if role == "user" else "Bot"
+
+
+def _chat_role(role: str) -> str:
+    return "user" if role == "user" else "assistant"
+
+
+def fold_into_summary(summary: str, messages: List[dict], max_tokens: int = CONTEXT_SUMMARY_TOKENS) -> str:
+    """Append a one-line gist per message, dropping the oldest lines past ``max_tokens``."""
+    lines = summary.splitlines() if summary else []
+    for message in messages:
+        content = " ".join(message["content"].split())
+        match = FIRST_SENTENCE.match(content)
+        gist = match.group(1) if match else content
+        if len(gist) > SUMMARY_LINE_CHARS:
+            gist = gist[:SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + "…"
+        lines.append(f"{_speaker(message['role'])}: {gist}")
+    return _trim_summary("\n".join(lines), max_tokens)
+
+
+def _trim_summary(summary: str, max_tokens: int) -> str:
+    """Keep the newest summary lines that fit ``max_tokens``."""
+    lines = summary.splitlines()
+    total = sum(estimate_tokens(line) for line in lines)
+    while lines and total > max_tokens:
+        total -= estimate_tokens(lines.pop(0))
+    return "\n".join(lines)
+
+
+def _summary_budget(budget: int) -> int:
+    # Reserved up front so summary + recent never exceed the budget
+    return min(CONTEXT_SUMMARY_TOKENS, budget // 3)
+
+
+def _window_start(messages: List[dict], budget: int) -> int:
+    """Index of the oldest message in the newest run that fits ``budget`` tokens (and the message cap)."""
+    start = len(messages)
+    used = 0
+    while start > 0 and len(messages) - start < CONTEXT_MAX_RECENT_MESSAGES:
+        cost = estimate_tokens(messages[start - 1]["content"]) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > budget:
+            break
+        used += cost
+        start -= 1
+    return start
+
+
+# The widest verbatim window any caller uses (the script log's); the stored summary only
+# absorbs turns older than this, so one summary watermark serves every budget
+HISTORY_KEEP_TOKENS = max(budget - _summary_budget(budget)
+                          for budget in (CONTEXT_TOKEN_BUDGET, SCRIPT_CONTEXT_TOKEN_BUDGET))
+
+
+def split_history(session_id: str, budget: int, exclude_text: Optional[str] = None) -> Tuple[str, List[dict]]:
+    """Return (rolling summary, recent messages) fitting ``budget`` tokens.
+
+    Recent messages are kept verbatim, newest first, until the budget or
+    CONTEXT_MAX_RECENT_MESSAGES is reached.  Messages that fall out of the
+    widest window (HISTORY_KEEP_TOKENS) are folded into the session's stored
+    summary, only those new since the last call, so that costs O(new
+    messages).  A narrower budget (chat) folds the messages between the two
+    windows into its own copy of the summary without saving it, so the
+    script log still gets them verbatim.
+    """
+    summary, summarized = get_summary(session_id)
+    # Only the turns not folded into the summary yet (ids are 1-based positions)
+    unsummarized = get_conversation(session_id, after_id=summarized)
+    if exclude_text is not None and unsummarized and unsummarized[-1]["role"] == "user" \
+            and unsummarized[-1]["content"] == exclude_text:
+        unsummarized = unsummarized[:-1]
+
+    summary_budget = _summary_budget(budget)
+    recent_budget = budget - summary_budget
+    start = _window_start(unsummarized, recent_budget)
+    kept = _window_start(unsummarized, max(recent_budget, HISTORY_KEEP_TOKENS))
+
+    if kept > 0:
+        summary = fold_into_summary(summary, unsummarized[:kept])
+        save_summary(session_id, summary, summarized + kept)
+    if start > kept:
+        summary = fold_into_summary(summary, unsummarized[kept:start])  # this prompt only
+
+    return _trim_summary(summary, summary_budget), unsummarized[start:]
+
+
+def build_chat_messages(session_id: str, system_prompt: str, user_text: str,
+                        budget: int = CONTEXT_TOKEN_BUDGET) -> List[dict]:
+    """System prompt (+ summary of older turns), recent turns, then the new message."""
+    fixed = estimate_tokens(system_prompt) + estimate_tokens(user_text) + 2 * MESSAGE_OVERHEAD_TOKENS
+    summary, recent = split_history(session_id, max(0, budget - fixed), exclude_text=user_text)
+
+    system = system_prompt
+    if summary:
+        system = f"{system_prompt}\n\nEarlier in this conversation (summary):\n{summary}"
+    messages = [{"role": "system", "content": system}]
+    messages += [{"role": _chat_role(m["role"]), "content": m["content"]} for m in recent]
+    messages.append({"role": "user", "content": user_text})
+    return messages
+
+
+def build_chat_log(session_id: str, budget: int = SCRIPT_CONTEXT_TOKEN_BUDGET) -> str:
+    """Conversation log for the playwright prompt, bounded to ``budget`` tokens."""
+    summary, recent = split_history(session_id, budget)
+    lines = [f"{_speaker(m['role'])}: {m['content'].strip()}" for m in recent]
+    if summary:
+        lines.insert(0, f"(Earlier, summarized)\n{summary}\n")
+    return "\n".join(lines)
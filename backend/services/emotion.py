@@ -0,0 +1,130 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+# === Text Cleaning (shared with TTS) ===
+MARKDOWN_IMAGE = re.compile(r'!\[.*?\]\(.*?\)')
+URL = re.compile(r'https?://\S+')
+NON_VERBAL = re.compile(r'[^a-zA-Z0-9.,;:!?\'"\s-]')
+MULTI_SPACE = re.compile(r'\s{2,}')
+
+
+@lru_cache(maxsize=1)
+def _emoji():
+    """The emoji module and the first characters of every emoji sequence (loaded on first non-ASCII text)."""
+    import emoji
+
+    return emoji, frozenset(e[0] for e in emoji.EMOJI_DATA)
+
+
+def clean_text(text: str, max_len: Optional[int] = None) -> str:
+    """Strip emojis, markdown images, URLs and non-verbal symbols."""
+    if not text.isascii():
+        emoji, start_chars = _emoji()
+        # Text without any emoji start character needs no emoji pass
+        if not start_chars.isdisjoint(text):
+            text = emoji.replace_emoji(text, replace='')
+    text = MARKDOWN_IMAGE.sub('', text)
+    text = URL.sub('', text)
+    text = NON_VERBAL.sub('', text)
+    text = MULTI_SPACE.sub(' ', text).strip()
+    return text[:max_len] if max_len else text
+
+
+# === "Drama Juice" Lexicon ===
+INTENSE, MODERATE, EMOTIONAL = 0, 1, 2
+
+KEYWORDS = {
+    **dict.fromkeys(
+        ("love", "hate", "crying", "exploding", "raging", "furious", "ecstatic", "devastated",
+         "insane", "ugh", "omg", "shaking", "lit", "wild"), INTENSE),
+    **dict.fromkeys(
+        ("happy", "sad", "hopeful", "upset", "calm", "gentle", "sweet", "nervous", "touched",
+         "lonely", "tired", "meh", "confused", "awkward", "emotional"), MODERATE),
+    **dict.fromkeys(
+        ("i", "you", "we", "feel", "miss", "trust", "care", "hurt", "friend", "connect",
+         "burning", "mad", "terrified", "anxious", "desperate"), EMOTIONAL),
+}
+# Open-ended intense words ("nooo+", "yaaa+")
+STRETCHED = re.compile(r"no{3,}|ya{3,}")
+
+INTENSE_EMOJIS = ("😭", "😡", "🔥", "💔", "🤯", "🤬", "😤", "😱")
+MODERATE_EMOJIS = ("😊", "😅", "🥲", "🙂", "🤗", "❤️", "✨", "😐", "😔", "😳")
+
+WORD_PART = re.compile(r"[a-z0-9_]+")
+INTENSE_PUNCT = re.compile(r"\?!|!\?")
+# Whitespace-delimited words of 3+ chars with an uppercase and no lowercase letter
+# (str.isupper() for the ASCII-only cleaned text)
+ALL_CAPS_WORD = re.compile(r"(?<!\S)(?=\S{3})[^\sa-z]*[A-Z][^\sa-z]*(?!\S)")
+
+SCORE_MAP = {
+    1: {"level": "Numb", "emoji": "😐", "color": "#9ca3af"},
+    2: {"level": "Mellow", "emoji": "🙂", "color": "#a3e635"},
+    3: {"level": "Warm", "emoji": "😊", "color": "#facc15"},
+    4: {"level": "Touched", "emoji": "🥺", "color": "#fb923c"},
+    5: {"level": "Spicy", "emoji": "🌶️", "color": "#f87171"},
+    6: {"level": "Dramatic", "emoji": "🎭", "color": "#f472b6"},
+    7: {"level": "Fiery", "emoji": "🔥", "color": "#ef4444"},
+    8: {"level": "Explosive", "emoji": "💥", "color": "#e11d48"},
+    9: {"level": "Meltdown", "emoji": "🤯", "color": "#be123c"},
+    10: {"level": "DRAMA BOMB", "emoji": "🎆", "color": "#881337"},
+}
+
+
+def _keyword_counts(cleaned_text: str) -> list:
+    """Tokenize once and tally INTENSE/MODERATE/EMOTIONAL hits by hash lookup."""
+    counts = [0, 0, 0]
+    for token, n in Counter(WORD_PART.findall(cleaned_text.lower())).items():
+        category = KEYWORDS.get(token)
+        if category is None:
+            if token[:3] not in ("noo", "yaa") or not STRETCHED.fullmatch(token):
+                continue
+            category = INTENSE
+        counts[category] += n
+    return counts
+
+
+def _emoji_score(text: str) -> int:
+    present = set(text)
+    score = 0
+    for e in INTENSE_EMOJIS:
+        if e[0] in present and e in text:
+            score += 2
+    for e in MODERATE_EMOJIS:
+        if e[0] in present and e in text:
+            score += 1
+    return score
+
+
+def score_text(text: str, cleaned_text: Optional[str] = None) -> dict:
+    """Drama Juice score (1-10) for ``text``.
+
+    Word features are read from ``cleaned_text`` (defaults to the whole text
+    cleaned, untruncated) and emojis from the raw ``text``.  Keywords are
+    matched in a single tokenizing pass; the rest are C-level counts.
+    """
+    if cleaned_text is None:
+        cleaned_text = clean_text(text)
+
+    counts = _keyword_counts(cleaned_text)
+    intensity_score = (
+        len(ALL_CAPS_WORD.findall(cleaned_text)) * 2 +
+        cleaned_text.count("!") * 1.5 +
+        len(INTENSE_PUNCT.findall(cleaned_text)) * 3 +
+        counts[INTENSE] * 3 +
+        counts[MODERATE] * 1.5 +
+        _emoji_score(text) * 2 +
+        counts[EMOTIONAL] * 1.2
+    )
+
+    word_count = len(cleaned_text.split())
+    est_time = max(1.0, word_count / 100.0)  # ~100wpm
+    raw_score = intensity_score / est_time
+    scaled_score = min(10, max(1, round(raw_score / 5.5)))
+    return {"score": scaled_score, **SCORE_MAP[scaled_score]}
+
+
+def score_many(texts: Iterable[str]) -> List[dict]:
+    """Score a batch of texts (e.g. every turn of a conversation or a whole script)."""
+    return [score_text(text) for text in texts]
@@ -0,0 +1,198 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from memory.session_memory import SHARED_STATE, store
+from memory.state import StateStore
+from services.metrics import summary_ms
+
+# === Queue Settings ===
+SCRIPT_JOB_WORKERS = int(os.getenv("SCRIPT_JOB_WORKERS", "2"))
+SCRIPT_JOB_MAX_QUEUE = int(os.getenv("SCRIPT_JOB_MAX_QUEUE", "32"))
+SCRIPT_JOB_TTL = float(os.getenv("SCRIPT_JOB_TTL_SECONDS", "900"))  # keep finished jobs this long
+SCRIPT_JOB_LEASE = float(os.getenv("SCRIPT_JOB_LEASE_SECONDS", "600"))  # longest a job may run
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class Job:
+    def __init__(self, kind: str, dedup_key: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.dedup_key = dedup_key
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.finished_event = threading.Event()
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "submitted_at": self.submitted,
+            "queue_wait_ms": round(((self.started or time.time()) - self.submitted) * 1000, 1),
+            "run_ms": round((self.finished - self.started) * 1000, 1) if self.finished and self.started else None,
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_result and self.status == DONE:
+            data["result"] = self.result
+        return data
+
+    def to_record(self) -> str:
+        return json.dumps({
+            "id": self.id, "kind": self.kind, "dedup_key": self.dedup_key, "status": self.status,
+            "result": self.result, "error": self.error, "submitted": self.submitted,
+            "started": self.started, "finished": self.finished,
+        })
+
+    @classmethod
+    def from_record(cls, record: str) -> "Job":
+        """Read-only view of a job run by another worker."""
+        data = json.loads(record)
+        job = cls(data["kind"], data["dedup_key"])
+        for field in ("id", "status", "result", "error", "submitted", "started", "finished"):
+            setattr(job, field, data[field])
+        if job.finished:
+            job.finished_event.set()
+        return job
+
+
+class JobQueue:
+    """Bounded background worker pool with job ids and in-flight dedup.
+
+    Submitting a job whose ``dedup_key`` matches a queued or running job
+    returns that job instead of starting a new one.  With a shared ``store``
+    the dedup key is a lease in the store and job records are published
+    there, so any worker can dedup against and report on any other's jobs
+    (jobs still run on the worker that accepted them).
+    """
+
+    def __init__(self, workers: int = SCRIPT_JOB_WORKERS, max_queue: int = SCRIPT_JOB_MAX_QUEUE,
+                 ttl: float = SCRIPT_JOB_TTL, store: Optional[StateStore] = None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jobs")
+        self._jobs: Dict[str, Job] = {}
+        self._inflight: Dict[str, str] = {}  # dedup_key -> job id
+        self._lock = threading.Lock()
+        self._timings = deque(maxlen=200)  # (queue_wait_s, run_s) of recent jobs
+        self.submitted = 0
+        self.deduplicated = 0
+        self.failed = 0
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, dedup_key: Optional[str] = None):
+        """Return ``(job, deduplicated)``; raises QueueFull when at capacity."""
+        with self._lock:
+            self._prune()
+            if dedup_key is not None and dedup_key in self._inflight:
+                self.deduplicated += 1
+                return self._jobs[self._inflight[dedup_key]], True
+            if self._depth() >= self.max_queue:
+                raise QueueFull(f"{kind} queue is full ({self.max_queue} jobs waiting)")
+        job = Job(kind, dedup_key)
+        if self.store is not None and dedup_key is not None:
+            holder = self.store.claim(f"job-dedup:{dedup_key}", job.id, SCRIPT_JOB_LEASE)
+            if holder != job.id:
+                with self._lock:
+                    self.deduplicated += 1
+                remote = self.get(holder)
+                if remote is None:
+                    # The holder has not published its record yet: report it as queued
+                    remote = Job(kind, dedup_key)
+                    remote.id = holder
+                return remote, True
+        with self._lock:
+            self._jobs[job.id] = job
+            if dedup_key is not None:
+                self._inflight[dedup_key] = job.id
+            self.submitted += 1
+        self._publish(job)
+        self._executor.submit(self._run, job, fn, args)
+        return job, False
+
+    def _publish(self, job: Job):
+        if self.store is not None:
+            self.store.put(f"job:{job.id}", job.to_record(), SCRIPT_JOB_LEASE + self.ttl)
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple):
+        job.started = time.time()
+        job.status = RUNNING
+        self._publish(job)
+        try:
+            job.result = fn(*args)
+            job.status = DONE
+        except Exception as e:
+            print(f"❌ Job {job.id} ({job.kind}) failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        job.finished = time.time()
+        with self._lock:
+            if job.dedup_key is not None and self._inflight.get(job.dedup_key) == job.id:
+                del self._inflight[job.dedup_key]
+            self._timings.append((job.started - job.submitted, job.finished - job.started))
+            if job.status == FAILED:
+                self.failed += 1
+        try:
+            self._publish(job)
+            if self.store is not None and job.dedup_key is not None:
+                self.store.release(f"job-dedup:{job.dedup_key}", job.id)
+        except Exception as e:
+            print(f"❌ Could not publish job {job.id}: {e}")
+        job.finished_event.set()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            record = self.store.get_value(f"job:{job_id}")
+            if record is not None:
+                return Job.from_record(record)
+        return job
+
+    def _depth(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(t[0] for t in self._timings)
+            runs = sorted(t[1] for t in self._timings)
+            running = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+            return {
+                "workers": self.workers,
+                "queue_depth": self._depth(),
+                "max_queue": self.max_queue,
+                "running": running,
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "failed": self.failed,
+                "queue_wait_ms": summary_ms(waits),
+                "run_ms": summary_ms(runs),
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared queue for /script/jobs (job state lives in the store when workers share it)
+script_jobs = JobQueue(store=store if SHARED_STATE else None)
@@ -1,12 +1,29 @@
+import asyncio
+import hashlib
+import json
 import os
-import requests
+import time
+from typing import Any, AsyncIterator, List, Optional, Tuple
 from dotenv import load_dotenv
-from memory.session_memory import get_conversation
+from memory.session_memory import count_messages, get_conversation, conversation_version, script_cache
+from services.bulkhead import Overloaded, llm_bulkhead
+from services.context import build_chat_log, build_chat_messages
+from services.metrics import observe_stage, stage
+from services.registry import backends
+from services.response_cache import response_cache
 
 load_dotenv()
 
 USE_MOCK = os.getenv("USE_MOCK", "true").lower() == "true"
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-70b-8192")
+
+# Script generation: "single" (one completion) or "outline" (outline, then scenes in parallel)
+SCRIPT_MODES = ("single", "outline")
+SCRIPT_MODE = os.getenv("SCRIPT_MODE", "single").lower()
+SCRIPT_MAX_SCENES = int(os.getenv("SCRIPT_MAX_SCENES", "5"))
+SCRIPT_OUTLINE_MAX_TOKENS = int(os.getenv("SCRIPT_OUTLINE_MAX_TOKENS", "600"))
+SCRIPT_SCENE_MAX_TOKENS = int(os.getenv("SCRIPT_SCENE_MAX_TOKENS", "1000"))
 
 # 🌸 Emotional, conversational best friend prompt
 FRIENDLY_DRAMA_PROMPT = """
@@ -69,6 +86,9 @@ Here is the conversation they had:
 Now write the full stage play:
 """
 
+# Bump automatically whenever the playwright prompt changes, so cached scripts expire
+PLAYWRIGHT_TEMPLATE_VERSION = hashlib.sha1(PLAYWRIGHT_SCRIPT_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
 # 🧪 Mock script for testing
 def fake_llm_call(prompt: str) -> str:
     return """🎭 *Cattle Dreams*
@@ -88,64 +108,390 @@ Moon: You dream, little cow. That’s your spark. Never lose it.
 ... (to be continued)
 """
 
+def _chat_messages(prompt: str, session_id: str = None) -> list:
+    # With a session, the friend remembers: summary + recent turns within the token budget
+    if session_id:
+        return build_chat_messages(session_id, FRIENDLY_DRAMA_PROMPT, prompt)
+    return [
+        {"role": "system", "content": FRIENDLY_DRAMA_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+CHAT_PARAMS = {
+    "model": LLM_MODEL,
+    "temperature": 0.85,
+    "top_p": 0.95,
+    "max_tokens": 1500
+}
+
+# 🧠 Opt-in cache for short openers ("hey", "omg 😭"): same friend prompt + params → reusable replies.
+# Only a session's first message is an opener; a short follow-up ("why?") needs its history.
+# Replies that go into the cache are generated from the system prompt + opener alone, never a
+# session's summary or turns, so one user's history can't be served to another session.
+FRIENDLY_PROMPT_VERSION = hashlib.sha1(FRIENDLY_DRAMA_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+def _prior_turns(prompt: str, session_id: str = None) -> int:
+    # Voice turns store the user's line before asking the LLM; that line isn't history
+    if not session_id:
+        return 0
+    count = count_messages(session_id)
+    if count == 1:
+        last = get_conversation(session_id, tail=1)
+        if last and last[-1]["role"] == "user" and last[-1]["content"] == prompt:
+            return 0
+    return count
+
+def _reply_key(prompt: str, session_id: str = None) -> Optional[str]:
+    if not response_cache.enabled:
+        return None
+    return response_cache.key(prompt, FRIENDLY_PROMPT_VERSION, CHAT_PARAMS,
+                              prior_turns=_prior_turns(prompt, session_id))
+
+def _as_tokens(text: str) -> List[str]:
+    return [word if i == 0 else " " + word for i, word in enumerate(text.split(" "))]
+
+async def _chat_reply(prompt: str, session_id: str = None) -> str:
+    print(f"[LLM 🌐] Sending prompt | Session: {session_id}")
+    with llm_bulkhead.admit(), stage("llm"):
+        return await backends.get("llm").chat(_chat_messages(prompt, session_id), **CHAT_PARAMS)
+
+async def _cached_chat_reply(key: str, prompt: str, session_id: str = None) -> str:
+    reply, future, leader = response_cache.claim(key)
+    if reply is not None:
+        return reply
+    if not leader:
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception:
+            # The call we were sharing failed; make our own
+            return await _chat_reply(prompt, session_id)
+    started = time.perf_counter()
+    try:
+        reply = await _chat_reply(prompt)  # shared reply: no session history
+    except BaseException as e:
+        response_cache.fill(key, future, error=e if isinstance(e, Exception) else RuntimeError("cancelled"))
+        raise
+    response_cache.fill(key, future, reply, time.perf_counter() - started)
+    return reply
+
 # 🌐 LLM call with fallback
-def get_llm_response(prompt: str, session_id: str = None) -> str:
+async def get_llm_response(prompt: str, session_id: str = None) -> str:
     if USE_MOCK or not GROQ_API_KEY:
         
         return fake_llm_call(prompt)
 
     try:
-        print(f"[LLM 🌐] Sending prompt | Session: {session_id}")
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {GROQ_API_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "llama3-70b-8192",
-                "messages": [
-                    {"role": "system", "content": FRIENDLY_DRAMA_PROMPT},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.85,
-                "top_p": 0.95,
-                "max_tokens": 1500
-            }
-        )
-        return response.json()["choices"][0]["message"]["content"]
+        key = _reply_key(prompt, session_id)
+        if key is not None:
+            return await _cached_chat_reply(key, prompt, session_id)
+        return await _chat_reply(prompt, session_id)
+    except Overloaded:
+        raise
     except Exception as e:
+        print(f"❌ LLM error: {e}")
+        return fake_llm_call(prompt)
+
+# 🌊 Streaming variant: yields tokens as the model produces them
+async def stream_llm_response(prompt: str, session_id: str = None) -> AsyncIterator[str]:
+    if USE_MOCK or not GROQ_API_KEY:
+        for token in _as_tokens(fake_llm_call(prompt)):
+            yield token
+        return
+
+    key, future, leader = _reply_key(prompt, session_id), None, False
+    if key is not None:
+        reply, future, leader = response_cache.claim(key)
+        if reply is None and not leader:
+            try:
+                reply = await asyncio.wrap_future(future)
+            except Exception:
+                pass  # the call we were sharing failed; stream our own
+        if reply is not None:
+            for token in _as_tokens(reply):
+                yield token
+            return
+
+    print(f"[LLM 🌊] Streaming prompt | Session: {session_id}")
+    produced = False
+    completed = False
+    tokens = []
+    started = time.perf_counter()
+    try:
+        with llm_bulkhead.admit(), stage("llm"):
+            # A reply headed for the cache is built without this session's history
+            messages = _chat_messages(prompt, None if leader else session_id)
+            async for token in backends.get("llm").stream_chat(messages, **CHAT_PARAMS):
+                if not produced:
+                    observe_stage("llm_first_token", time.perf_counter() - started)
+                produced = True
+                tokens.append(token)
+                yield token
+        completed = True
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"❌ LLM stream error: {e}")
+        if not produced:
+            yield fake_llm_call(prompt)
+    finally:
+        if leader:
+            if completed:
+                response_cache.fill(key, future, "".join(tokens), time.perf_counter() - started)
+            else:
+                response_cache.fill(key, future, error=RuntimeError("streamed reply did not complete"))
+
+# 🌐 Blocking variant for sync endpoints (runs on the shared client loop)
+def get_llm_response_sync(prompt: str, session_id: str = None) -> str:
+    if USE_MOCK or not GROQ_API_KEY:
         
         return fake_llm_call(prompt)
 
+    try:
+        print(f"[LLM 🌐] Sending prompt | Session: {session_id}")
+        with llm_bulkhead.admit(), stage("llm"):
+            return backends.get("llm").chat_sync(_chat_messages(prompt), **CHAT_PARAMS)
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"❌ LLM error: {e}")
+        return fake_llm_call(prompt)
+
 # 🎭 Script generation logic
-def generate_script_from_conversation(session_id: str) -> dict:
-    
+def _prepare_script(session_id: str, template_version: str) -> Tuple[str, Optional[dict], Optional[dict], str]:
+    """(state key, finished result or None, the session's lines, chat log) for a script request."""
+    # Nothing new said since the last script? Serve it from storage.
+    state_key = conversation_version(session_id)
+    cached = script_cache.get(session_id, state_key, template_version)
+    if cached is not None:
+        print(f"🧠 Returning cached script | Session: {session_id}")
+        return state_key, cached, None, ""
+
     conversation = get_conversation(session_id=session_id)
 
     if not conversation:
-        return {"script": "No conversation found.", "messages": {"user": [], "bot": []}}
+        return state_key, {"script": "No conversation found.", "messages": {"user": [], "bot": []}}, None, ""
 
     user_lines = [msg["content"].strip() for msg in conversation if msg["role"] == "user"]
     bot_lines = [msg["content"].strip() for msg in conversation if msg["role"] == "assistant"]
 
     if not user_lines and not bot_lines:
-        return {"script": "Not enough content to generate a script.", "messages": {"user": [], "bot": []}}
+        return state_key, {"script": "Not enough content to generate a script.", "messages": {"user": [], "bot": []}}, None, ""
 
-    # Format chat as readable conversation log
-    formatted_convo = "\n".join(
-        f"{'User' if msg['role'] == 'user' else 'Bot'}: {msg['content'].strip()}"
-        for msg in conversation
-    )
+    # Format chat as readable conversation log (older turns summarized to fit the budget)
+    return state_key, None, {"user": user_lines, "bot": bot_lines}, build_chat_log(session_id)
+
+def _store_script(session_id: str, state_key: str, template_version: str, result: dict, fell_back: bool):
+    # Don't cache the mock fallback served after an API error, or a script
+    # for a conversation that gained a turn while it was being written
+    if not fell_back and conversation_version(session_id) == state_key:
+        script_cache.put(session_id, state_key, template_version, result)
+
+def generate_script_from_conversation(session_id: str, mode: Optional[str] = None) -> dict:
+    """Write a play from the session's conversation (blocking; call from a worker thread).
+
+    ``mode`` is "single" (one long completion) or "outline" (outline, then
+    every scene concurrently); it defaults to SCRIPT_MODE.
+    """
+    if (mode or SCRIPT_MODE) == "outline":
+        return asyncio.run(_collect_script(session_id))
+
+    state_key, ready, messages, formatted_convo = _prepare_script(session_id, PLAYWRIGHT_TEMPLATE_VERSION)
+    if ready is not None:
+        return ready
 
     # Insert into playwright prompt
     final_prompt = PLAYWRIGHT_SCRIPT_PROMPT_TEMPLATE.format(chat_log=formatted_convo)
 
     
-    script = get_llm_response(final_prompt, session_id=session_id)
+    script = get_llm_response_sync(final_prompt, session_id=session_id)
 
-    
-    return {
+    result = {
         "script": script,
-        "messages": {"user": user_lines, "bot": bot_lines}
+        "messages": messages,
+        "mode": "single",
     }
+    fell_back = not (USE_MOCK or not GROQ_API_KEY) and script == fake_llm_call(final_prompt)
+    _store_script(session_id, state_key, PLAYWRIGHT_TEMPLATE_VERSION, result, fell_back)
+    return result
+
+
+# 🧭 Two-phase mode: a short outline, then every scene written concurrently against it.
+# Wall-clock time is one outline plus the slowest scene, and no scene shares a token cap.
+PLAYWRIGHT_SYSTEM_PROMPT = "You are an award-winning stage playwright AI."
+
+OUTLINE_PROMPT_TEMPLATE = """
+Two close friends — one a human, one an emotionally intelligent AI — had a deep, personal, funny, sometimes bittersweet conversation. That chat included fragments of a possible stage play — ideas, characters, emotions, themes, struggles, even jokes.
+
+🎯 Your task:
+Plan a **complete, original stage play** based on the **concepts and emotions** from that conversation: 3 to {max_scenes} scenes with conflict, climax and resolution, about 15–20 minutes on stage.
+
+⚠️ DO NOT write the play yet, and DO NOT copy the messages as dialogue.
+
+Reply with JSON only, in exactly this shape:
+{{"title": "...", "characters": [{{"name": "...", "trait": "..."}}], "scenes": [{{"heading": "Act I, Scene 1: <place>", "beats": ["...", "..."]}}]}}
+
+Here is the conversation they had:
+
+---
+
+{chat_log}
+
+---
+"""
+
+SCENE_PROMPT_TEMPLATE = """
+You are writing one scene of the stage play "{title}".
+
+👥 Characters:
+{characters}
+
+🗺️ Outline of the whole play:
+{outline}
+
+🎯 Write ONLY scene {number} of {total}: {heading}
+It must cover these beats: {beats}
+
+🎭 Format:
+- Start with the line: {heading}
+- 🎬 Stage directions in parentheses (e.g., lights fade, dramatic pause)
+- 💬 Dialogue as NAME: line, with emotional realism
+- About 3–4 minutes of stage time; no title, no cast list, no other scenes
+"""
+
+# Bump automatically whenever either prompt changes, so cached scripts expire
+OUTLINE_TEMPLATE_VERSION = "outline-" + hashlib.sha1(
+    (OUTLINE_PROMPT_TEMPLATE + SCENE_PROMPT_TEMPLATE).encode("utf-8")).hexdigest()[:12]
+
+# 🧪 Mock outline for testing (the same play as fake_llm_call)
+FAKE_OUTLINE = json.dumps({
+    "title": "Cattle Dreams",
+    "characters": [
+        {"name": "Bessie", "trait": "A soulful cow longing for more than grass"},
+        {"name": "Moon", "trait": "The wise sky observer"},
+        {"name": "Farmer Joe", "trait": "A gentle caretaker"},
+    ],
+    "scenes": [
+        {"heading": "Act I, Scene 1: Pasture under the stars", "beats": ["Bessie wonders about more than grass"]},
+        {"heading": "Act I, Scene 2: The barn at dawn", "beats": ["Farmer Joe notices Bessie is restless"]},
+        {"heading": "Act II, Scene 3: The county fair", "beats": ["Bessie takes the stage"]},
+    ],
+})
+
+def fake_scene(heading: str) -> str:
+    return f"""{heading}
+
+(Lights rise slowly.)
+
+Bessie: Do you ever wonder if there’s more than just chewing grass?
+
+Moon: You dream, little cow. That’s your spark. Never lose it.
+"""
+
+def parse_outline(text: str) -> Optional[dict]:
+    """The outline in a completion (tolerating code fences or prose around the JSON), or None."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        raw = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(raw, dict):
+        return None
+    scenes = [scene for scene in raw.get("scenes") or [] if isinstance(scene, dict) and scene.get("heading")]
+    if not scenes:
+        return None
+    return {
+        "title": str(raw.get("title") or "Untitled"),
+        "characters": [{"name": str(c["name"]), "trait": str(c.get("trait", ""))}
+                       for c in raw.get("characters") or [] if isinstance(c, dict) and c.get("name")],
+        "scenes": [{"heading": str(scene["heading"]), "beats": [str(beat) for beat in scene.get("beats") or []]}
+                   for scene in scenes[:SCRIPT_MAX_SCENES]],
+    }
+
+def assemble_script(outline: dict, scenes: List[str]) -> str:
+    """Title, cast list and the scenes in order, in the single-shot script's layout."""
+    cast = "\n".join(f"- {c['name']}: {c['trait']}" for c in outline["characters"])
+    return f"🎬 Title: {outline['title']}\n\n**Characters:**\n{cast}\n\n" + "\n\n".join(
+        scene.strip() for scene in scenes) + "\n"
+
+async def _playwright_call(prompt: str, max_tokens: int, mock: str) -> Tuple[str, bool]:
+    """One playwright completion; returns (text, fell back to ``mock`` after an error)."""
+    if USE_MOCK or not GROQ_API_KEY:
+        return mock, False
+    messages = [{"role": "system", "content": PLAYWRIGHT_SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+    try:
+        with llm_bulkhead.admit(), stage("llm"):
+            return await backends.get("llm").chat(messages, **{**CHAT_PARAMS, "max_tokens": max_tokens}), False
+    except Overloaded:
+        raise
+    except Exception as e:
+        print(f"❌ LLM error: {e}")
+        return mock, True
+
+async def _write_scene(outline: dict, index: int) -> Tuple[int, str, bool]:
+    scene = outline["scenes"][index]
+    prompt = SCENE_PROMPT_TEMPLATE.format(
+        title=outline["title"],
+        characters="\n".join(f"- {c['name']}: {c['trait']}" for c in outline["characters"]),
+        outline="\n".join(f"{i + 1}. {s['heading']} — {'; '.join(s['beats'])}" for i, s in enumerate(outline["scenes"])),
+        number=index + 1,
+        total=len(outline["scenes"]),
+        heading=scene["heading"],
+        beats="; ".join(scene["beats"]) or "(see outline)",
+    )
+    text, fell_back = await _playwright_call(prompt, SCRIPT_SCENE_MAX_TOKENS, fake_scene(scene["heading"]))
+    return index, text, fell_back
+
+async def stream_script_from_conversation(session_id: str, mode: Optional[str] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Script generation as (event, data) pairs.
+
+    Outline mode yields ``outline``, then ``scene`` as each scene finishes
+    (in completion order, with its index), then ``done`` with the assembled
+    script.  Single mode only yields ``done``.
+    """
+    if (mode or SCRIPT_MODE) != "outline":
+        yield "done", await asyncio.to_thread(generate_script_from_conversation, session_id, "single")
+        return
+
+    state_key, ready, messages, chat_log = await asyncio.to_thread(
+        _prepare_script, session_id, OUTLINE_TEMPLATE_VERSION)
+    if ready is not None:
+        yield "done", ready
+        return
+
+    started = time.perf_counter()
+    prompt = OUTLINE_PROMPT_TEMPLATE.format(max_scenes=SCRIPT_MAX_SCENES, chat_log=chat_log)
+    with stage("script_outline"):
+        text, fell_back = await _playwright_call(prompt, SCRIPT_OUTLINE_MAX_TOKENS, FAKE_OUTLINE)
+    outline = parse_outline(text)
+    if outline is None:
+        print(f"⚠️ Unusable outline, writing the script in one pass | Session: {session_id}")
+        yield "done", await asyncio.to_thread(generate_script_from_conversation, session_id, "single")
+        return
+    yield "outline", outline
+
+    total = len(outline["scenes"])
+    scenes: List[Optional[str]] = [None] * total
+    tasks = [asyncio.create_task(_write_scene(outline, i)) for i in range(total)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            index, text, failed = await finished
+            scenes[index] = text
+            fell_back = fell_back or failed
+            yield "scene", {"index": index, "heading": outline["scenes"][index]["heading"], "text": text,
+                            "completed": sum(scene is not None for scene in scenes), "total": total}
+    finally:
+        # The client went away mid-stream: don't keep writing scenes nobody will read
+        for task in tasks:
+            task.cancel()
+    print(f"🧭 Outline + {total} scenes in {time.perf_counter() - started:.2f}s | Session: {session_id}")
+
+    result = {"script": assemble_script(outline, scenes), "messages": messages, "mode": "outline", "outline": outline}
+    await asyncio.to_thread(_store_script, session_id, state_key, OUTLINE_TEMPLATE_VERSION, result, fell_back)
+    yield "done", result
+
+async def _collect_script(session_id: str) -> dict:
+    async for event, data in stream_script_from_conversation(session_id, "outline"):
+        if event == "done":
+            return data
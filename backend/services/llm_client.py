@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, List, Optional
+
+import httpx
+
+# === Client Settings ===
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.25"))
+LLM_MAX_RETRY_AFTER = float(os.getenv("LLM_MAX_RETRY_AFTER", "5"))  # longer Retry-After: give up instead
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "16"))
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when the chat completions API keeps failing after retries."""
+
+
+class LLMClient:
+    """Async client for an OpenAI-compatible chat completions API.
+
+    All HTTP traffic runs on one dedicated event loop thread, so the keep-alive
+    connection pool and concurrency limit are shared by async callers (on any
+    loop) and sync callers (e.g. threadpool endpoints) alike.
+    """
+
+    def __init__(
+        self,
+        base_url: str = LLM_BASE_URL,
+        api_key: Optional[str] = None,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        max_retry_after: float = LLM_MAX_RETRY_AFTER,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive: int = LLM_MAX_KEEPALIVE,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_retry_after = max_retry_after
+        self.max_concurrency = max_concurrency
+
+        self._loop = None
+        self._http = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    # --- Background loop ---
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-client", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def _client(self) -> httpx.AsyncClient:
+        # Only called on the client loop
+        if self._http is None:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url, headers=headers, timeout=self.timeout, limits=self.limits
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._http
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    # --- Requests ---
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to stop retrying.
+
+        ``Retry-After`` (seconds or an HTTP date) is honoured up to
+        ``max_retry_after``; asking for longer means the upstream won't be
+        back in time, so the request fails now instead of holding its slot.
+        """
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return max(0.0, delay) if delay <= self.max_retry_after else None
+        # Full jitter: uniform in [0, base * 2^attempt]
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    async def _post_chat(self, payload: dict) -> dict:
+        client = self._client()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    response = await client.post("/chat/completions", json=payload)
+                if response.status_code < 400:
+                    return response.json()
+                last_error = LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+                if response.status_code not in RETRY_STATUS:
+                    break
+                retry_after = response.headers.get("Retry-After")
+            except httpx.TransportError as e:
+                last_error = e
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        raise LLMError(f"Chat completion failed after {self.max_retries + 1} attempts: {last_error}")
+
+    async def chat(self, messages: List[dict], **params) -> str:
+        """Return the assistant message content for ``messages``."""
+        future = self._submit(self._post_chat({"messages": messages, **params}))
+        data = await asyncio.wrap_future(future)
+        return data["choices"][0]["message"]["content"]
+
+    def chat_sync(self, messages: List[dict], **params) -> str:
+        """Blocking wrapper around :meth:`chat` for sync code paths."""
+        data = self._submit(self._post_chat({"messages": messages, **params})).result()
+        return data["choices"][0]["message"]["content"]
+
+    async def _pump_stream(self, payload: dict, emit):
+        """Run a streaming completion on the client loop, calling ``emit`` per delta."""
+        client = self._client()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            started = False
+            try:
+                async with self._semaphore:
+                    async with client.stream("POST", "/chat/completions", json=payload) as response:
+                        if response.status_code < 400:
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == "[DONE]":
+                                    break
+                                choice = json.loads(data)["choices"][0]
+                                delta = choice.get("delta", {}).get("content")
+                                if delta:
+                                    started = True
+                                    emit(delta)
+                            return
+                        await response.aread()
+                        last_error = LLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+                        if response.status_code not in RETRY_STATUS:
+                            break
+                        retry_after = response.headers.get("Retry-After")
+            except httpx.TransportError as e:
+                last_error = e
+            if started:
+                # Tokens already reached the caller; replaying would duplicate them
+                break
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        raise LLMError(f"Streaming chat completion failed: {last_error}")
+
+    async def stream_chat(self, messages: List[dict], **params) -> AsyncIterator[str]:
+        """Yield assistant content deltas as they arrive (``stream: true``)."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def emit(item):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        async def pump():
+            try:
+                await self._pump_stream({"messages": messages, "stream": True, **params}, emit)
+                emit(done)
+            except Exception as e:
+                emit(e)
+
+        future = self._submit(pump())
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    def close(self):
+        if self._loop is None:
+            return
+        if self._http is not None:
+            self._submit(self._http.aclose()).result()
+            self._http = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+
+
+def create_llm_client() -> LLMClient:
+    """Registry factory: one shared keep-alive client (timeouts, retries and concurrency via LLM_* env vars)."""
+    return LLMClient(api_key=os.getenv("GROQ_API_KEY"))
@@ -0,0 +1,194 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+# === Buckets (seconds) ===
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Stage timings of the request being handled; the list object is shared with
+# tasks and threads spawned from it (asyncio/anyio copy the context)
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, values)} {total:g}")
+        return lines
+
+
+class Gauge(Counter):
+    """Point-in-time values, set at scrape time from the components' stats()."""
+
+    kind = "gauge"
+
+    def set(self, *label_values: str, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} {self.kind}"
+        return lines
+
+
+class ScrapedCounter(Gauge):
+    """Monotonic totals copied from a component's own counters at scrape time."""
+
+    kind = "counter"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self._series: Dict[Tuple[str, ...], list] = {}  # values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{self.name}_bucket{_label_text(self.labels, values, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, values, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, values)} {series[-2]:.6f}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, values)} {series[-1]}")
+        return lines
+
+
+# === Registry ===
+STAGE_SECONDS = Histogram("dramabot_stage_seconds", "Time spent per hot-path stage.", ("stage",))
+STAGE_ERRORS = Counter("dramabot_stage_errors_total", "Stages that raised.", ("stage",))
+REQUEST_SECONDS = Histogram("dramabot_http_request_seconds", "HTTP request latency.", ("method", "route"))
+REQUESTS = Counter("dramabot_http_requests_total", "HTTP requests by status.", ("method", "route", "status"))
+
+_registry: List[Counter] = [STAGE_SECONDS, STAGE_ERRORS, REQUEST_SECONDS, REQUESTS]
+_collectors: List[Callable[[], None]] = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def add_collector(collect: Callable[[], None]):
+    """Run ``collect()`` before every scrape (to refresh gauges from stats())."""
+    _collectors.append(collect)
+
+
+def render() -> str:
+    for collect in _collectors:
+        try:
+            collect()
+        except Exception as e:
+            print(f"❌ Metrics collector failed: {e}")
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# === Stage timing ===
+def observe_stage(name: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block into the stage histogram and the current request's Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(name)
+        raise
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def timed(name: str):
+    """Decorator form of ``stage()`` for plain functions."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def summary_ms(values: list) -> dict:
+    """Count, p50, p95 and max in milliseconds of already-sorted durations in seconds."""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": round(values[len(values) // 2] * 1000, 1),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+        "max": round(values[-1] * 1000, 1),
+    }
+
+
+# === Per-request Server-Timing ===
+def start_request() -> List[Tuple[str, float]]:
+    timings: List[Tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing(timings: List[Tuple[str, float]], total: float) -> str:
+    """``Server-Timing`` value with repeated stages summed (e.g. one ``tts`` per sentence)."""
+    totals: Dict[str, List[float]] = {}
+    for name, seconds in list(timings):
+        entry = totals.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+    parts = [f'{name};dur={seconds * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+             for name, (seconds, count) in totals.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,93 @@
+import importlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+from services.metrics import observe_stage
+
+# Factories are "module:attribute" strings so nothing heavy is imported until
+# an engine is first used.  Pick engines with TRANSCRIPTION_ENGINE, LLM_ENGINE
+# and TTS_ENGINE; the first entry of each kind is the default.
+BACKENDS: Dict[str, Dict[str, Union[str, Callable[[], Any]]]] = {
+    "transcription": {"groq": "services.whisper:GroqTranscriber"},
+    "llm": {"openai-compatible": "services.llm_client:create_llm_client"},
+    "tts": {"gtts": "services.tts:GTTSEngine", "elevenlabs": "services.voice_output:default_engine"},
+}
+
+# Comma-separated kinds (or "all") to build in the lifespan hook instead of on first request
+BACKEND_WARMUP = os.getenv("BACKEND_WARMUP", "")
+
+
+def _resolve(factory: Union[str, Callable[[], Any]]) -> Callable[[], Any]:
+    if callable(factory):
+        return factory
+    module, _, attribute = factory.partition(":")
+    return getattr(importlib.import_module(module), attribute)
+
+
+class BackendRegistry:
+    """Configured transcription / LLM / TTS engines, imported and built on first use."""
+
+    def __init__(self, backends: Dict[str, Dict[str, Union[str, Callable[[], Any]]]] = BACKENDS):
+        self._factories = {kind: dict(engines) for kind, engines in backends.items()}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, kind: str, name: str, factory: Union[str, Callable[[], Any]]):
+        """Add (or replace) an engine; takes effect for kinds not built yet."""
+        with self._lock:
+            self._factories.setdefault(kind, {})[name] = factory
+
+    def engine_name(self, kind: str) -> str:
+        engines = self._factories[kind]
+        name = os.getenv(f"{kind.upper()}_ENGINE") or next(iter(engines))
+        if name not in engines:
+            raise ValueError(f"Unknown {kind} engine '{name}' (available: {', '.join(engines)})")
+        return name
+
+    def get(self, kind: str) -> Any:
+        instance = self._instances.get(kind)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = self._instances.get(kind)
+            if instance is None:
+                name = self.engine_name(kind)
+                started = time.perf_counter()
+                instance = _resolve(self._factories[kind][name])()
+                observe_stage(f"{kind}_init", time.perf_counter() - started)
+                print(f"🔌 Loaded {kind} engine '{name}' in {(time.perf_counter() - started) * 1000:.0f}ms")
+                self._instances[kind] = instance
+        return instance
+
+    def warm_up(self, kinds: Optional[Iterable[str]] = None):
+        """Build engines ahead of the first request (e.g. BACKEND_WARMUP=all)."""
+        if kinds is None:
+            kinds = [k.strip() for k in BACKEND_WARMUP.split(",") if k.strip()]
+            if "all" in kinds:
+                kinds = list(self._factories)
+        for kind in kinds:
+            try:
+                self.get(kind)
+            except Exception as e:
+                print(f"⚠️ Could not warm up {kind} engine: {e}")
+
+    def loaded(self) -> Dict[str, str]:
+        with self._lock:
+            return {kind: type(instance).__name__ for kind, instance in self._instances.items()}
+
+    def close(self):
+        with self._lock:
+            instances, self._instances = self._instances, {}
+        for kind, instance in instances.items():
+            close = getattr(instance, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    print(f"⚠️ Error closing {kind} engine: {e}")
+
+
+# Shared registry
+backends = BackendRegistry()
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+from services.emotion import clean_text
+
+# === Response Cache Settings (opt-in) ===
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL_SECONDS", "600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_VARIANTS = int(os.getenv("LLM_CACHE_VARIANTS", "3"))          # distinct replies kept per prompt
+LLM_CACHE_POLICY = os.getenv("LLM_CACHE_POLICY", "rotate").lower()     # rotate | random
+LLM_CACHE_MAX_PROMPT_CHARS = int(os.getenv("LLM_CACHE_MAX_PROMPT_CHARS", "40"))
+
+PUNCTUATION = re.compile(r"[^\w\s']+")
+
+
+def normalize_prompt(text: str) -> str:
+    """Fold case, emoji, punctuation and whitespace: "OMG 😭😭!!" and "omg" are the same opener."""
+    return " ".join(PUNCTUATION.sub(" ", clean_text(text).casefold()).split())
+
+
+class _Entry:
+    __slots__ = ("variants", "expires", "cursor", "upstream_ms")
+
+    def __init__(self, expires: float):
+        self.variants: List[str] = []
+        self.expires = expires
+        self.cursor = 0
+        self.upstream_ms = 0.0  # mean upstream latency of the calls that filled it
+
+
+class ResponseCache:
+    """Reuse LLM replies to short, near-identical prompts ("hey", "omg", "what's up").
+
+    Keys are the normalized prompt plus whatever else shapes the reply (the
+    system prompt version, model parameters).  Only openers are cached:
+    prompts up to ``max_prompt_chars`` (normalized) sent before the session
+    has any prior turns.  A short follow-up ("why?") depends on its history
+    and goes upstream.  Callers must generate the replies they put here
+    without any session's history.
+
+    Each key keeps a pool of up to ``variants`` distinct replies.  Until the
+    pool is full every miss goes upstream and adds to it; after that replies
+    are served from the pool (``rotate``: in turn, ``random``: any) until
+    the entry expires ``ttl`` seconds after it was created.  Concurrent
+    misses for one key share a single upstream call (single-flight).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = LLM_CACHE_ENABLED,
+        ttl: float = LLM_CACHE_TTL,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        variants: int = LLM_CACHE_VARIANTS,
+        policy: str = LLM_CACHE_POLICY,
+        max_prompt_chars: int = LLM_CACHE_MAX_PROMPT_CHARS,
+    ):
+        if policy not in ("rotate", "random"):
+            raise ValueError(f"Unknown LLM_CACHE_POLICY: {policy}")
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.variants = max(1, variants)
+        self.policy = policy
+        self.max_prompt_chars = max_prompt_chars
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight = {}  # key -> Future shared by concurrent misses
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.shared = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.saved_ms = 0.0
+
+    def key(self, prompt: str, *context, prior_turns: int = 0) -> Optional[str]:
+        """Cache key for ``prompt`` under ``context``, or None if it shouldn't be cached.
+
+        ``prior_turns`` is how many messages the session held before ``prompt``.
+        """
+        if not self.enabled:
+            return None
+        normalized = normalize_prompt(prompt)
+        if not normalized or len(normalized) > self.max_prompt_chars or prior_turns:
+            with self._lock:
+                self.bypassed += 1
+            return None
+        return hashlib.sha256(json.dumps([normalized, *context], sort_keys=True, default=str).encode()).hexdigest()
+
+    # --- Lookup / single-flight ---
+    def claim(self, key: str) -> Tuple[Optional[str], Optional[Future], bool]:
+        """``(reply, None, False)`` on a hit, else ``(None, future, leader)``.
+
+        The leader makes the upstream call and must ``fill()`` the future;
+        everyone else waits on the same future.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires <= now:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is not None and len(entry.variants) >= self.variants:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_ms += entry.upstream_ms
+                if self.policy == "random":
+                    return random.choice(entry.variants), None, False
+                entry.cursor += 1
+                return entry.variants[(entry.cursor - 1) % len(entry.variants)], None, False
+            future = self._inflight.get(key)
+            if future is not None:
+                self.shared += 1
+                if entry is not None:
+                    self.saved_ms += entry.upstream_ms
+                return None, future, False
+            future = self._inflight[key] = Future()
+            self.misses += 1
+            return None, future, True
+
+    def fill(self, key: str, future: Future, reply: Optional[str] = None, elapsed: float = 0.0,
+             error: Optional[BaseException] = None):
+        """Finish the leader's call: store ``reply`` (unless it failed) and wake the followers."""
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None and reply:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = _Entry(time.monotonic() + self.ttl)
+                if reply not in entry.variants and len(entry.variants) < self.variants:
+                    entry.variants.append(reply)
+                    n = len(entry.variants)
+                    entry.upstream_ms += (elapsed * 1000 - entry.upstream_ms) / n
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(reply)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.shared + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "variants": self.variants,
+                "policy": self.policy,
+                "hits": self.hits,
+                "shared": self.shared,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round((self.hits + self.shared) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "saved_ms": round(self.saved_ms, 1),
+            }
+
+
+# Shared instance for chat turns (LLM_CACHE_ENABLED=true to turn it on)
+response_cache = ResponseCache()
@@ -0,0 +1,17 @@
+import json
+from typing import Any, AsyncIterator, Tuple
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def sse_stream(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[str]:
+    """Turn an async iterator of (event, data) pairs into SSE text."""
+    async for event, data in events:
+        yield format_sse(event, data)
+
+
+# Headers that stop proxies (nginx, Render) from buffering the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import json
+import re
+import struct
+import unicodedata
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from services.audio_cache import audio_cache
+from services.bulkhead import table_read_bulkhead
+from services.metrics import stage
+from services.registry import backends
+from services.tts import DEFAULT_VOICE, TTS_LANG, clean_text_for_tts, clip_key, split_text_into_chunks
+from services.tts_pipeline import TTS_MAX_CHUNK_CHARS
+from services.uploads import probe_duration
+
+# === Script Parsing ===
+MARKUP = re.compile(r"[*_#>`~]+")
+LIST_ITEM = re.compile(r"^\s*(?:[-•]|\d+[.)])\s+")
+HEADING = re.compile(r"^(?:act|scene|prologue|epilogue|intermission)\b", re.IGNORECASE)
+LABEL = re.compile(r"^(?P<label>[^:]{1,40}?)\s*:\s*(?P<value>.*)$")
+SPEAKER = re.compile(r"^(?P<name>[^:()\[\]]{1,40}?)\s*(?:[(\[](?P<note>[^)\]]*)[)\]])?\s*:\s*(?P<text>.+)$")
+CHARACTER_ENTRY = re.compile(r"^(?P<name>[^:(,–—]{1,40}?)\s*(?:\([^)]*\))?\s*(?::|,|–|—| - )\s*(?P<trait>.*)$")
+PARENTHETICAL = re.compile(r"[(\[][^)\]]*[)\]]")
+DIRECTION = re.compile(r"^[(\[].*[)\]]$")
+# Labels that look like "Name: text" but are part of the script's furniture
+NOT_SPEAKERS = {"title", "characters", "cast", "setting", "scene", "act", "stage directions", "stage direction",
+                "time", "place", "location", "note", "notes", "themes", "theme", "the end", "end", "lights",
+                "sound", "music", "conflict", "climax", "resolution", "summary", "duration"}
+
+
+@dataclass
+class ScriptLine:
+    """One spoken unit of the play: a heading, a stage direction or a line of dialogue."""
+    kind: str                       # heading | direction | dialogue
+    text: str
+    speaker: Optional[str] = None   # dialogue only
+    note: Optional[str] = None      # inline direction, e.g. "(whispering)"
+    chapter: int = 0
+
+
+@dataclass
+class Play:
+    title: str
+    characters: Dict[str, str] = field(default_factory=dict)  # name -> trait
+    chapters: List[str] = field(default_factory=list)
+    lines: List[ScriptLine] = field(default_factory=list)
+
+
+def _plain(line: str) -> str:
+    """A script line without markdown, list bullets or emoji (punctuation is kept for parsing)."""
+    if not line.isascii():
+        line = "".join(c for c in line if unicodedata.category(c) not in ("So", "Sk", "Cf", "Mn", "Cs"))
+    return " ".join(LIST_ITEM.sub("", MARKUP.sub("", line)).split())
+
+
+def _speaker(name: str, play: Play) -> Optional[str]:
+    """The character ``name`` refers to, or None if it doesn't look like a speaker."""
+    name = name.strip()
+    known = {character.lower(): character for character in play.characters}
+    if name.lower() in known:
+        return known[name.lower()]
+    words = name.split()
+    if (name.lower() in NOT_SPEAKERS or not 0 < len(words) <= 3
+            or not all(word[0].isupper() or not word[0].isalpha() for word in words)):
+        return None
+    speaker = name.title() if name.isupper() else name
+    play.characters.setdefault(speaker, "")
+    return speaker
+
+
+def parse_script(script: str) -> Play:
+    """Split a generated stage play into title, cast, chapters and speakable lines.
+
+    Tolerates the markdown the playwright prompt tends to produce (bold
+    names, emoji headings, bullet lists).  Act/scene headings start a new
+    chapter; parenthesised lines and anything that isn't ``Name: text`` are
+    read as stage directions.
+    """
+    play = Play(title="")
+    in_cast = False
+    previous_blank = True
+    for raw in script.splitlines():
+        line = _plain(raw)
+        if not line or set(line) <= set(".-= "):
+            previous_blank = True
+            continue
+        label = LABEL.match(line)
+        key = label.group("label").strip().lower() if label else line.lower()
+
+        if key in ("title", "play title"):
+            play.title = play.title or label.group("value").strip()
+        elif key in ("characters", "cast", "characters with traits", "cast of characters"):
+            in_cast = True
+        elif in_cast and LIST_ITEM.match(MARKUP.sub("", raw).strip()) and CHARACTER_ENTRY.match(line):
+            entry = CHARACTER_ENTRY.match(line)
+            play.characters[entry.group("name").strip()] = entry.group("trait").strip()
+        elif HEADING.match(line):
+            in_cast = False
+            heading = line.rstrip(":")
+            if play.lines and play.lines[-1].kind == "heading":
+                # "Act I" straight into "Scene 1": one chapter, not an empty one
+                heading = play.chapters.pop() + ". " + heading
+                play.lines.pop()
+            play.chapters.append(heading)
+            play.lines.append(ScriptLine("heading", heading, chapter=len(play.chapters)))
+        elif not play.title and not play.lines and not play.characters:
+            play.title = line
+        else:
+            in_cast = False
+            match = None if DIRECTION.match(line) else SPEAKER.match(line)
+            speaker = _speaker(match.group("name"), play) if match else None
+            if speaker:
+                text = PARENTHETICAL.sub("", match.group("text")).strip()
+                play.lines.append(ScriptLine("dialogue", text, speaker, match.group("note"),
+                                             chapter=len(play.chapters)))
+            elif (not previous_blank and play.lines and play.lines[-1].kind == "dialogue"
+                  and not DIRECTION.match(line)):
+                play.lines[-1].text = f"{play.lines[-1].text} {line}"  # wrapped dialogue
+            else:
+                text = line[1:-1].strip() if DIRECTION.match(line) else line
+                play.lines.append(ScriptLine("direction", text, chapter=len(play.chapters)))
+        previous_blank = False
+
+    play.title = play.title or "Untitled"
+    play.lines = [line for line in play.lines if clean_text_for_tts(line.text, max_len=None)]
+    return play
+
+
+def cast_voices(play: Play, voices: Tuple[str, ...]) -> Dict[str, str]:
+    """Narrator gets the first voice; characters take the rest in cast order, cycling."""
+    voices = tuple(voices) or (DEFAULT_VOICE,)
+    pool = voices[1:] or voices
+    cast = {"Narrator": voices[0]}
+    for i, character in enumerate(play.characters):
+        cast[character] = pool[i % len(pool)]
+    return cast
+
+
+# === Chapter Markers (ID3v2.4 CHAP/CTOC) ===
+def _syncsafe(n: int) -> bytes:
+    return bytes(((n >> 21) & 0x7F, (n >> 14) & 0x7F, (n >> 7) & 0x7F, n & 0x7F))
+
+
+def _id3_frame(frame_id: str, body: bytes) -> bytes:
+    return frame_id.encode("ascii") + _syncsafe(len(body)) + b"\x00\x00" + body
+
+
+def _title_frame(text: str) -> bytes:
+    return _id3_frame("TIT2", b"\x03" + text.encode("utf-8"))  # UTF-8
+
+
+def chapter_tag(title: str, chapters: List[dict]) -> bytes:
+    """An ID3v2.4 tag with a table of contents and one CHAP frame per chapter."""
+    ids = [f"ch{i}".encode("ascii") for i in range(len(chapters))]
+    frames = [_title_frame(title)]
+    if chapters:
+        frames.append(_id3_frame("CTOC", b"toc\x00" + bytes((0x03, len(ids))) + b"".join(i + b"\x00" for i in ids)))
+    for element_id, chapter in zip(ids, chapters):
+        times = struct.pack(">IIII", chapter["start_ms"], chapter["end_ms"], 0xFFFFFFFF, 0xFFFFFFFF)
+        frames.append(_id3_frame("CHAP", element_id + b"\x00" + times + _title_frame(chapter["title"])))
+    body = b"".join(frames)
+    return b"ID3\x04\x00\x00" + _syncsafe(len(body)) + body
+
+
+def _strip_id3(data: bytes) -> bytes:
+    # Per-line clips may carry their own tag; only the track's tag belongs in front
+    if data[:3] == b"ID3" and len(data) >= 10:
+        return data[10 + ((data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]):]
+    return data
+
+
+# === Rendering ===
+@dataclass
+class Segment:
+    line: int
+    text: str
+    voice: str
+    key: str
+
+
+def _segments(play: Play, cast: Dict[str, str], engine: str) -> List[Segment]:
+    segments = []
+    for index, line in enumerate(play.lines):
+        voice = cast.get(line.speaker, cast["Narrator"]) if line.kind == "dialogue" else cast["Narrator"]
+        for chunk in split_text_into_chunks(clean_text_for_tts(line.text, max_len=None), TTS_MAX_CHUNK_CHARS):
+            if chunk:
+                segments.append(Segment(index, chunk, voice, clip_key(chunk, voice, engine)))
+    return segments
+
+
+def _renderer(segment: Segment):
+    def render(path: str):
+        with stage("tts_render"):
+            backends.get("tts").render(segment.text, path, TTS_LANG, voice=segment.voice)
+    return render
+
+
+def _render_segment(segment: Segment) -> bool:
+    """Make sure one line's clip is cached; True if it already was."""
+    if audio_cache.get(segment.key) is not None:
+        return True
+    audio_cache.get_or_create(segment.key, _renderer(segment))
+    return False
+
+
+def _assemble(play: Play, segments: List[Segment], key: str) -> dict:
+    """Concatenate the cached clips into one chaptered track with per-line cues.
+
+    A clip evicted since its line was rendered is rendered again here.
+    """
+    parts, clock = [], 0
+    bounds: Dict[int, List[int]] = {}
+    for segment in segments:
+        audio = _strip_id3(audio_cache.read(
+            segment.key, lambda: audio_cache.get_or_create(segment.key, _renderer(segment))))
+        duration_ms = int(round((probe_duration(audio) or 0) * 1000))
+        parts.append(audio)
+        span = bounds.setdefault(segment.line, [clock, clock])
+        clock += duration_ms
+        span[1] = clock
+
+    lines = []
+    for index, line in enumerate(play.lines):
+        start, end = bounds.get(index, (clock, clock))
+        lines.append({**asdict(line), "start_ms": start, "end_ms": end})
+    chapters = []
+    for number, title in enumerate([play.title, *play.chapters]):
+        spans = [(l["start_ms"], l["end_ms"]) for l in lines if l["chapter"] == number]
+        if spans:
+            chapters.append({"title": title, "start_ms": spans[0][0], "end_ms": spans[-1][1]})
+
+    def render(path: str):
+        with open(path, "wb") as out:
+            out.write(chapter_tag(play.title, chapters))
+            for audio in parts:
+                out.write(audio)
+
+    meta = {"title": play.title, "duration_ms": clock, "chapters": chapters, "lines": lines}
+    return audio_cache.get_or_create(key, render, meta=meta)
+
+
+async def render_table_read(script: str) -> dict:
+    """Render a whole play with one voice per character as a single chaptered MP3.
+
+    Every line is synthesized concurrently on the table-read worker pool
+    and cached on its own, so the play takes about as long as its slowest
+    lines, and re-reading an edited script only renders the changed lines.
+    """
+    play = parse_script(script)
+    engine_name = backends.engine_name("tts")
+    engine = await asyncio.to_thread(backends.get, "tts")
+    cast = cast_voices(play, getattr(engine, "voices", (DEFAULT_VOICE,)))
+    segments = _segments(play, cast, engine_name)
+    track_key = hashlib.sha256(json.dumps(
+        ["table-read", play.title, play.chapters, [s.key for s in segments],
+         [line.chapter for line in play.lines], [s.line for s in segments]]
+    ).encode("utf-8")).hexdigest()
+
+    entry = audio_cache.get(track_key)
+    cached = 0
+    if entry is None:
+        unique = {segment.key: segment for segment in segments}
+        with stage("table_read_lines"):
+            hits = await asyncio.gather(*(table_read_bulkhead.run(_render_segment, segment)
+                                          for segment in unique.values()))
+        cached = sum(hits)
+        entry = await asyncio.to_thread(_assemble, play, segments, track_key)
+    else:
+        cached = len({segment.key for segment in segments})
+
+    meta = entry["meta"]
+    return {
+        "title": meta["title"],
+        "audio_url": entry["url"],
+        "duration_ms": meta["duration_ms"],
+        "voices": {name: voice for name, voice in cast.items() if name == "Narrator" or name in play.characters},
+        "characters": play.characters,
+        "chapters": meta["chapters"],
+        "lines": meta["lines"],
+        "segments": len(segments),
+        "cached_segments": cached,
+    }
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional
+
+# === Trace Settings ===
+TRACE_LEVEL = os.getenv("TRACE_LEVEL", "info").lower()                 # debug | info | warning | error | off
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))        # share of sessions traced
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "50"))           # events kept per session
+TRACE_MAX_SESSIONS = int(os.getenv("TRACE_MAX_SESSIONS", "1000"))
+TRACE_MAX_CHARS = int(os.getenv("TRACE_MAX_CHARS", "200"))              # per text field
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "off": 100}
+
+
+def _clip(value):
+    if isinstance(value, str) and len(value) > TRACE_MAX_CHARS:
+        return value[:TRACE_MAX_CHARS] + "…"
+    return value
+
+
+class TraceBuffer:
+    """Fixed-size, in-memory ring buffer of debug events per session.
+
+    Recording is O(1): the newest ``buffer_size`` events of each session are
+    kept and the least recently traced session is dropped beyond
+    ``max_sessions``.  Sampling is decided per session (a stable hash of its
+    id) so a sampled session's trace is complete; warnings and errors are
+    always kept.
+    """
+
+    def __init__(self, level: str = TRACE_LEVEL, sample_rate: float = TRACE_SAMPLE_RATE,
+                 buffer_size: int = TRACE_BUFFER_SIZE, max_sessions: int = TRACE_MAX_SESSIONS):
+        self.level = LEVELS.get(level, LEVELS["info"])
+        self.sample_rate = sample_rate
+        self.buffer_size = buffer_size
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.dropped = 0
+
+    def sampled(self, session_id: str) -> bool:
+        if self.sample_rate >= 1:
+            return True
+        return zlib.crc32(session_id.encode()) % 10000 < self.sample_rate * 10000
+
+    def enabled(self, session_id: str, level: str = "info") -> bool:
+        severity = LEVELS.get(level, LEVELS["info"])
+        if severity < self.level:
+            return False
+        return severity >= LEVELS["warning"] or self.sampled(session_id)
+
+    def record(self, session_id: str, event: str, level: str = "info", **fields):
+        if not self.enabled(session_id, level):
+            return
+        entry = {"ts": time.time(), "event": event, "level": level,
+                 **{key: _clip(value) for key, value in fields.items()}}
+        with self._lock:
+            events = self._sessions.get(session_id)
+            if events is None:
+                events = self._sessions[session_id] = deque(maxlen=self.buffer_size)
+                if len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.dropped += 1
+            else:
+                self._sessions.move_to_end(session_id)
+            events.append(entry)
+            self.recorded += 1
+
+    def get(self, session_id: str, limit: Optional[int] = None, level: str = "debug") -> List[dict]:
+        minimum = LEVELS.get(level, LEVELS["debug"])
+        with self._lock:
+            events = list(self._sessions.get(session_id, ()))
+        events = [e for e in events if LEVELS.get(e["level"], 0) >= minimum]
+        return events[-limit:] if limit else events
+
+    def sessions(self) -> Dict[str, int]:
+        with self._lock:
+            return {session_id: len(events) for session_id, events in reversed(self._sessions.items())}
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "level": next(name for name, value in LEVELS.items() if value == self.level),
+                "sample_rate": self.sample_rate,
+                "buffer_size": self.buffer_size,
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "recorded": self.recorded,
+                "sessions_dropped": self.dropped,
+            }
+
+
+# Shared buffer for the voice/script hot paths
+tracer = TraceBuffer()
@@ -1,23 +1,22 @@
 import os
 import re
-import sys
-import uuid
-from pathlib import Path
-from typing import Optional, Tuple
+import tempfile
+from typing import Iterator, Optional, Tuple
 
 from dotenv import load_dotenv
-import emoji
-from gtts import gTTS
+
+from services.audio_cache import audio_cache, cache_key
+from services.emotion import clean_text, score_text
+from services.metrics import stage
+from services.registry import backends
 
 # Load .env variables
 load_dotenv()
 
-# Ensure static/audio directory exists
-STATIC_DIR = Path("static/audio")
-STATIC_DIR.mkdir(parents=True, exist_ok=True)
-
-# Cache for repeat generation (basic memory)
-AUDIO_CACHE = {}
+# Settings that (with the cleaned text and engine name) address cached clips
+TTS_LANG = "en"
+DEFAULT_VOICE = "default"
+ERROR_SCORE = {"score": 0, "level": "Error", "emoji": "❌", "color": "#000"}
 
 def split_text_into_chunks(text: str, max_len: int = 1000) -> list:
     """Split text into chunks that gTTS can handle."""
@@ -34,102 +33,101 @@ def split_text_into_chunks(text: str, max_len: int = 1000) -> list:
         chunks.append(current.strip())
     return chunks
 
-def clean_text_for_tts(text: str) -> str:
-    """Clean text for TTS (remove emojis, links, markdown)."""
-    text = emoji.replace_emoji(text, replace='')                     # Remove emojis
-    text = re.sub(r'!\[.*?\]\(.*?\)', '', text)                      # Remove markdown images
-    text = re.sub(r'https?://\S+', '', text)                         # Remove URLs
-    text = re.sub(r'[^a-zA-Z0-9.,;:!?\'"\s-]', '', text)             # Remove non-verbal symbols
-    text = re.sub(r'\s{2,}', ' ', text).strip()                      # Normalize whitespace
-    return text[:500]  # gTTS works best under ~500 chars
+def clean_text_for_tts(text: str, max_len: Optional[int] = 500) -> str:
+    """Clean text for TTS (remove emojis, links, markdown), truncated to ``max_len`` if set."""
+    return clean_text(text, max_len)  # gTTS works best under ~500 chars
 
-class TTSService:
-    """TTS using Google gTTS with emotional score logging."""
+def clip_key(cleaned_text: str, voice: Optional[str] = None, engine: Optional[str] = None) -> str:
+    """Audio-cache key for a clip: the same clean text, voice and engine always land on one entry."""
+    return cache_key(cleaned_text, voice or DEFAULT_VOICE, TTS_LANG, engine or backends.engine_name("tts"))
+
+class GTTSEngine:
+    """Google gTTS; the library is imported when the engine is first built.
+
+    gTTS has one voice per language, so ``voices`` are Google Translate
+    domains, which read English with different regional accents.
+    """
+
+    voices = ("com", "co.uk", "com.au", "co.in", "ca", "ie", "co.za")
 
     def __init__(self):
-        print(f"🐍 Using Python from: {sys.executable}")
+        from gtts import gTTS
+
+        self._gtts = gTTS
+
+    def render(self, text: str, path: str, lang: str = TTS_LANG, voice: Optional[str] = None):
+        self._gtts(text=text, lang=lang, tld=voice or self.voices[0], slow=False).save(path)
+
+
+class TTSService:
+    """TTS through the configured engine (TTS_ENGINE) with emotional score logging."""
 
     def generate_emotional_audio(self, text: str, voice_id: Optional[str] = None) -> Tuple[str, dict]:
         cleaned_text = clean_text_for_tts(text)
+        key = clip_key(cleaned_text)
 
-        if cleaned_text in AUDIO_CACHE:
+        cached = audio_cache.get(key)
+        if cached and "score" in cached["meta"]:
             print("🧠 Returning cached audio.")
-            return AUDIO_CACHE[cleaned_text], {
-                "score": 0, "level": "Low", "emoji": "😐", "color": "#aaa"
-            }
-
-        # --- Emotion Feature Extraction ---
-        exclamations = cleaned_text.count("!")
-        all_caps_count = sum(1 for word in cleaned_text.split() if word.isupper() and len(word) > 2)
-        intense_punct_count = len(re.findall(r"\?!|!\?", cleaned_text))
-
-        intense_keywords = re.findall(
-            r"\b(love|hate|crying|exploding|raging|furious|ecstatic|devastated|insane|nooo+|yaaa+|ugh|omg|shaking|lit|wild)\b",
-            cleaned_text, re.IGNORECASE)
-        moderate_keywords = re.findall(
-            r"\b(happy|sad|hopeful|upset|calm|gentle|sweet|nervous|touched|lonely|tired|meh|confused|awkward|emotional)\b",
-            cleaned_text, re.IGNORECASE)
-
-        intense_emojis = {"😭", "😡", "🔥", "💔", "🤯", "🤬", "😤", "😱"}
-        moderate_emojis = {"😊", "😅", "🥲", "🙂", "🤗", "❤️", "✨", "😐", "😔", "😳"}
-        emoji_score = sum(2 for e in intense_emojis if e in text) + sum(1 for e in moderate_emojis if e in text)
-
-        emotional_words = re.findall(
-            r"\b(I|you|we|feel|miss|trust|care|hurt|friend|connect|burning|mad|terrified|anxious|desperate)\b",
-            cleaned_text, re.IGNORECASE)
-        emotional_depth = len(emotional_words)
-
-        # --- Intensity Score Calculation ---
-        intensity_score = (
-            all_caps_count * 2 +
-            exclamations * 1.5 +
-            intense_punct_count * 3 +
-            len(intense_keywords) * 3 +
-            len(moderate_keywords) * 1.5 +
-            emoji_score * 2 +
-            emotional_depth * 1.2
-        )
-
-        word_count = len(cleaned_text.split())
-        est_time = max(1.0, word_count / 100.0)  # ~100wpm
-        raw_score = intensity_score / est_time
-        scaled_score = min(10, max(1, round(raw_score / 5.5)))
-
-        # --- Score Mapping ---
-        score_map = {
-            1: {"level": "Numb", "emoji": "😐", "color": "#9ca3af"},
-            2: {"level": "Mellow", "emoji": "🙂", "color": "#a3e635"},
-            3: {"level": "Warm", "emoji": "😊", "color": "#facc15"},
-            4: {"level": "Touched", "emoji": "🥺", "color": "#fb923c"},
-            5: {"level": "Spicy", "emoji": "🌶️", "color": "#f87171"},
-            6: {"level": "Dramatic", "emoji": "🎭", "color": "#f472b6"},
-            7: {"level": "Fiery", "emoji": "🔥", "color": "#ef4444"},
-            8: {"level": "Explosive", "emoji": "💥", "color": "#e11d48"},
-            9: {"level": "Meltdown", "emoji": "🤯", "color": "#be123c"},
-            10: {"level": "DRAMA BOMB", "emoji": "🎆", "color": "#881337"},
-        }
-
-        score_data = {
-            "score": scaled_score,
-            **score_map[scaled_score]
-        }
-
-        
-
-        # --- Audio Generation ---
-        filename = f"tts_{uuid.uuid4().hex[:8]}.mp3"
-        filepath = STATIC_DIR / filename
+            return cached["url"], cached["meta"]["score"]
 
+        score_data = self.emotional_score(text, cleaned_text)
+        try:
+            entry = audio_cache.get_or_create(key, self._renderer(cleaned_text), meta={"score": score_data})
+            return entry["url"], score_data
+        except Exception as e:
+            print(f"❌ TTS error: {e}")
+            return "", ERROR_SCORE
+
+    def emotional_score(self, text: str, cleaned_text: Optional[str] = None) -> dict:
+        """Drama Juice score for ``text`` (features read from ``cleaned_text``)."""
+        if cleaned_text is None:
+            cleaned_text = clean_text_for_tts(text)
+        with stage("emotion_score"):
+            return score_text(text, cleaned_text)
+
+    def _renderer(self, cleaned_text: str):
+        def render(path: str):
+            with stage("tts_render"):
+                backends.get("tts").render(cleaned_text, path, TTS_LANG)
+        return render
+
+    def stream_audio(self, text: str) -> Tuple[str, bool, Iterator[bytes]]:
+        """MP3 chunks for ``text`` as the engine produces them, teed into the audio cache.
+
+        Returns the clip's cache URL (servable once the stream has finished),
+        whether it was already cached, and the chunk iterator.  The whole text
+        is spoken (no length cap): it goes to the engine a few sentences at a
+        time, one after another into the same clip.  Engines without
+        ``stream()`` (gTTS) render each part before it is sent.
+        """
+        cleaned_text = clean_text_for_tts(text, max_len=None)
+        parts = [part for part in split_text_into_chunks(cleaned_text) if part]
+        key = clip_key(cleaned_text)
+        cached = audio_cache.get(key) is not None
+        engine = backends.get("tts")
+        if hasattr(engine, "stream"):
+            def chunks():
+                for part in parts:
+                    yield from engine.stream(part)
+        else:
+            def chunks():
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = os.path.join(tmp, "clip.mp3")
+                    for part in parts:
+                        self._renderer(part)(path)
+                        with open(path, "rb") as f:
+                            yield f.read()
+        return audio_cache.url(key), cached, audio_cache.stream(key, chunks)
+
+    def synthesize(self, cleaned_text: str) -> str:
+        """Render already-cleaned text to a cached MP3; returns its URL or ""."""
+        key = clip_key(cleaned_text)
         try:
-            tts = gTTS(text=cleaned_text, lang='en', slow=False)
-            tts.save(str(filepath))
-            url_path = f"/static/audio/{filename}"
-            AUDIO_CACHE[cleaned_text] = url_path
-            
-            return url_path, score_data
+            return audio_cache.get_or_create(key, self._renderer(cleaned_text))["url"]
         except Exception as e:
-            print(f"❌ gTTS error: {e}")
-            return "", {"score": 0, "level": "Error", "emoji": "❌", "color": "#000"}
+            print(f"❌ TTS error: {e}")
+            return ""
 
 
 
@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import os
+import re
+from typing import Callable, List, Optional
+
+from services.audio_cache import audio_cache
+from services.bulkhead import tts_bulkhead
+from services.tts import clean_text_for_tts, split_text_into_chunks, tts_service
+
+# === Pipeline Settings ===
+TTS_MIN_CHUNK_CHARS = int(os.getenv("TTS_MIN_CHUNK_CHARS", "40"))
+TTS_MAX_CHUNK_CHARS = int(os.getenv("TTS_MAX_CHUNK_CHARS", "400"))
+TTS_STITCH = os.getenv("TTS_STITCH", "true").lower() == "true"
+
+SENTENCE_END = re.compile(r'(?<=[.?!])\s+')
+
+
+class SentencePipeline:
+    """Synthesizes an LLM reply sentence by sentence while it is still streaming.
+
+    ``feed()`` tokens as they arrive; every time a sentence (at least
+    ``min_chars`` long) completes, a synthesis task starts on the TTS
+    bulkhead's worker threads.
+    ``ready()`` hands back finished chunks in order without blocking, and
+    ``drain()`` waits for the rest.
+    """
+
+    def __init__(
+        self,
+        synthesize: Optional[Callable[[str], str]] = None,
+        min_chars: int = TTS_MIN_CHUNK_CHARS,
+        max_chars: int = TTS_MAX_CHUNK_CHARS,
+    ):
+        self.synthesize = synthesize or tts_service.synthesize
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._pending = ""
+        self._tasks: List[asyncio.Task] = []
+        self._texts: List[str] = []
+        self._emitted = 0
+
+    # --- Chunking ---
+    def _start(self, text: str):
+        cleaned = clean_text_for_tts(text, max_len=None)
+        if not cleaned:
+            return
+        for chunk in split_text_into_chunks(cleaned, max_len=self.max_chars):
+            if chunk:
+                self._texts.append(chunk)
+                self._tasks.append(asyncio.create_task(tts_bulkhead.run(self.synthesize, chunk)))
+
+    def feed(self, token: str):
+        self._buffer += token
+        parts = SENTENCE_END.split(self._buffer)
+        # Last part may still be mid-sentence
+        self._buffer = parts.pop()
+        for sentence in parts:
+            self._pending = f"{self._pending} {sentence}".strip()
+            if len(self._pending) >= self.min_chars:
+                self._start(self._pending)
+                self._pending = ""
+
+    def close(self):
+        """Flush whatever text is left once the reply is complete."""
+        tail = f"{self._pending} {self._buffer}".strip()
+        self._pending = self._buffer = ""
+        if tail:
+            self._start(tail)
+
+    # --- Results ---
+    def _chunk(self, index: int) -> dict:
+        return {"index": index, "text": self._texts[index], "audio_url": self._tasks[index].result()}
+
+    def ready(self) -> List[dict]:
+        """Finished chunks, in order, that were not returned before."""
+        chunks = []
+        while self._emitted < len(self._tasks) and self._tasks[self._emitted].done():
+            chunks.append(self._chunk(self._emitted))
+            self._emitted += 1
+        return chunks
+
+    async def drain(self) -> List[dict]:
+        """Wait for every remaining chunk and return them in order."""
+        chunks = []
+        while self._emitted < len(self._tasks):
+            await self._tasks[self._emitted]
+            chunks.append(self._chunk(self._emitted))
+            self._emitted += 1
+        return chunks
+
+    def playlist(self) -> List[dict]:
+        return [self._chunk(i) for i in range(len(self._tasks)) if self._tasks[i].done()]
+
+
+def stitch_audio(chunks: List[dict], synthesize: Optional[Callable[[str], str]] = None) -> str:
+    """Concatenate cached MP3 chunks (same encoder settings) into one cached file.
+
+    ``chunks`` are playlist entries (``text`` + ``audio_url``); a part evicted
+    from the cache before it is read is synthesized again with ``synthesize``.
+    """
+    synthesize = synthesize or tts_service.synthesize
+    chunks = [chunk for chunk in chunks if chunk["audio_url"]]
+    if len(chunks) == 1:
+        return chunks[0]["audio_url"]
+    if not chunks:
+        return ""
+    keys = [audio_cache.key_for_url(chunk["audio_url"]) for chunk in chunks]
+
+    def render(path: str):
+        with open(path, "wb") as out:
+            for key, chunk in zip(keys, chunks):
+                out.write(audio_cache.read(key, lambda: synthesize(chunk["text"])))
+
+    stitched_key = hashlib.sha256(("stitch\0" + "\0".join(keys)).encode()).hexdigest()
+    return audio_cache.get_or_create(stitched_key, render, meta={"parts": keys})["url"]
+
+
+async def finish_audio(pipeline: SentencePipeline, stitch: bool = TTS_STITCH) -> dict:
+    """Wait for the pipeline and build the final playlist (+ stitched file)."""
+    await pipeline.drain()
+    playlist = [chunk for chunk in pipeline.playlist() if chunk["audio_url"]]
+    if stitch:
+        audio_url = await asyncio.to_thread(stitch_audio, playlist, pipeline.synthesize)
+    else:
+        audio_url = playlist[0]["audio_url"] if playlist else ""
+    return {"audio_url": audio_url, "playlist": playlist}
+
+
+async def synthesize_text(text: str, stitch: bool = TTS_STITCH, synthesize: Optional[Callable[[str], str]] = None) -> dict:
+    """Synthesize a complete text with all chunks rendered concurrently."""
+    pipeline = SentencePipeline(synthesize)
+    pipeline.feed(text)
+    pipeline.close()
+    return await finish_audio(pipeline, stitch)
@@ -0,0 +1,238 @@
+import io
+import json
+import os
+import struct
+import wave
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from services.metrics import stage
+
+# === Upload Limits ===
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))  # Whisper API file limit
+MAX_UPLOAD_SECONDS = float(os.getenv("MAX_UPLOAD_SECONDS", "120"))
+MULTIPART_OVERHEAD_BYTES = 64 * 1024  # boundaries, headers and the small form fields next to the file
+
+# MPEG-1/2 Layer III bitrates (kbps) by header index
+MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # MPEG-1
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),      # MPEG-2
+    0: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),      # MPEG-2.5
+}
+
+# EBML (WebM / Matroska) element ids
+EBML_SEGMENT, EBML_INFO, EBML_CLUSTER, EBML_BLOCK_GROUP = 0x18538067, 0x1549A966, 0x1F43B675, 0xA0
+EBML_TIMECODE_SCALE, EBML_DURATION = 0x2AD7B1, 0x4489
+EBML_CLUSTER_TIMECODE, EBML_SIMPLE_BLOCK, EBML_BLOCK = 0xE7, 0xA3, 0xA1
+EBML_MASTERS = {EBML_SEGMENT, EBML_INFO, EBML_CLUSTER, EBML_BLOCK_GROUP}  # walked into, not skipped
+
+
+class AudioUpload:
+    """An uploaded clip held in memory, ready to hand to transcription."""
+
+    def __init__(self, data: bytes, filename: str, content_type: Optional[str] = None):
+        self.data = data
+        self.filename = filename
+        self.content_type = content_type
+        self.duration = probe_duration(data)
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+def _wav_duration(data: bytes) -> Optional[float]:
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except (wave.Error, EOFError, ZeroDivisionError):
+        return None
+
+
+def _mp3_duration(data: bytes) -> Optional[float]:
+    """Estimate from the first frame's bitrate (exact for CBR, close for VBR)."""
+    offset = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        offset = 10 + ((data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9])
+    end = min(len(data) - 4, offset + 64 * 1024)
+    while offset < end:
+        if data[offset] == 0xFF and data[offset + 1] & 0xE0 == 0xE0:
+            version = (data[offset + 1] >> 3) & 0x03
+            layer = (data[offset + 1] >> 1) & 0x03
+            index = data[offset + 2] >> 4
+            if layer == 1 and version in MP3_BITRATES and 0 < index < 15:
+                return (len(data) - offset) * 8 / (MP3_BITRATES[version][index] * 1000)
+        offset += 1
+    return None
+
+
+def _ebml_vint(data: bytes, offset: int, keep_marker: bool = False) -> Tuple[int, int]:
+    """(value, length) of the EBML variable-length integer at ``offset``."""
+    first = data[offset]
+    if first == 0:
+        raise ValueError("invalid EBML vint")
+    length = 9 - first.bit_length()
+    value = first if keep_marker else first & ((1 << (8 - length)) - 1)
+    for byte in data[offset + 1:offset + length]:
+        value = (value << 8) | byte
+    return value, length
+
+
+def _webm_duration(data: bytes) -> Optional[float]:
+    """Segment Duration if present, else the last block's timestamp.
+
+    MediaRecorder writes live WebM: no Duration element and unknown-size
+    Segment/Cluster elements, so the walk steps into those and reads each
+    cluster's timecode plus its blocks' relative timecodes.
+    """
+    scale = 1_000_000  # ns per timecode tick (Matroska default)
+    cluster, last = 0, None
+    offset = 0
+    try:
+        while offset < len(data):
+            element, id_length = _ebml_vint(data, offset, keep_marker=True)
+            size, size_length = _ebml_vint(data, offset + id_length)
+            offset += id_length + size_length
+            if element in EBML_MASTERS:
+                continue
+            if size == (1 << (7 * size_length)) - 1:
+                break  # unknown size on a leaf: nothing more we can walk
+            payload = data[offset:offset + size]
+            if element == EBML_TIMECODE_SCALE:
+                scale = int.from_bytes(payload, "big")
+            elif element == EBML_DURATION and size in (4, 8):
+                duration = struct.unpack(">f" if size == 4 else ">d", payload)[0]
+                if duration > 0:
+                    return duration * scale / 1e9
+            elif element == EBML_CLUSTER_TIMECODE:
+                cluster = int.from_bytes(payload, "big")
+            elif element in (EBML_SIMPLE_BLOCK, EBML_BLOCK) and size >= 4:
+                _, track_length = _ebml_vint(payload, 0)
+                relative = int.from_bytes(payload[track_length:track_length + 2], "big", signed=True)
+                last = max(last or 0, cluster + relative)
+            offset += size
+    except (IndexError, ValueError, struct.error):
+        pass  # truncated or not really EBML: go with what was read
+    return last * scale / 1e9 if last is not None else None
+
+
+def _ogg_duration(data: bytes) -> Optional[float]:
+    """Last page's granule position over the stream's sample rate (Opus or Vorbis)."""
+    last_page = data.rfind(b"OggS")
+    if last_page < 0 or len(data) < last_page + 14:
+        return None
+    granule = int.from_bytes(data[last_page + 6:last_page + 14], "little", signed=True)
+    head = data[:4096]
+    opus = head.find(b"OpusHead")
+    vorbis = head.find(b"\x01vorbis")
+    if opus >= 0 and len(head) >= opus + 12:
+        # Opus granules count 48 kHz samples, including the decoder's pre-skip
+        granule -= int.from_bytes(head[opus + 10:opus + 12], "little")
+        rate = 48000
+    elif vorbis >= 0 and len(head) >= vorbis + 16:
+        rate = int.from_bytes(head[vorbis + 12:vorbis + 16], "little")
+    else:
+        return None
+    return granule / rate if granule >= 0 and rate else None
+
+
+def sniff_format(data: bytes) -> Optional[str]:
+    """Container format from the clip's magic bytes (the filename is whatever the client chose)."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "wav"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"  # EBML: MediaRecorder's webm (and matroska)
+    if data[:4] == b"OggS":
+        return "ogg"
+    if data[:4] == b"fLaC":
+        return "flac"
+    if data[4:8] == b"ftyp":
+        return "mp4"
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+
+def probe_duration(data: bytes) -> Optional[float]:
+    """Duration in seconds for WAV/MP3/WebM/Ogg uploads, None for formats we can't cheaply probe (FLAC, MP4)."""
+    container = sniff_format(data)
+    if container == "wav":
+        return _wav_duration(data)
+    if container == "mp3":
+        return _mp3_duration(data)
+    if container == "webm":
+        return _webm_duration(data)
+    if container == "ogg":
+        return _ogg_duration(data)
+    return None
+
+
+async def read_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES,
+                      max_seconds: float = MAX_UPLOAD_SECONDS) -> AudioUpload:
+    """Read an upload into memory, rejecting it (413) before any transcription if it is too big or too long.
+
+    Oversized bodies never get this far (``UploadLimitMiddleware``).  Starlette
+    has spooled the file by now (to disk past 1 MB); this is the one read of
+    it, and nothing is left to clean up afterwards.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes.")
+
+    # One read of exactly the spooled size (or one byte past the limit) so the
+    # body is copied once, without chunk lists or joins
+    with stage("upload_read"):
+        data = await file.read(file.size + 1 if file.size is not None else max_bytes + 1)
+    return check_upload(data, file.filename or "audio.mp3", file.content_type, max_bytes, max_seconds)
+
+
+def check_upload(data: bytes, filename: str, content_type: Optional[str] = None,
+                 max_bytes: int = MAX_UPLOAD_BYTES, max_seconds: float = MAX_UPLOAD_SECONDS) -> AudioUpload:
+    """Wrap clip bytes (from a form upload or socket frames), enforcing the same limits."""
+    if len(data) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes} bytes.")
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty audio upload.")
+
+    upload = AudioUpload(data, filename, content_type)
+    if upload.duration is not None and upload.duration > max_seconds:
+        raise HTTPException(status_code=413, detail=f"Audio is longer than {max_seconds:g} seconds.")
+    return upload
+
+
+class UploadLimitMiddleware:
+    """Reject request bodies over ``max_bytes`` (413) before they are parsed or spooled.
+
+    A declared Content-Length over the limit is refused without reading the
+    body; chunked bodies are cut off as soon as they pass it.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            body = json.dumps({"detail": f"Upload exceeds {MAX_UPLOAD_BYTES} bytes."}).encode()
+            await send({"type": "http.response.start", "status": 413,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode()),
+                                    (b"connection", b"close")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes.")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,14 +1,14 @@
-import os
-from pathlib import Path
-from typing import Dict, Any
-from services.whisper import transcribe_audio_file
-from services.llm import get_llm_response
-from services.tts import generate_emotional_audio
-from memory.session_memory import add_to_memory, get_conversation
-
-# Ensure audio directory exists
-STATIC_DIR = Path("static/audio")
-STATIC_DIR.mkdir(parents=True, exist_ok=True)
+import itertools
+from typing import Dict, Any, AsyncIterator, Iterator, Optional, Tuple
+from services.whisper import transcribe_clip
+from services.uploads import AudioUpload
+from services.bulkhead import Overloaded, tts_bulkhead
+from services.metrics import stage
+from services.trace import tracer
+from services.llm import get_llm_response, stream_llm_response
+from services.tts import ERROR_SCORE, tts_service
+from services.tts_pipeline import SentencePipeline, finish_audio, synthesize_text
+from memory.session_memory import add_to_memory, count_messages, discard_pending
 
 # Default fallback emotional score
 DEFAULT_SCORE = {
@@ -25,16 +25,31 @@ def validate_emotional_score(score: Any) -> Dict[str, Any]:
     
     return DEFAULT_SCORE
 
-async def process_voice_interaction(file_path: str, session_id: str) -> Dict[str, Any]:
+def score_reply(text: str, audio_url: str) -> Dict[str, Any]:
+    """Drama Juice score for a reply, or the error score if no audio was made."""
+    if not audio_url:
+        return ERROR_SCORE
+    return validate_emotional_score(tts_service.emotional_score(text))
+
+async def render_reply(text: str) -> Dict[str, Any]:
+    """Synthesize a full reply (all sentences in parallel) and score it."""
+    with stage("tts"):
+        audio = await synthesize_text(text)
+    return {**audio, "emotional_score": score_reply(text, audio["audio_url"])}
+
+async def process_voice_interaction(upload: AudioUpload, session_id: str,
+                                    preprocess: Optional[bool] = None) -> Dict[str, Any]:
     try:
         
-        transcript = await transcribe_audio_file(file_path)
+        transcript, preprocessing = await transcribe_clip(upload.data, upload.filename, preprocess)
 
         if not transcript or not transcript.strip():
+            tracer.record(session_id, "empty_transcript", level="warning", preprocessing=preprocessing)
             return {
                 "error": "Could not transcribe audio or audio was empty.",
                 "session_id": session_id,
-                "type": "voice"
+                "type": "voice",
+                "preprocessing": preprocessing
             }
 
         
@@ -42,57 +57,124 @@ async def process_voice_interaction(file_path: str, session_id: str) -> Dict[str
         
 
        
-        ai_response = get_llm_response(transcript, session_id=session_id)
+        ai_response = await get_llm_response(transcript, session_id=session_id)
         add_to_memory(session_id, "assistant", ai_response)
         
 
         
-        audio_url, score = generate_emotional_audio(ai_response)
-        emotional_score = validate_emotional_score(score)
-
-        # Cleanup temp audio file
-        try:
-            os.unlink(file_path)
-        except Exception as e:
-            print(f"🧹 Could not delete file: {e}")
-
-        # Dump memory for debugging
-        print(f"\n[🗂️ MEMORY for session {session_id}]")
-        for turn in get_conversation(session_id):
-            print(f"[{turn['role'].upper()}] {turn['content']}")
-        
+        audio = await render_reply(ai_response)
+
+        # Just this turn, into the bounded debug trace (read it via /debug/trace/{session_id})
+        tracer.record(session_id, "turn", transcript=transcript, reply=ai_response,
+                      audio_url=audio["audio_url"], score=audio["emotional_score"].get("score"))
 
         return {
             "session_id": session_id,
             "type": "voice",
             "transcript": transcript,
             "ai_response": ai_response,
-            "audio_url": audio_url,
-            "conversation_length": len(get_conversation(session_id)),
-            "emotional_score": emotional_score
+            "audio_url": audio["audio_url"],
+            "playlist": audio["playlist"],
+            "conversation_length": count_messages(session_id),
+            "emotional_score": audio["emotional_score"],
+            "preprocessing": preprocessing
         }
 
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"❌ Error during voice interaction: {e}")
+        tracer.record(session_id, "voice_error", level="error", error=str(e))
+        discard_pending()  # a failed turn leaves nothing behind (the response is still a 200)
         return {
             "error": str(e),
             "session_id": session_id,
             "type": "voice"
         }
 
+async def stream_voice_interaction(upload: AudioUpload, session_id: str,
+                                   preprocess: Optional[bool] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """Same stages as process_voice_interaction, yielded as (event, data) pairs.
+
+    Order: ``transcript`` → ``token`` (one per LLM delta), interleaved with
+    ``audio`` as each sentence finishes synthesizing → ``done`` with the
+    stitched audio URL, playlist and emotional score, or ``error``.
+    """
+    try:
+        transcript, preprocessing = await transcribe_clip(upload.data, upload.filename, preprocess)
+
+        if not transcript or not transcript.strip():
+            tracer.record(session_id, "empty_transcript", level="warning", preprocessing=preprocessing)
+            yield "error", {
+                "error": "Could not transcribe audio or audio was empty.",
+                "session_id": session_id,
+                "type": "voice",
+                "preprocessing": preprocessing
+            }
+            return
+
+        yield "transcript", {"session_id": session_id, "transcript": transcript, "preprocessing": preprocessing}
+        add_to_memory(session_id, "user", transcript)
+
+        tokens = []
+        pipeline = SentencePipeline()
+        async for token in stream_llm_response(transcript, session_id=session_id):
+            tokens.append(token)
+            yield "token", {"token": token}
+            pipeline.feed(token)
+            for chunk in pipeline.ready():
+                yield "audio", chunk
+        pipeline.close()
+        ai_response = "".join(tokens)
+        add_to_memory(session_id, "assistant", ai_response)
+
+        for chunk in await pipeline.drain():
+            yield "audio", chunk
+        audio = await finish_audio(pipeline)
+        emotional_score = score_reply(ai_response, audio["audio_url"])
+        tracer.record(session_id, "turn", streamed=True, transcript=transcript, reply=ai_response,
+                      audio_url=audio["audio_url"], chunks=len(audio["playlist"]),
+                      score=emotional_score.get("score"))
+
+        yield "done", {
+            "session_id": session_id,
+            "type": "voice",
+            "transcript": transcript,
+            "ai_response": ai_response,
+            "audio_url": audio["audio_url"],
+            "playlist": audio["playlist"],
+            "conversation_length": count_messages(session_id),
+            "emotional_score": emotional_score
+        }
+
+    except Overloaded as e:
+        tracer.record(session_id, "overloaded", level="warning", stage=e.stage)
+        discard_pending()
+        # Headers are already sent; tell the client when to retry in-band
+        yield "error", {"error": str(e), "session_id": session_id, "type": "voice",
+                        "stage": e.stage, "retry_after": e.retry_after}
+
+    except Exception as e:
+        print(f"❌ Error during streamed voice interaction: {e}")
+        tracer.record(session_id, "voice_error", level="error", streamed=True, error=str(e))
+        discard_pending()
+        yield "error", {"error": str(e), "session_id": session_id, "type": "voice"}
+
 async def process_text_to_speech(text: str, session_id: str = None) -> Dict[str, Any]:
     try:
         
-        audio_url, score = generate_emotional_audio(text)
-        emotional_score = validate_emotional_score(score)
+        audio = await render_reply(text)
 
         return {
             "text": text,
-            "audio_url": audio_url,
-            "emotional_score": emotional_score,
+            "audio_url": audio["audio_url"],
+            "playlist": audio["playlist"],
+            "emotional_score": audio["emotional_score"],
             "session_id": session_id
         }
 
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"❌ Error during TTS: {e}")
         return {
@@ -100,3 +182,20 @@ async def process_text_to_speech(text: str, session_id: str = None) -> Dict[str,
             "text": text,
             "session_id": session_id
         }
+
+def stream_text_to_speech(text: str) -> Tuple[Dict[str, str], Iterator[bytes]]:
+    """Start relaying ``text`` as MP3 chunks; returns response headers and the chunks.
+
+    The first chunk is fetched here so a failing engine surfaces before any
+    bytes (and the 200 status) go out.
+    """
+    audio_url, cached, chunks = tts_service.stream_audio(text)
+
+    def relay():
+        with tts_bulkhead.admit():
+            yield from chunks
+
+    audio = relay()
+    first = next(audio, b"")
+    headers = {"X-Audio-URL": audio_url, "X-Audio-Cache": "hit" if cached else "miss", "Cache-Control": "no-store"}
+    return headers, itertools.chain([first], audio)
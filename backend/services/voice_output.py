@@ -1,20 +1,124 @@
 # backend/services/voice_output.py
 import os
-from elevenlabs import generate, save, set_api_key
+import threading
+from functools import lru_cache
+from typing import Iterator, Optional
 
-set_api_key(os.getenv("ELEVENLABS_API_KEY"))
+import httpx
 
-def speak_text(text, voice="Rachel", output_path="output.wav"):
-    try:
-        audio = generate(
-            text=text,
-            voice=voice,
-            model="eleven_multilingual_v2",  # Best expressive model
-            stream=False
+from services.audio_cache import audio_cache
+from services.tts import clean_text_for_tts, clip_key, split_text_into_chunks
+
+# === ElevenLabs Settings ===
+ELEVENLABS_BASE_URL = os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io")
+ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")  # "Rachel"
+ELEVENLABS_MODEL = os.getenv("ELEVENLABS_MODEL", "eleven_multilingual_v2")  # Best expressive model
+ELEVENLABS_OUTPUT_FORMAT = os.getenv("ELEVENLABS_OUTPUT_FORMAT", "mp3_44100_128")
+ELEVENLABS_CONNECT_TIMEOUT = float(os.getenv("ELEVENLABS_CONNECT_TIMEOUT", "5"))
+ELEVENLABS_READ_TIMEOUT = float(os.getenv("ELEVENLABS_READ_TIMEOUT", "30"))
+ELEVENLABS_MAX_CONNECTIONS = int(os.getenv("ELEVENLABS_MAX_CONNECTIONS", "16"))
+ELEVENLABS_CHUNK_BYTES = 16 * 1024
+# Voices handed out per character in table reads (default: ElevenLabs premade voices)
+ELEVENLABS_VOICES = os.getenv(
+    "ELEVENLABS_VOICES",
+    "21m00Tcm4TlvDq8ikWAM,ErXwobaYiN019PkySvjV,EXAVITQu4vr4xnSDxMaL,TxGEqnHqrnbR3J1sU0yE,"
+    "AZnzlk1XvdvUeBnXmlld,VR6AewLTigWG4xSOukaG,MF3mGyEYCl7XYWbV9V6O,pNInz6obpgDQGcFmaJgB",
+)
+
+
+class ElevenLabsError(Exception):
+    """Raised when the ElevenLabs API rejects a synthesis request."""
+
+
+class ElevenLabsEngine:
+    """Streaming ElevenLabs TTS over a pooled keep-alive httpx client.
+
+    ``stream()`` yields MP3 bytes as ElevenLabs produces them, so playback
+    can start before the clip is finished; ``render()`` (the registry's TTS
+    engine interface) writes the same stream to a file.
+    """
+
+    def __init__(
+        self,
+        base_url: str = ELEVENLABS_BASE_URL,
+        api_key: Optional[str] = None,
+        voice_id: str = ELEVENLABS_VOICE_ID,
+        model: str = ELEVENLABS_MODEL,
+        output_format: str = ELEVENLABS_OUTPUT_FORMAT,
+    ):
+        self.voice_id = voice_id
+        self.voices = tuple(dict.fromkeys([voice_id, *(v.strip() for v in ELEVENLABS_VOICES.split(",") if v.strip())]))
+        self.model = model
+        self.output_format = output_format
+        self._http = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            headers={"xi-api-key": api_key or os.getenv("ELEVENLABS_API_KEY", ""), "Accept": "audio/mpeg"},
+            timeout=httpx.Timeout(ELEVENLABS_READ_TIMEOUT, connect=ELEVENLABS_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=ELEVENLABS_MAX_CONNECTIONS,
+                                max_keepalive_connections=ELEVENLABS_MAX_CONNECTIONS),
         )
-        save(audio, output_path)
-        
-        return output_path
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.bytes_streamed = 0
+
+    def stream(self, text: str, voice_id: Optional[str] = None) -> Iterator[bytes]:
+        """Yield the MP3 for ``text`` chunk by chunk as it arrives."""
+        with self._lock:
+            self.requests += 1
+        with self._http.stream(
+            "POST",
+            f"/v1/text-to-speech/{voice_id or self.voice_id}/stream",
+            params={"output_format": self.output_format},
+            json={"text": text, "model_id": self.model},
+        ) as response:
+            if response.status_code != 200:
+                response.read()
+                raise ElevenLabsError(f"ElevenLabs returned {response.status_code}: {response.text[:200]}")
+            for chunk in response.iter_bytes(ELEVENLABS_CHUNK_BYTES):
+                with self._lock:
+                    self.bytes_streamed += len(chunk)
+                yield chunk
+
+    def render(self, text: str, path: str, lang: str = "en", voice: Optional[str] = None):
+        # The multilingual model detects the language itself
+        with open(path, "wb") as f:
+            for chunk in self.stream(text, voice):
+                f.write(chunk)
+
+    def close(self):
+        self._http.close()
+        # The registry closes engines on shutdown; don't let default_engine() hand this one out again
+        if default_engine.cache_info().currsize and default_engine() is self:
+            default_engine.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def default_engine() -> ElevenLabsEngine:
+    """The process-wide engine (registered as the ``elevenlabs`` TTS engine)."""
+    return ElevenLabsEngine()
+
+
+def speak_text(text: str, voice: Optional[str] = None) -> str:
+    """Render ``text`` with ElevenLabs into the audio cache; returns the clip's file path.
+
+    Each clip gets its own content-addressed path, so concurrent requests
+    never overwrite each other's output.  Text is cleaned and keyed exactly
+    like ``TTSService`` does, so both find the same cached clip.
+    """
+    engine = default_engine()
+    voice_id = voice or engine.voice_id
+    cleaned = clean_text_for_tts(text, max_len=None)
+    key = clip_key(cleaned, None if voice_id == engine.voice_id else voice_id, "elevenlabs")
+
+    def chunks():
+        for part in split_text_into_chunks(cleaned):
+            if part:
+                yield from engine.stream(part, voice_id)
+
+    try:
+        for _ in audio_cache.stream(key, chunks):
+            pass
+        return str(audio_cache.audio_path(key))
     except Exception as e:
         print(f"❌ Error in TTS: {e}")
         raise
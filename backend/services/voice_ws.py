@@ -0,0 +1,230 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Optional
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+
+from services.audio_cache import audio_cache
+from services.trace import tracer
+from services.uploads import MAX_UPLOAD_BYTES, MAX_UPLOAD_SECONDS, check_upload
+from services.voice_io import stream_voice_interaction
+from memory import session_memory
+from memory.session_memory import count_messages
+
+# === Voice Socket Settings ===
+VOICE_WS_MAX_SESSIONS = int(os.getenv("VOICE_WS_MAX_SESSIONS", "2000"))        # open sockets per worker
+VOICE_WS_IDLE_SECONDS = float(os.getenv("VOICE_WS_IDLE_SECONDS", "900"))       # closed after this long without a frame
+VOICE_WS_MAX_PENDING_TURNS = int(os.getenv("VOICE_WS_MAX_PENDING_TURNS", "2"))  # utterances queued behind the current reply
+VOICE_WS_SEND_AUDIO = os.getenv("VOICE_WS_SEND_AUDIO", "true").lower() == "true"
+
+# Close codes (RFC 6455 / IANA registry)
+CLOSE_NORMAL = 1000
+CLOSE_TRY_AGAIN = 1013
+
+# Open sockets on this worker, plus lifetime counters for /metrics
+open_sessions = set()
+socket_totals = {"opened": 0, "rejected": 0, "turns": 0, "cancelled": 0}
+
+
+class VoiceSession:
+    """One client's voice conversation over a single WebSocket.
+
+    Client → server:
+
+    - binary frames: audio for the current utterance, in order
+    - ``{"type": "start", "filename": "turn.webm", "preprocess": true}``:
+      begin an utterance (optional; filename/preprocess stick for later turns)
+    - ``{"type": "end"}``: the utterance is complete, reply to it
+    - ``{"type": "cancel"}``: drop the reply in progress (that turn is not
+      stored) and any queued turns
+    - ``{"type": "ping"}``
+
+    Server → client: JSON text frames ``{"event": ..., ...}`` carrying the
+    stages of ``stream_voice_interaction`` (``transcript``, ``token``,
+    ``audio``, ``done``, ``error``) plus ``ready``, ``cancelled`` and
+    ``pong``.  Each ``audio`` event is followed by one binary frame with
+    that sentence's MP3, so no separate download is needed.
+
+    The socket is full duplex: the next utterance can stream in while the
+    current reply is still going out.  Finished utterances queue (up to
+    ``VOICE_WS_MAX_PENDING_TURNS``) and are answered in order.
+    """
+
+    def __init__(self, websocket: WebSocket, session_id: str, preprocess: Optional[bool] = None):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.preprocess = preprocess
+        self.filename = "audio.mp3"
+        self.content_type: Optional[str] = None
+        self.buffer = bytearray()
+        self.discarding = False  # utterance went over MAX_UPLOAD_BYTES; drop frames until "end"
+        self.pending: asyncio.Queue = asyncio.Queue(maxsize=VOICE_WS_MAX_PENDING_TURNS)
+        self.current: Optional[asyncio.Task] = None
+        self.turns = 0
+        self._send_lock = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return (self.current is not None and not self.current.done()) or not self.pending.empty()
+
+    async def send(self, event: str, data: Any = None):
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps({"event": event, **(data or {})}, ensure_ascii=False))
+
+    async def _send_audio(self, chunk: dict):
+        key = audio_cache.key_for_url(chunk["audio_url"] or "")
+        audio = b""
+        if VOICE_WS_SEND_AUDIO and key is not None:
+            try:
+                audio = await asyncio.to_thread(audio_cache.audio_path(key).read_bytes)
+            except OSError:
+                pass  # evicted already: the client can still fetch audio_url
+        # Header and bytes go out back to back so the client can pair them
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps({"event": "audio", **chunk, "bytes": len(audio)},
+                                                      ensure_ascii=False))
+            if audio:
+                await self.websocket.send_bytes(audio)
+
+    # --- Incoming ---
+    def _append(self, data: bytes):
+        if self.discarding:
+            return
+        self.buffer.extend(data)
+        if len(self.buffer) > MAX_UPLOAD_BYTES:
+            self.buffer = bytearray()
+            self.discarding = True
+
+    async def _control(self, text: str):
+        try:
+            message = json.loads(text)
+            kind = message["type"]
+        except (ValueError, TypeError, KeyError):
+            await self.send("error", {"error": "Control messages are JSON objects with a type."})
+            return
+
+        if kind in ("start", "end"):
+            self.filename = message.get("filename") or self.filename
+            self.content_type = message.get("content_type") or self.content_type
+            if "preprocess" in message:
+                self.preprocess = message["preprocess"]
+        if kind == "start":
+            self.buffer, self.discarding = bytearray(), False
+        elif kind == "end":
+            await self._finish_utterance()
+        elif kind == "cancel":
+            await self._cancel()
+        elif kind == "ping":
+            await self.send("pong", {"busy": self.busy})
+        else:
+            await self.send("error", {"error": f"Unknown control message: {kind}"})
+
+    async def _finish_utterance(self):
+        data, discarding = bytes(self.buffer), self.discarding
+        self.buffer, self.discarding = bytearray(), False
+        try:
+            if discarding:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes.")
+            upload = check_upload(data, self.filename, self.content_type)
+            self.pending.put_nowait((upload, self.preprocess))
+        except HTTPException as e:
+            await self.send("error", {"error": e.detail, "status": e.status_code, "session_id": self.session_id})
+        except asyncio.QueueFull:
+            await self.send("error", {"error": "Too many turns waiting for a reply.", "status": 429,
+                                      "session_id": self.session_id, "retry_after": 1})
+
+    async def _cancel(self):
+        while not self.pending.empty():
+            self.pending.get_nowait()
+        if self.current is not None and not self.current.done():
+            self.current.cancel()
+
+    # --- Outgoing ---
+    async def _reply(self, upload, preprocess: Optional[bool]):
+        # One unit of work per turn (sockets skip the HTTP middleware); stored before "done" goes out
+        with session_memory.unit_of_work() as unit:
+            try:
+                async for event, data in stream_voice_interaction(upload, self.session_id, preprocess):
+                    if event == "done":
+                        unit.commit()
+                    if event == "audio":
+                        await self._send_audio(data)
+                    else:
+                        await self.send(event, data)
+            finally:
+                # Short of "done" (error, barge-in cancel, client gone) the turn is not kept
+                unit.discard()
+
+    async def _speak(self):
+        """Answer finished utterances one at a time, in the order they arrived."""
+        while True:
+            upload, preprocess = await self.pending.get()
+            self.current = asyncio.create_task(self._reply(upload, preprocess))
+            await asyncio.wait({self.current})
+            self.turns += 1
+            socket_totals["turns"] += 1
+            if self.current.cancelled():
+                socket_totals["cancelled"] += 1
+                await self.send("cancelled", {"session_id": self.session_id})
+            elif self.current.exception() is not None:
+                # Sending failed: the client went away mid-reply
+                print(f"⚠️ Voice socket for {self.session_id} dropped mid-reply: {self.current.exception()!r}")
+                return
+
+    async def serve(self):
+        """Run the conversation until the client disconnects or goes idle."""
+        await self.send("ready", {
+            "session_id": self.session_id,
+            "conversation_length": await asyncio.to_thread(count_messages, self.session_id),
+            "max_bytes": MAX_UPLOAD_BYTES,
+            "max_seconds": MAX_UPLOAD_SECONDS,
+        })
+        speaker = asyncio.create_task(self._speak())
+        try:
+            while not speaker.done():
+                try:
+                    message = await asyncio.wait_for(self.websocket.receive(), VOICE_WS_IDLE_SECONDS)
+                except asyncio.TimeoutError:
+                    if self.busy:
+                        continue
+                    await self.websocket.close(CLOSE_NORMAL, "idle")
+                    return
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("bytes") is not None:
+                    self._append(message["bytes"])
+                elif message.get("text") is not None:
+                    await self._control(message["text"])
+        finally:
+            speaker.cancel()
+            if self.current is not None:
+                self.current.cancel()
+
+
+async def serve_voice_socket(websocket: WebSocket, session_id: str, preprocess: Optional[bool] = None):
+    """Accept a voice socket and hold the session open for its lifetime."""
+    await websocket.accept()
+    if len(open_sessions) >= VOICE_WS_MAX_SESSIONS:
+        socket_totals["rejected"] += 1
+        await websocket.close(CLOSE_TRY_AGAIN, "too many voice sessions on this worker")
+        return
+
+    session = VoiceSession(websocket, session_id, preprocess)
+    open_sessions.add(session)
+    socket_totals["opened"] += 1
+    started = time.monotonic()
+    try:
+        await session.serve()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        open_sessions.discard(session)
+        tracer.record(session_id, "voice_socket_closed", turns=session.turns,
+                      seconds=round(time.monotonic() - started, 1))
+
+
+def voice_socket_stats() -> dict:
+    return {"open": len(open_sessions), "max": VOICE_WS_MAX_SESSIONS,
+            "busy": sum(session.busy for session in open_sessions), **socket_totals}
@@ -1,25 +1,79 @@
 # services/whisper.py
+import asyncio
 import os
-from groq import Groq
+from typing import Optional, Tuple
+
 from dotenv import load_dotenv
 
+from services.bulkhead import Overloaded, whisper_bulkhead
+from services.metrics import stage
+from services.registry import backends
+
 load_dotenv()
 
-# Initialize Groq client for Whisper transcription
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+# === Preprocessing Settings ===
+WHISPER_PREPROCESS = os.getenv("WHISPER_PREPROCESS", "true").lower() == "true"
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "whisper-large-v3")  # or whisper-large-v3-turbo for speed
+
+
+class GroqTranscriber:
+    """Groq's hosted Whisper; the SDK is imported when the engine is first built."""
+
+    def __init__(self, api_key: Optional[str] = None, model: str = WHISPER_MODEL):
+        from groq import Groq
+
+        self.client = Groq(api_key=api_key or os.getenv("GROQ_API_KEY"))
+        self.model = model
+
+    def transcribe(self, data: bytes, filename: str) -> str:
+        return self.client.audio.transcriptions.create(
+            model=self.model,
+            file=(filename, data),
+            response_format="text"
+        )
+
+    def close(self):
+        self.client.close()
 
-async def transcribe_audio_file(file_path: str) -> str:
+
+async def transcribe_audio(data: bytes, filename: str = "audio.mp3") -> str:
     """
-    Transcribe audio file using Groq's Whisper implementation
+    Transcribe an in-memory clip with the configured transcription engine.
+    The filename only tells the API which container format to expect.
     """
     try:
-        with open(file_path, "rb") as audio:
-            response = groq_client.audio.transcriptions.create(
-                model="whisper-large-v3",  # or whisper-large-v3-turbo for speed
-                file=audio,
-                response_format="text"
-            )
+        # Blocking SDK call: run it on the Whisper stage's own threads
+        with stage("transcription"):
+            engine = backends.get("transcription")
+            response = await whisper_bulkhead.run(engine.transcribe, data, filename)
         return response
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"❌ Error in transcription: {e}")
         raise
+
+async def transcribe_clip(data: bytes, filename: str = "audio.mp3",
+                          preprocess: Optional[bool] = None) -> Tuple[str, dict]:
+    """
+    Optionally preprocess, then transcribe. Returns (transcript, preprocessing report);
+    all-silence clips return an empty transcript without calling Whisper.
+    """
+    if preprocess is None:
+        preprocess = WHISPER_PREPROCESS
+    if not preprocess:
+        return await transcribe_audio(data, filename), {"applied": False}
+
+    from services.audio_prep import preprocess_audio
+
+    with stage("audio_preprocess"):
+        prepared = await asyncio.to_thread(preprocess_audio, data, filename)
+    report = prepared.report()
+    if prepared.applied:
+        print(f"🎚️ Preprocessed audio: saved {report['bytes_saved']} bytes, "
+              f"{report['seconds_saved']}s in {report['elapsed_ms']}ms")
+    else:
+        print(f"⚠️ Audio sent without preprocessing: {report.get('reason', 'unknown')}")
+    if prepared.silent:
+        return "", report
+    return await transcribe_audio(prepared.data, prepared.filename), report
@@ -0,0 +1,16 @@
+# tests/conftest.py
+# Run from backend/: python -m pytest -q
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+# Never touch the real session_memory.db or static/; write every turn before the response returns
+WORK_DIR = Path(tempfile.mkdtemp(prefix="dramabot-tests-"))
+os.environ.setdefault("MEMORY_DB_PATH", str(WORK_DIR / "memory.db"))
+os.environ.setdefault("MEMORY_DURABILITY", "sync")
+os.chdir(WORK_DIR)
@@ -0,0 +1,65 @@
+# tests/test_audio_prep.py
+import asyncio
+import io
+import wave
+
+import numpy as np
+
+from services import whisper
+from services.audio_prep import TARGET_RATE, preprocess_audio
+
+
+def _wav(signal: np.ndarray, rate: int = TARGET_RATE) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes((np.clip(signal, -1, 1) * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+def _speech(seconds: float, rate: int = TARGET_RATE) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    return 0.3 * np.sin(2 * np.pi * 220 * t) * (0.55 + 0.45 * np.sin(2 * np.pi * 3 * t))
+
+
+def _speech_from_t0(rate: int = TARGET_RATE) -> np.ndarray:
+    """3 s of speech with no lead-in: a soft onset, one loud phrase, then 2 s of softer speech."""
+    t = np.arange(3 * rate) / rate
+    level = np.where((t >= 0.15) & (t < 1.0), 0.3, 0.05)
+    return level * np.sin(2 * np.pi * 220 * t)
+
+
+def test_speech_from_the_first_frame_is_kept():
+    # 48 kHz in, so the 16 kHz re-encode is smaller and the result is reported
+    prepared = preprocess_audio(_wav(_speech_from_t0(48000), 48000), "turn.wav")
+
+    assert prepared.applied and not prepared.silent
+    assert prepared.seconds >= 2.95
+
+
+def test_padded_speech_is_trimmed():
+    silence = np.zeros(TARGET_RATE)
+    clip = np.concatenate([silence, _speech(1.0), silence])
+    prepared = preprocess_audio(_wav(clip), "turn.wav")
+
+    assert prepared.applied and not prepared.silent
+    assert 1.0 <= prepared.seconds <= 1.5
+
+
+def test_all_silence_skips_transcription(monkeypatch):
+    calls = []
+
+    async def fake_transcribe(data, filename="audio.mp3"):
+        calls.append(filename)
+        return "should not be called"
+
+    monkeypatch.setattr(whisper, "transcribe_audio", fake_transcribe)
+    quiet = np.random.default_rng(0).normal(0, 0.0005, 3 * TARGET_RATE)   # about -66 dBFS
+
+    transcript, report = asyncio.run(whisper.transcribe_clip(_wav(quiet), "turn.wav", preprocess=True))
+
+    assert transcript == ""
+    assert report["silent"] is True
+    assert calls == []
@@ -0,0 +1,77 @@
+# tests/test_llm_cache.py
+import asyncio
+import uuid
+
+import pytest
+
+from memory.session_memory import add_to_memory
+from services import llm
+from services.registry import BackendRegistry
+from services.response_cache import ResponseCache
+
+
+class FakeChat:
+    """Stand-in LLM client: every reply is unique, every call is recorded."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def chat(self, messages, **params):
+        self.calls.append(messages)
+        return f"reply {len(self.calls)}"
+
+    async def stream_chat(self, messages, **params):
+        self.calls.append(messages)
+        for token in llm._as_tokens(f"streamed reply {len(self.calls)}"):
+            yield token
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    client = FakeChat()
+    monkeypatch.setattr(llm, "USE_MOCK", False)
+    monkeypatch.setattr(llm, "GROQ_API_KEY", "test-key")
+    monkeypatch.setattr(llm, "response_cache", ResponseCache(enabled=True, variants=1))
+    monkeypatch.setattr(llm, "backends", BackendRegistry({"llm": {"fake": lambda: client}}))
+    return client
+
+
+def _session() -> str:
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def test_openers_share_one_reply(fake_llm):
+    first = asyncio.run(llm.get_llm_response("hey!!", session_id=_session()))
+    # Voice turns store the user's line before the LLM call; it still counts as an opener
+    session_id = _session()
+    add_to_memory(session_id, "user", "Hey")
+    second = asyncio.run(llm.get_llm_response("Hey", session_id=session_id))
+
+    assert first == second == "reply 1"
+    assert len(fake_llm.calls) == 1
+
+
+def test_short_follow_up_with_history_misses_the_cache(fake_llm):
+    asyncio.run(llm.get_llm_response("why?", session_id=_session()))
+    session_id = _session()
+    add_to_memory(session_id, "user", "my cow ran away to join the circus")
+    add_to_memory(session_id, "assistant", "omg no 😭")
+    add_to_memory(session_id, "user", "why?")
+
+    reply = asyncio.run(llm.get_llm_response("why?", session_id=session_id))
+
+    assert reply == "reply 2"
+    assert any("circus" in m["content"] for m in fake_llm.calls[-1])
+
+
+def test_streamed_follow_up_with_history_misses_the_cache(fake_llm):
+    asyncio.run(llm.get_llm_response("ok", session_id=_session()))
+    session_id = _session()
+    add_to_memory(session_id, "user", "the school play is tomorrow")
+    add_to_memory(session_id, "assistant", "ahh are you nervous??")
+
+    async def stream():
+        return [token async for token in llm.stream_llm_response("ok", session_id=session_id)]
+
+    assert "".join(asyncio.run(stream())) == "streamed reply 2"
+    assert any("school play" in m["content"] for m in fake_llm.calls[-1])
@@ -0,0 +1,63 @@
+# tests/test_llm_client.py
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from benchmarks.fake_backends import FakeLLMServer
+from services.llm_client import LLMClient, LLMError
+
+
+class RateLimitedLLMServer(FakeLLMServer):
+    """Answers 429 with a fixed Retry-After until ``limited`` requests have been refused."""
+
+    def __init__(self, retry_after: str, limited: int = 1, **kwargs):
+        super().__init__(**kwargs)
+        self.retry_after = retry_after
+        self.limited = limited
+
+    def handle(self, handler, body):
+        if self.requests <= self.limited:
+            handler.send_response(429)
+            handler.send_header("Retry-After", self.retry_after)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        super().handle(handler, body)
+
+
+def test_retry_after_is_honoured_up_to_the_cap():
+    client = LLMClient(max_retry_after=5)
+
+    assert client._backoff(0, "2") == 2.0
+    assert client._backoff(0, "0") == 0.0
+    assert client._backoff(0, "3600") is None
+    assert 1.0 < client._backoff(0, formatdate(time.time() + 3, usegmt=True)) <= 3.0
+    assert client._backoff(0, formatdate(time.time() + 3600, usegmt=True)) is None
+    assert 0 <= client._backoff(0, "soon") <= client.backoff_base
+
+
+def test_short_retry_after_is_retried():
+    with RateLimitedLLMServer("0") as server:
+        client = LLMClient(base_url=server.base_url, max_retries=2, max_retry_after=5)
+        try:
+            assert asyncio.run(client.chat([{"role": "user", "content": "hey"}]))
+        finally:
+            client.close()
+
+    assert server.requests == 2
+
+
+def test_long_retry_after_fails_without_waiting():
+    with RateLimitedLLMServer("3600") as server:
+        client = LLMClient(base_url=server.base_url, max_retries=2, max_retry_after=5)
+        started = time.perf_counter()
+        try:
+            with pytest.raises(LLMError):
+                asyncio.run(client.chat([{"role": "user", "content": "hey"}]))
+        finally:
+            client.close()
+
+    assert server.requests == 1
+    assert time.perf_counter() - started < 5
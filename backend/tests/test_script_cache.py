@@ -0,0 +1,66 @@
+# tests/test_script_cache.py
+import pytest
+
+from benchmarks.fake_backends import FakeKVServer
+from memory.cache import ConversationCache
+from memory.kv_store import KVStore
+from memory.script_cache import ScriptCache
+from memory.store import SQLiteStore
+
+TEMPLATE = "template-v1"
+
+
+@pytest.fixture(params=["sqlite", "kv"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        yield SQLiteStore(tmp_path / "scripts.db")
+        return
+    server = FakeKVServer().start()
+    store = KVStore(server.base_url)
+    yield store
+    store.close()
+    server.stop()
+
+
+def _state_key(cache: ConversationCache, session_id: str) -> str:
+    count, last = cache.last_message(session_id)
+    return f"{count}:{last['content']}"
+
+
+@pytest.mark.parametrize("durability", ["sync", "write-behind"])
+def test_new_turn_drops_the_script(store, durability):
+    cache = ConversationCache(store, durability=durability, flush_interval=3600)
+    scripts = ScriptCache(store)
+    cache.commit("s1", [("user", "my cow"), ("assistant", "omg")])
+    scripts.put("s1", _state_key(cache, "s1"), TEMPLATE, {"script": "Act I"})
+
+    cache.commit("s1", [("user", "she wants to dance")])
+
+    assert store.fetch_script("s1") is None
+    cache.flush()
+    assert store.count("s1") == 3
+
+
+def test_flush_keeps_a_script_saved_after_the_commit(store):
+    cache = ConversationCache(store, durability="write-behind", flush_interval=3600)
+    scripts = ScriptCache(store)
+    cache.commit("s1", [("user", "my cow"), ("assistant", "omg")])
+    state_key = _state_key(cache, "s1")
+    scripts.put("s1", state_key, TEMPLATE, {"script": "Act I"})
+
+    cache.flush()
+
+    assert store.count("s1") == 2
+    assert scripts.get("s1", state_key, TEMPLATE) == {"script": "Act I"}
+
+
+def test_summary_only_write_keeps_the_script(store):
+    cache = ConversationCache(store, durability="sync")
+    scripts = ScriptCache(store)
+    cache.commit("s1", [("user", "my cow"), ("assistant", "omg")])
+    state_key = _state_key(cache, "s1")
+    scripts.put("s1", state_key, TEMPLATE, {"script": "Act I"})
+
+    cache.commit("s1", [], summary=("talked about a cow", 2))
+
+    assert scripts.get("s1", state_key, TEMPLATE) == {"script": "Act I"}
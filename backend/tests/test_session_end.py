@@ -0,0 +1,30 @@
+# tests/test_session_end.py
+import uuid
+
+from fastapi.testclient import TestClient
+
+import main
+from memory.session_memory import add_to_memory
+from services.trace import tracer
+
+
+def test_ending_a_session_clears_its_trace():
+    session_id = f"end-{uuid.uuid4().hex[:8]}"
+    add_to_memory(session_id, "user", "my cow is leaving the farm")
+    tracer.record(session_id, "turn", transcript="my cow is leaving the farm")
+
+    response = TestClient(main.app).post("/session/end", params={"session_id": session_id})
+
+    assert response.status_code == 200
+    assert tracer.get(session_id) == []
+    assert session_id not in tracer.sessions()
+
+
+def test_unknown_session_still_drops_its_trace():
+    session_id = f"end-{uuid.uuid4().hex[:8]}"
+    tracer.record(session_id, "voice_error", level="error", error="whisper timed out")
+
+    response = TestClient(main.app).post("/session/end", params={"session_id": session_id})
+
+    assert response.status_code == 404
+    assert tracer.get(session_id) == []
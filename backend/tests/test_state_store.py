@@ -0,0 +1,21 @@
+# tests/test_state_store.py
+import pytest
+
+from memory.kv_store import KVStore
+from memory.state import StateStore
+from memory.store import SQLiteStore
+
+
+def test_backend_missing_a_method_fails_at_construction():
+    class HalfStore(StateStore):
+        def add_many(self, rows):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        HalfStore()
+
+
+def test_shipped_backends_implement_the_interface(tmp_path):
+    assert not SQLiteStore.__abstractmethods__
+    assert not KVStore.__abstractmethods__
+    assert isinstance(SQLiteStore(tmp_path / "state.db"), StateStore)
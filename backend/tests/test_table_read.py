@@ -0,0 +1,30 @@
+# tests/test_table_read.py
+import asyncio
+
+from benchmarks.fake_backends import FakeTTSEngine
+from services import table_read
+from services.audio_cache import AudioCache
+from services.llm import fake_llm_call
+from services.registry import BackendRegistry
+
+
+def test_assembly_rerenders_lines_evicted_after_rendering(tmp_path, monkeypatch):
+    cache = AudioCache(directory=tmp_path, max_bytes=64 * 1024 * 1024)
+    monkeypatch.setattr(table_read, "audio_cache", cache)
+    monkeypatch.setattr(table_read, "backends", BackendRegistry({"tts": {"fake": FakeTTSEngine}}))
+    assemble = table_read._assemble
+
+    def evict_then_assemble(play, segments, key):
+        # The budget drops every line's clip between rendering and assembly
+        cache.max_bytes = 1
+        cache.evict()
+        cache.max_bytes = 64 * 1024 * 1024
+        return assemble(play, segments, key)
+
+    monkeypatch.setattr(table_read, "_assemble", evict_then_assemble)
+
+    result = asyncio.run(table_read.render_table_read(fake_llm_call("")))
+
+    assert result["segments"] > 1
+    assert result["duration_ms"] > 0
+    assert all(line["end_ms"] > line["start_ms"] for line in result["lines"])
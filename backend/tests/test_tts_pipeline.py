@@ -0,0 +1,26 @@
+# tests/test_tts_pipeline.py
+from services import tts_pipeline
+from services.audio_cache import AudioCache, cache_key
+
+
+def test_stitch_rerenders_parts_evicted_before_assembly(tmp_path, monkeypatch):
+    cache = AudioCache(directory=tmp_path, max_bytes=1024 * 1024)
+    monkeypatch.setattr(tts_pipeline, "audio_cache", cache)
+    rendered = []
+
+    def synthesize(text: str) -> str:
+        def render(path: str):
+            rendered.append(text)
+            with open(path, "wb") as f:
+                f.write(text.encode())
+        return cache.get_or_create(cache_key(text, "v", "en", "test"), render)["url"]
+
+    chunks = [{"text": text, "audio_url": synthesize(text)} for text in ("Hey you. ", "Omg hi.")]
+    cache.max_bytes = 1
+    cache.evict()  # the budget drops both parts between rendering and assembly
+    cache.max_bytes = 1024 * 1024
+
+    url = tts_pipeline.stitch_audio(chunks, synthesize)
+
+    assert cache.audio_path(cache.key_for_url(url)).read_bytes() == b"Hey you. Omg hi."
+    assert rendered == ["Hey you. ", "Omg hi.", "Hey you. ", "Omg hi."]
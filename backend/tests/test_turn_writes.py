@@ -0,0 +1,115 @@
+# tests/test_turn_writes.py
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.fake_backends import FakeTTSEngine
+from benchmarks.loadtest import speech_like_wav
+from memory import session_memory
+from memory.cache import ConversationCache
+from memory.store import SQLiteStore
+from services import voice_io
+from services.registry import backends
+
+MODES = {"sync": ("sync", False), "shared": ("sync", True), "write-behind": ("write-behind", False)}
+ENDPOINTS = ("/voice/interact", "/voice/interact/stream", "/voice/ws")
+
+
+class CountingStore(SQLiteStore):
+    """SQLite store that counts the writes that add conversation rows."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.row_writes = 0
+
+    def add_many(self, rows):
+        self.row_writes += 1
+        return super().add_many(rows)
+
+    def append(self, session_id, rows):
+        self.row_writes += 1
+        return super().append(session_id, rows)
+
+    def write_turn(self, session_id, rows, summary=None):
+        # One transaction: don't count the append/add_many it may be built on
+        before = self.row_writes
+        result = super().write_turn(session_id, rows, summary)
+        self.row_writes = before + 1
+        return result
+
+
+@pytest.fixture(params=list(MODES))
+def app(request, monkeypatch, tmp_path):
+    durability, shared = MODES[request.param]
+    store = CountingStore(tmp_path / "turns.db")
+    cache = ConversationCache(store, durability=durability, shared=shared, flush_interval=3600)
+    monkeypatch.setattr(session_memory, "store", store)
+    monkeypatch.setattr(session_memory, "cache", cache)
+
+    async def fake_transcribe(data, filename="audio.mp3", preprocess=None):
+        return "my cow wants to be an actress", {"applied": False}
+
+    monkeypatch.setattr(voice_io, "transcribe_clip", fake_transcribe)
+    monkeypatch.setenv("TTS_ENGINE", "fake")
+    backends.register("tts", "fake", FakeTTSEngine)
+    # No lifespan: its shutdown would close the stage executors for every later test
+    yield TestClient(main.app), store, cache
+
+
+def _socket_turn(client, session_id: str) -> dict:
+    with client.websocket_connect(f"/voice/ws?session_id={session_id}") as socket:
+        socket.receive_json()  # ready
+        socket.send_json({"type": "start", "filename": "turn.wav"})
+        socket.send_bytes(speech_like_wav(0.5))
+        socket.send_json({"type": "end"})
+        while True:
+            message = socket.receive()
+            if "text" in message:
+                event = json.loads(message["text"])
+                if event["event"] in ("done", "error"):
+                    return event
+
+
+def _turn(client, endpoint: str, session_id: str):
+    if endpoint == "/voice/ws":
+        return json.dumps(_socket_turn(client, session_id))
+    response = client.post(endpoint, files={"file": ("turn.wav", speech_like_wav(0.5), "audio/wav")},
+                           data={"session_id": session_id})
+    assert response.status_code == 200
+    return response.text
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_one_store_write_per_committed_turn(app, endpoint):
+    client, store, cache = app
+    session_id = f"turn-{uuid.uuid4().hex[:8]}"
+    for turn in range(1, 4):
+        before = store.row_writes
+        body = _turn(client, endpoint, session_id)
+        cache.flush()
+
+        assert '"error"' not in body
+        assert store.row_writes - before == 1
+        assert store.count(session_id) == 2 * turn
+
+
+@pytest.mark.parametrize("endpoint", ENDPOINTS)
+def test_failed_turn_writes_nothing(app, endpoint, monkeypatch):
+    client, store, cache = app
+
+    async def broken_tts(*args, **kwargs):
+        raise RuntimeError("tts is down")
+
+    monkeypatch.setattr(voice_io, "render_reply", broken_tts)
+    monkeypatch.setattr(voice_io, "finish_audio", broken_tts)
+    session_id = f"failed-{uuid.uuid4().hex[:8]}"
+    before = store.row_writes
+    body = _turn(client, endpoint, session_id)
+    cache.flush()
+
+    assert "tts is down" in body
+    assert store.row_writes == before
+    assert store.count(session_id) == 0